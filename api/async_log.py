@@ -0,0 +1,56 @@
+"""Module for logging through a queue so slow handlers never block request handling."""
+
+from atexit import register
+from logging import getLogger, Formatter, Logger, StreamHandler
+from logging.handlers import QueueHandler, QueueListener
+from os import environ as ENV
+from queue import SimpleQueue
+from reprlib import Repr
+import sys
+
+FORMAT = "%(asctime)s %(levelname)s %(module)s: %(message)s"
+
+_repr = Repr()
+_repr.maxstring = 80
+_repr.maxother = 80
+_repr.maxdict = 6
+_repr.maxlist = 6
+_repr.maxlevel = 2
+_listener = {"instance": None, "handler": None}
+
+
+class Truncated:
+    """Log argument only formatted when emitted, and cut down to a short summary."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        return _repr.repr(self.value)
+
+
+def set_logger() -> Logger:
+    """Set root logger to hand records to a background thread for writing."""
+    logger = getLogger()
+    logger.setLevel(ENV.get("LOG_LEVEL", "INFO").upper())
+    if _listener["instance"] is None:
+        queue = SimpleQueue()
+        handler = StreamHandler(sys.stdout)
+        handler.setFormatter(Formatter(FORMAT))
+        listener = QueueListener(queue, handler, respect_handler_level=True)
+        listener.start()
+        register(stop_logger)
+        _listener["handler"] = QueueHandler(queue)
+        logger.addHandler(_listener["handler"])
+        _listener["instance"] = listener
+    return logger
+
+
+def stop_logger():
+    """Write any queued records and remove the queue handler."""
+    if _listener["instance"] is not None:
+        _listener["instance"].stop()
+        getLogger().removeHandler(_listener["handler"])
+        _listener.update({"instance": None, "handler": None})
@@ -0,0 +1,54 @@
+"""Script for measuring API import time and first request latency in fresh processes."""
+
+from argparse import ArgumentParser, Namespace
+from statistics import median
+from subprocess import run
+from sys import executable
+from os.path import dirname, abspath
+
+TRIAL = """
+from time import perf_counter
+start = perf_counter()
+import main
+imported = perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    started = perf_counter()
+    client.get("{route}")
+    first = perf_counter()
+    client.get("{route}")
+    second = perf_counter()
+print(imported - start, started - imported, first - started, second - first)
+"""
+
+
+def get_args() -> Namespace:
+    """Return number of trials and route to request."""
+    parser = ArgumentParser(
+        prog="Startup Benchmark",
+        description="Cold start benchmark for the thundle API"
+    )
+    parser.add_argument("--trials", "-n", type=int, default=5)
+    parser.add_argument("--route", "-r", type=str, default="/random")
+    return parser.parse_args()
+
+
+def run_trial(route: str) -> list[float]:
+    """Return import, startup, first and second request seconds for one process."""
+    result = run([executable, "-c", TRIAL.format(route=route)], cwd=dirname(abspath(__file__)),
+                 capture_output=True, text=True, check=True)
+    return [float(x) for x in result.stdout.strip().splitlines()[-1].split()]
+
+
+def bench(trials: int, route: str) -> dict:
+    """Return median milliseconds for each phase across trials."""
+    results = [run_trial(route) for _ in range(trials)]
+    phases = ["import", "startup", "first_request", "second_request"]
+    return {phase: round(median(r[i] for r in results) * 1000, 1)
+            for i, phase in enumerate(phases)}
+
+
+if __name__ == "__main__":
+    args = get_args()
+    for phase, ms in bench(args.trials, args.route).items():
+        print(f"{phase:>15}: {ms}ms")
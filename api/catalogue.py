@@ -0,0 +1,93 @@
+"""Module for reading the memory mapped vehicle catalogue published by the pipeline."""
+
+from os import environ as ENV, stat
+from json import loads
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pyarrow import Table
+
+
+class Catalogue:
+    """Read only view over a catalogue file shared between API workers."""
+
+    def __init__(self, table: "Table"):
+        metadata = table.schema.metadata or {}
+        self.mode_ranges = loads(metadata.get(b"mode_ranges", b"{}"))
+        self.ids = table.column("_id")
+        self.id_order = table.column("_id_order")
+        self.source_order = None
+        if "_source_order" in table.column_names:
+            self.source_order = table.column("_source_order")
+            table = table.drop_columns(["_source_order"])
+        self.table = table.drop_columns(["_id_order"])
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def get_slice(self, mode: str) -> "Table":
+        """Return zero copy slice of rows for mode."""
+        if mode == "all":
+            return self.table
+        start, length = self.mode_ranges.get(mode, (0, 0))
+        return self.table.slice(start, length)
+
+    def get_rows(self, mode: str, limit: int = None, fields: list[str] = None) -> list[dict]:
+        """Return rows for mode in database order as documents, optionally limited and projected."""
+        rows = self.get_slice(mode)
+        if fields:
+            rows = rows.select(fields)
+        if mode == "all" and self.source_order is not None:
+            order = self.source_order.slice(0, limit) if limit else self.source_order
+            return rows.take(order).to_pylist()
+        if limit:
+            rows = rows.slice(0, limit)
+        return rows.to_pylist()
+
+    def get_by_id(self, identifier: str) -> dict | None:
+        """Return document for identifier using the id ordered row index."""
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            row = self.id_order[mid].as_py()
+            if self.ids[row].as_py() < identifier:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self):
+            row = self.id_order[low].as_py()
+            if self.ids[row].as_py() == identifier:
+                return self.table.slice(row, 1).to_pylist()[0]
+        return None
+
+
+_state = {"key": None, "catalogue": None}
+
+
+def open_catalogue(path: str) -> Catalogue:
+    """Return catalogue backed by a read only memory map of path."""
+    # pyarrow is imported here so processes without a catalogue never pay for it
+    # pylint: disable=import-outside-toplevel
+    from pyarrow import memory_map
+    from pyarrow.ipc import open_file
+    logger = getLogger()
+    logger.info("Memory mapping catalogue: %s", path)
+    source = memory_map(path, "r")
+    return Catalogue(open_file(source).read_all())
+
+
+def get_catalogue() -> Catalogue | None:
+    """Return the current catalogue, remapping when the pipeline replaces it."""
+    path = ENV.get("CATALOGUE_PATH")
+    if not path:
+        return None
+    try:
+        info = stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, info.st_ino, info.st_mtime_ns)
+    if _state["key"] != key:
+        _state["catalogue"] = open_catalogue(path)
+        _state["key"] = key
+    return _state["catalogue"]
@@ -4,22 +4,155 @@ from os import environ as ENV
 from hashlib import sha256
 from datetime import date, timedelta
 from logging import getLogger
+from time import monotonic
+from sqlite3 import Error as SQLiteError
 
 from dotenv import load_dotenv
 from pymongo.mongo_client import MongoClient
 from pymongo.collection import Collection
+from pymongo.operations import UpdateOne
 from pymongo.server_api import ServerApi
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+
+from catalogue import get_catalogue
+from storage import Storage, get_sqlite_storage
+from async_log import Truncated
+from resilience import BackendUnavailable, CircuitBreaker, GuardedStorage
+
+
+_clients = {}
+_stats = {"document": None, "fetched": 0.0}
+_version = {"value": None, "fetched": 0.0}
+_breaker = {"instance": None}
+_cache_index = {"created": False}
+STATS_TTL = 600
+VERSION_TTL = 60
+DB_FAILURES = (PyMongoError, SQLiteError, OSError)
+CACHE_KEY = [("date", 1), ("data_set", 1), ("game_mode", 1)]
+DUPLICATE_KEY = 11000
+
+
+def get_client() -> MongoClient:
+    """Return shared MongoDB client, connecting on first use."""
+    conn_string = ENV["DB_CONN_STRING"]
+    if conn_string not in _clients:
+        logger = getLogger()
+        logger.info("Getting MongoDB connection...")
+        timeout = int(ENV.get("DB_BUDGET_MS", 2000))
+        _clients[conn_string] = MongoClient(conn_string, server_api=ServerApi('1'),
+                                            serverSelectionTimeoutMS=timeout,
+                                            connectTimeoutMS=timeout, socketTimeoutMS=timeout)
+    return _clients[conn_string]
 
 
 def get_collection(name: str = "vehicles") -> Collection:
     """Return collection for MongoDB."""
-    logger = getLogger()
-    logger.info("Getting MongoDB connection...")
-    mongo = MongoClient(ENV["DB_CONN_STRING"], server_api=ServerApi('1'))
-    db = mongo[ENV["DB_NAME"]]
+    db = get_client()[ENV["DB_NAME"]]
     return db[name]
 
 
+class MongoStorage:
+    """Storage in MongoDB collections."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_vehicles(self, mode: str, limit: int = None, fields: list[str] = None) -> list[dict]:
+        collection = self.collection("vehicles")
+        query = {} if mode == "all" else {"mode": mode}
+        cursor = collection.find(query, fields) if fields else collection.find(query)
+        return list(cursor.limit(limit)) if limit else list(cursor)
+
+    def get_vehicles_by_id(self, ids: list) -> list[dict]:
+        vehicles = list(self.collection("vehicles").find({"_id": {"$in": ids}}))
+        found = {doc["_id"] for doc in vehicles}
+        missing = [i for i in ids if i not in found]
+        if missing:
+            vehicles += self.collection("retired").find({"_id": {"$in": missing}})
+        return vehicles
+
+    def get_cache_records(self, day: str, pairs: list[tuple[str, str]]) -> list[dict]:
+        if len(pairs) == 1:
+            query = {"date": day, "data_set": pairs[0][0], "game_mode": pairs[0][1]}
+        else:
+            query = {"date": day,
+                     "$or": [{"data_set": mode, "game_mode": game} for mode, game in pairs]}
+        return list(self.collection("cache").find(query))
+
+    def create_cache_index(self):
+        """Create the unique archive index once per process, warning if duplicates block it."""
+        if _cache_index["created"]:
+            return
+        try:
+            self.collection("cache").create_index(CACHE_KEY, unique=True, name="cache_pick")
+        except OperationFailure as e:
+            getLogger().warning("Could not create unique archive index, "
+                                "run migrate_archive.py to remove duplicates: %s", e)
+        _cache_index["created"] = True
+
+    def add_cache_records(self, records: list[dict]):
+        self.create_cache_index()
+        try:
+            self.collection("cache").bulk_write(
+                [UpdateOne({"date": r["date"], "data_set": r["data_set"],
+                            "game_mode": r["game_mode"]},
+                           {"$setOnInsert": r}, upsert=True) for r in records], ordered=False)
+        except BulkWriteError as e:
+            # another worker upserting the same pick loses the race on the unique index
+            errors = e.details.get("writeErrors", [])
+            if e.details.get("writeConcernErrors") or \
+                    any(error["code"] != DUPLICATE_KEY for error in errors):
+                raise
+
+    def get_archive_records(self, game: str, mode: str, day: str = None) -> list[dict]:
+        query = {"game_mode": game, "data_set": mode}
+        if day:
+            query["date"] = day
+        return list(self.collection("cache").find(query))
+
+    def get_cached_dates(self, game: str, mode: str) -> list[str]:
+        return self.collection("cache").distinct("date", {"game_mode": game, "data_set": mode})
+
+    def get_stats(self) -> dict | None:
+        return self.collection("stats").find_one({"_id": "catalogue"})
+
+    def get_catalogue_version(self) -> int:
+        document = self.collection("versions").find_one({"_id": "catalogue"})
+        return document["version"] if document else 0
+
+    def get_changes(self, since: int, until: int, mode: str = "all") -> list[dict]:
+        query = {"version": {"$gt": since, "$lte": until}}
+        if mode != "all":
+            query["mode"] = mode
+        return list(self.collection("changes").find(query).sort("version", 1))
+
+    def ping(self):
+        get_client().admin.command("ping")
+
+
+def get_breaker() -> CircuitBreaker:
+    """Return database circuit breaker built from the environment."""
+    if _breaker["instance"] is None:
+        _breaker["instance"] = CircuitBreaker(int(ENV.get("DB_BREAKER_FAILURES", 5)),
+                                              float(ENV.get("DB_BREAKER_RESET", 30)))
+    return _breaker["instance"]
+
+
+def reset_breaker():
+    """Close the circuit and reread the settings on the next call."""
+    _breaker["instance"] = None
+
+
+def get_storage() -> Storage:
+    """Return SQLite storage when SQLITE_PATH is set, otherwise MongoDB, each call time bounded."""
+    if ENV.get("SQLITE_PATH"):
+        storage = get_sqlite_storage(ENV["SQLITE_PATH"])
+    else:
+        storage = MongoStorage(get_collection)
+    return GuardedStorage(storage, int(ENV.get("DB_BUDGET_MS", 2000)) / 1000,
+                          get_breaker(), DB_FAILURES)
+
+
 def get_date_hash_index(n: int, offset: int) -> int:
     """Return index for an iterable of length n selected by date hash."""
     logger = getLogger()
@@ -30,23 +163,63 @@ def get_date_hash_index(n: int, offset: int) -> int:
     return hash_now % n
 
 
-def get_objects(mode: str, limit: int = None) -> list[dict]:
+def get_objects(mode: str, limit: int = None, fields: list[str] = None) -> list[dict]:
     """Return list of objects for given game mode within limit, if present."""
     logger = getLogger()
-    logger.info("Getting objects from MongoDB for game mode: %s...", mode)
-    collection = get_collection("vehicles")
+    catalogue = get_catalogue()
+    if catalogue:
+        logger.info("Getting objects from catalogue for game mode: %s...", mode)
+        return catalogue.get_rows(mode, limit, fields)
 
-    if mode == "all":
-        query = {}
-    else:
-        query = { "mode": mode }
+    logger.info("Getting objects from storage for game mode: %s...", mode)
+    documents = get_storage().get_vehicles(mode, limit, fields)
+    logger.info("Found %s documents.", len(documents))
+    if documents:
+        logger.debug("First document: %s", Truncated(documents[0]))
+    return documents
 
-    if limit:
-        documents = list(collection.find(query).limit(limit))
-    else:
-        documents = list(collection.find(query))
 
-    logger.info("Found documents, listing first result:\n %s", documents[0])
+def get_reference(doc: dict, mode: str, game: str) -> dict:
+    """Return compact archive record pointing at a vehicle document."""
+    return {
+        "date": date.today().strftime(r"%d/%m/%Y"),
+        "data_set": mode,
+        "game_mode": game,
+        "vehicle_id": doc["_id"]
+    }
+
+
+def get_vehicles_by_id(ids: list) -> dict:
+    """Return vehicle documents keyed by _id using one lookup."""
+    ids = list(dict.fromkeys(ids))
+    catalogue = get_catalogue()
+    if catalogue:
+        vehicles = {i: catalogue.get_by_id(str(i)) for i in ids}
+        missing = [i for i, doc in vehicles.items() if not doc]
+        vehicles = {i: doc for i, doc in vehicles.items() if doc}
+        if missing:
+            vehicles.update({doc["_id"]: doc
+                             for doc in get_storage().get_vehicles_by_id(missing)})
+        return vehicles
+    return {doc["_id"]: doc for doc in get_storage().get_vehicles_by_id(ids)}
+
+
+def resolve_references(records: list[dict]) -> list[dict]:
+    """Return archive records joined with their vehicle documents."""
+    logger = getLogger()
+    ids = [r["vehicle_id"] for r in records if "vehicle_id" in r]
+    vehicles = get_vehicles_by_id(ids) if ids else {}
+    documents = []
+    for record in records:
+        if "vehicle_id" not in record:
+            documents.append(record)
+            continue
+        vehicle = vehicles.get(record["vehicle_id"])
+        if vehicle is None:
+            logger.warning("Archived vehicle %s no longer exists.", record["vehicle_id"])
+            continue
+        documents.append({**vehicle, "date": record["date"],
+                          "data_set": record["data_set"], "game_mode": record["game_mode"]})
     return documents
 
 
@@ -54,54 +227,98 @@ def cache_document(doc: dict, mode: str = "all", game: str = "blur"):
     """Upload random selection for today's date to MongoDB."""
     logger = getLogger()
     logger.info("Caching document...")
-    collection = get_collection("cache")
-    doc["date"] = date.today().strftime(r"%d/%m/%Y")
-    doc["data_set"] = mode
-    doc["game_mode"] = game
-    del doc["_id"]
-    collection.insert_one(doc)
+    get_storage().add_cache_records([get_reference(doc, mode, game)])
 
 
 def get_doc_from_cache(mode: str = "all", game: str = "blur") -> dict:
     """Return cached object for today's date if it is present."""
     logger = getLogger()
     logger.info("Checking cache for document...")
-    collection = get_collection("cache")
-    query = { 
-        "date": date.today().strftime(r"%d/%m/%Y"),
-        "data_set": mode,
-        "game_mode": game
-    }
-    document = list(collection.find(query))
+    records = get_storage().get_cache_records(date.today().strftime(r"%d/%m/%Y"), [(mode, game)])
+    document = resolve_references(records)
     if document:
-        logger.info("Found document in cache: %s", document[0])
+        logger.info("Found document in cache: %s", document[0].get("_id"))
         return document[0]
     return None
 
 
+def get_docs_from_cache(pairs: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+    """Return today's cached objects for many (mode, game) pairs in one query."""
+    logger = getLogger()
+    logger.info("Checking cache for %s documents...", len(pairs))
+    records = get_storage().get_cache_records(date.today().strftime(r"%d/%m/%Y"), pairs)
+    documents = {}
+    for doc in resolve_references(records):
+        documents.setdefault((doc["data_set"], doc["game_mode"]), doc)
+    return documents
+
+
+def cache_documents(picks: dict[tuple[str, str], dict]):
+    """Upload many selections for today's date to MongoDB in one write."""
+    logger = getLogger()
+    logger.info("Caching %s documents...", len(picks))
+    get_storage().add_cache_records([get_reference(doc, mode, game)
+                                     for (mode, game), doc in picks.items()])
+
+
 def get_archive(date: str, game: str = "blur", mode: str = "all"):
     """Return all documents in cache for that game type."""
     logger = getLogger()
     logger.info("Checking cache for documents...")
-    collection = get_collection("cache")
-    if date:
-        query = { 
-            "game_mode": game,
-            "data_set": mode,
-            "date": date.replace("_", "/")
-        }
-    else:
-        query = { 
-            "game_mode": game,
-            "data_set": mode
-        }
-    documents = list(collection.find(query))
+    day = date.replace("_", "/") if date else None
+    documents = resolve_references(get_storage().get_archive_records(game, mode, day))
     if documents:
-        logger.info("Found documents in cache, displaying first example: %s", documents[0])
+        logger.info("Found %s documents in cache.", len(documents))
+        logger.debug("First document: %s", Truncated(documents[0]))
         return documents
     return None
 
 
+def get_cached_dates(game: str = "blur", mode: str = "all") -> list[str]:
+    """Return every date with a cached selection for that game type."""
+    logger = getLogger()
+    logger.info("Getting cached dates...")
+    return get_storage().get_cached_dates(game, mode)
+
+
+def get_stats() -> dict | None:
+    """Return catalogue statistics document, held in memory between refreshes."""
+    if _stats["document"] is None or monotonic() - _stats["fetched"] > STATS_TTL:
+        logger = getLogger()
+        logger.info("Fetching catalogue statistics...")
+        _stats["document"] = get_storage().get_stats()
+        _stats["fetched"] = monotonic()
+    return _stats["document"]
+
+
+def get_catalogue_version(refresh: bool = False) -> int:
+    """Return catalogue version, held in memory for a minute or while the database is down."""
+    if refresh or _version["value"] is None or monotonic() - _version["fetched"] > VERSION_TTL:
+        try:
+            _version["value"] = get_storage().get_catalogue_version()
+        except BackendUnavailable:
+            if refresh or _version["value"] is None:
+                raise
+            getLogger().warning("Serving held catalogue version %s.", _version["value"])
+        _version["fetched"] = monotonic()
+    return _version["value"]
+
+
+def get_name_delta(since: int, version: int, mode: str = "all") -> dict:
+    """Return names added or renamed and ids removed between since and version."""
+    logger = getLogger()
+    logger.info("Getting name changes from version %s to %s...", since, version)
+    latest = {}
+    for change in get_storage().get_changes(since, version, mode):
+        latest[change["vehicle_id"]] = change
+    return {
+        "version": version,
+        "names": [{"_id": vehicle_id, "name": c["name"]} for vehicle_id, c in latest.items()
+                  if c["change"] != "removed"],
+        "removed": [vehicle_id for vehicle_id, c in latest.items() if c["change"] == "removed"]
+    }
+
+
 if __name__ == "__main__":
     load_dotenv()
     data = get_objects("all")
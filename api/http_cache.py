@@ -0,0 +1,100 @@
+"""Module for HTTP caching headers and an LRU of pre-encoded response bodies."""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from gzip import compress
+from hashlib import sha256
+from json import dumps
+from time import monotonic
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+MAX_ENTRIES = 512
+MIN_GZIP_BYTES = 1024
+EMPTY_TTL = 60
+EMPTY_CACHE_CONTROL = f"public, max-age={EMPTY_TTL}"
+
+
+class CachedBody:
+    """JSON body encoded once, with a gzip copy when it is worth compressing."""
+
+    def __init__(self, content, ttl: float = None):
+        self.empty = content is None
+        if self.empty:
+            ttl = EMPTY_TTL if ttl is None else min(ttl, EMPTY_TTL)
+        self.body = dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+        self.etag = sha256(self.body).hexdigest()[:32]
+        self.gzipped = compress(self.body, 6) if len(self.body) >= MIN_GZIP_BYTES else None
+        self.expires = monotonic() + ttl if ttl is not None else None
+
+    def is_fresh(self) -> bool:
+        """Return true if the body has not passed its server side expiry."""
+        return self.expires is None or monotonic() < self.expires
+
+
+_cache = OrderedDict()
+
+
+def clear_cache():
+    """Remove every cached body."""
+    _cache.clear()
+
+
+def get_seconds_to_midnight(now: datetime = None) -> int:
+    """Return whole seconds until the daily pick rolls over."""
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def get_fresh_body(key: tuple) -> CachedBody | None:
+    """Return body for key from the LRU if it has not expired."""
+    entry = _cache.get(key)
+    if entry is not None and entry.is_fresh():
+        _cache.move_to_end(key)
+        return entry
+    return None
+
+
+def store_body(key: tuple, entry: CachedBody) -> CachedBody:
+    """Add body to the LRU under key, evicting the least recently used beyond MAX_ENTRIES."""
+    _cache[key] = entry
+    _cache.move_to_end(key)
+    while len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return entry
+
+
+def get_cached_body(key: tuple, build, ttl: float = None) -> CachedBody:
+    """Return body for key from the LRU, building and encoding it on a miss."""
+    return get_fresh_body(key) or store_body(key, CachedBody(build(), ttl))
+
+
+async def get_cached_body_off_loop(key: tuple, build, ttl: float = None) -> CachedBody:
+    """Return body for key from the LRU, building it on a worker thread on a miss."""
+    entry = get_fresh_body(key)
+    if entry is None:
+        entry = store_body(key, CachedBody(await run_in_threadpool(build), ttl))
+    return entry
+
+
+def get_response(request: Request, entry: CachedBody, cache_control: str) -> Response:
+    """Return response for entry, honouring If-None-Match and Accept-Encoding."""
+    # an empty body may just be unreadable for now, so it is never cached for long
+    if entry.empty:
+        cache_control = EMPTY_CACHE_CONTROL
+    use_gzip = entry.gzipped is not None and \
+        "gzip" in request.headers.get("accept-encoding", "")
+    etag = f'"{entry.etag}-gzip"' if use_gzip else f'"{entry.etag}"'
+    headers = {"Cache-Control": cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in if_none_match or f'"{entry.etag}"' in if_none_match:
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzipped, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
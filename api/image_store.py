@@ -0,0 +1,48 @@
+"""Module for reading pre-rendered blur images from the pipeline image store."""
+
+from os import environ as ENV, stat
+from os.path import join, isfile
+from json import loads
+from re import fullmatch
+from logging import getLogger
+
+_index = {"key": None, "index": {}}
+
+
+def get_store_root() -> str | None:
+    """Return root directory of the image store if configured."""
+    return ENV.get("IMAGE_STORE_PATH")
+
+
+def get_image_path(digest: str) -> str | None:
+    """Return path of stored image for digest if it exists."""
+    root = get_store_root()
+    if not root or not fullmatch(r"[0-9a-f]{64}", digest):
+        return None
+    path = join(root, digest[:2], f"{digest}.webp")
+    return path if isfile(path) else None
+
+
+def get_index() -> dict:
+    """Return identifier to digest index, reloading when the pipeline rewrites it."""
+    root = get_store_root()
+    if not root:
+        return {}
+    path = join(root, "index.json")
+    try:
+        info = stat(path)
+    except FileNotFoundError:
+        return {}
+    key = (path, info.st_mtime_ns)
+    if _index["key"] != key:
+        logger = getLogger()
+        logger.info("Loading image store index: %s", path)
+        with open(path, "r", encoding="utf-8") as f:
+            _index["index"] = loads(f.read())
+        _index["key"] = key
+    return _index["index"]
+
+
+def get_digest(identifier: str, level: str) -> str | None:
+    """Return digest of the stored image for a vehicle at a blur level."""
+    return get_index().get(identifier, {}).get(level)
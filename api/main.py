@@ -1,20 +1,37 @@
 """Module for serving the thundle API endpoints."""
 
-from logging import getLogger, StreamHandler, INFO
-from sys import stdout
+from asyncio import create_task
 from datetime import datetime
 from typing import Literal
+from logging import getLogger
 from bson import ObjectId
 from re import fullmatch
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (FileResponse, RedirectResponse, Response, JSONResponse,
+                               StreamingResponse)
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from pydantic import BaseModel, HttpUrl, Field
 
-from data import (get_date_hash_index, get_objects,
+from data import (get_storage, get_date_hash_index, get_objects,
                   cache_document, get_doc_from_cache,
-                  get_archive)
+                  get_docs_from_cache, cache_documents,
+                  get_archive, get_cached_dates, get_stats,
+                  get_catalogue_version, get_name_delta, VERSION_TTL)
+from catalogue import get_catalogue
+from image_store import get_image_path, get_digest
+from search import get_search_index
+from warmup import start_warmup, get_status
+from profiling import profile_request, get_sample_rate
+from ratelimit import rate_limit
+from async_log import set_logger
+from http_cache import (IMMUTABLE, CachedBody, get_cached_body, get_cached_body_off_loop,
+                        get_response, get_seconds_to_midnight)
+from resilience import (BackendUnavailable, STALE_CACHE_CONTROL, limit_database_time,
+                        remember, recall)
+from rollover import stream_events, run_rollover
 
 
 class Vehicle(BaseModel):
@@ -34,6 +51,9 @@ class Vehicle(BaseModel):
     mode: Literal["ground", "air", "naval", "helicopter"]
     name: str
     description: str | None
+    blur_images: dict[str, str] | None = None
+    clue_description: str | None = None
+    clues: list[str] | None = None
 
 
 class CacheVehicle(BaseModel):
@@ -53,6 +73,9 @@ class CacheVehicle(BaseModel):
     mode: Literal["ground", "air", "naval", "helicopter"]
     name: str
     description: str | None
+    blur_images: dict[str, str] | None = None
+    clue_description: str | None = None
+    clues: list[str] | None = None
     game_mode: str
     data_set: str
     date: str
@@ -69,6 +92,18 @@ class VehicleOption(BaseModel):
         orm_mode = True
 
 
+class NamesDelta(BaseModel):
+    version: int
+    names: list[VehicleOption]
+    removed: list[str]
+
+
+class DailyBundle(BaseModel):
+    date: str
+    picks: dict[str, dict[str, Vehicle]]
+    names: dict[str, list[VehicleOption]] | None = None
+
+
 app = FastAPI()
 
 origins = [
@@ -76,6 +111,8 @@ origins = [
     "https://thundle.onrender.com"
 ]
 
+app.middleware("http")(limit_database_time)
+app.middleware("http")(rate_limit)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -83,12 +120,9 @@ app.add_middleware(
     allow_methods=["GET"],
     allow_headers=["*"]
 )
+app.middleware("http")(profile_request)
 
-load_dotenv()
-
-logger = getLogger()
-logger.setLevel(INFO)
-logger.addHandler(StreamHandler(stdout))
+logger = set_logger()
 
 
 def validate_mode(mode: str) -> bool:
@@ -119,6 +153,20 @@ def validate_date(date: str) -> bool:
     return False
 
 
+def validate_query(query: str) -> bool:
+    """Return true if search query is an accepted value."""
+    if isinstance(query, str):
+        return 0 < len(query.strip()) <= 100
+    return False
+
+
+def validate_level(level: str) -> bool:
+    """Return true if blur level is an accepted value."""
+    if isinstance(level, str):
+        return level in ["blur-lg", "blur-md", "blur-sm", "blur-xs", "blur-none"]
+    return False
+
+
 def get_offset_from_game(game: str) -> int:
     """Return offset integer from game string."""
     game_offset_map = {
@@ -128,6 +176,127 @@ def get_offset_from_game(game: str) -> int:
     return game_offset_map[game]
 
 
+def get_historic_cache_control(date: str) -> tuple[str, float | None]:
+    """Return Cache-Control and server side ttl for an archive date."""
+    try:
+        day = datetime.strptime(date, r"%d_%m_%Y").date()
+    except ValueError:
+        return "public, max-age=60", 60
+    if day < datetime.now().date():
+        return IMMUTABLE, None
+    return "public, max-age=60", 60
+
+
+def get_random_vehicle(mode: str, game: str) -> dict:
+    """Return today's vehicle for mode and game, caching the pick."""
+    document = get_doc_from_cache(mode, game)
+    if document:
+        return document
+    data = get_objects(mode)
+    hash_i = get_date_hash_index(len(data), get_offset_from_game(game))
+    cache_document(data[hash_i], mode, game)
+    logger.info("Random vehicle is: %s", data[hash_i]["_id"])
+    data[hash_i]["_id"] = str(data[hash_i]["_id"])
+    return data[hash_i]
+
+
+def get_daily_picks(pairs: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+    """Return today's vehicle for every (mode, game) pair, caching any new picks."""
+    picks = get_docs_from_cache(pairs)
+    missing = [pair for pair in pairs if pair not in picks]
+    if not missing:
+        return picks
+    objects = {mode: get_objects(mode) for mode in {mode for mode, _ in missing}}
+    new_picks = {}
+    for mode, game in missing:
+        data = objects[mode]
+        hash_i = get_date_hash_index(len(data), get_offset_from_game(game))
+        new_picks[(mode, game)] = data[hash_i]
+    cache_documents(new_picks)
+    for pick in new_picks.values():
+        pick["_id"] = str(pick["_id"])
+    return {**picks, **new_picks}
+
+
+async def prepare_rollover() -> dict:
+    """Pick and cache today's vehicles for every game and mode, returning their ids."""
+    games = ["blur", "clue"]
+    modes = ["all", "ground", "air", "naval", "helicopter"]
+    picks = await run_in_threadpool(get_daily_picks, [(m, g) for g in games for m in modes])
+    max_age = get_seconds_to_midnight()
+    today = datetime.now().date().isoformat()
+    for (mode, game), pick in picks.items():
+        entry = get_cached_body(("random", mode, game, today),
+                                lambda pick=pick: Vehicle(**{**pick, "_id": str(pick["_id"])}),
+                                max_age)
+        remember(("random", mode, game), entry.body, entry.etag, today)
+    return {game: {mode: str(picks[(mode, game)]["_id"]) for mode in modes} for game in games}
+
+
+_rollover = {"task": None}
+
+
+def get_search_documents() -> list[dict]:
+    """Return the documents the search index is built from."""
+    return get_objects("all", fields=["_id", "name", "mode"])
+
+
+async def get_fresh_or_stale(request: Request, key: tuple, stale_key: tuple, build,
+                             ttl: float, cache_control: str, version=None,
+                             capped: bool = False) -> Response:
+    """Return response for key, or while the database is down the last good
+    response for stale_key, which must be for the same version when one is given."""
+    try:
+        entry = await get_cached_body_off_loop(key, build, ttl)
+    except BackendUnavailable:
+        content = recall(stale_key, version)
+        if content is None:
+            raise
+        getLogger().warning("Serving last good response for %s.", stale_key)
+        response = get_response(request, CachedBody(content), STALE_CACHE_CONTROL)
+        response.headers["Warning"] = '110 - "Response is Stale"'
+        return response
+    if not entry.empty:
+        remember(stale_key, entry.body, entry.etag, version, capped)
+    return get_response(request, entry, cache_control)
+
+
+@app.exception_handler(BackendUnavailable)
+async def backend_unavailable(request: Request, exc: BackendUnavailable):
+    getLogger().error("Database unavailable for %s: %s", request.url.path, exc)
+    return JSONResponse({"detail": "Database unavailable."}, status_code=503,
+                        headers={"Retry-After": "30"})
+
+
+@app.on_event("startup")
+async def warm_up():
+    load_dotenv()
+    set_logger()
+    get_sample_rate()
+    start_warmup({
+        "storage": lambda: get_storage().ping(),
+        "catalogue": get_catalogue,
+        "search_index": lambda: get_search_index(get_search_documents),
+        "stats": get_stats,
+        "random": lambda: [get_random_vehicle("all", game) for game in ["blur", "clue"]]
+    })
+    if _rollover["task"] is None:
+        _rollover["task"] = create_task(run_rollover(prepare_rollover))
+
+
+@app.on_event("shutdown")
+async def stop_rollover():
+    if _rollover["task"] is not None:
+        _rollover["task"].cancel()
+        _rollover["task"] = None
+
+
+@app.get("/ready")
+async def ready():
+    status = get_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @app.get("/")
 async def root():
     return {
@@ -148,6 +317,50 @@ async def root():
                     "mode": "all | ground | air | naval | helicopter (default: all)"
                 },
                 "returns": "A single vehicle object"
+            },
+            "/names": {
+                "description": "Get every vehicle name, or only the changes since a catalogue version.",
+                "params": {
+                    "mode": "all | ground | air | naval | helicopter (default: all)",
+                    "since": "Catalogue version from a previous X-Catalogue-Version header (optional)"
+                },
+                "returns": "List of vehicle id and name objects, or names changed and ids removed"
+            },
+            "/search": {
+                "description": "Get the best matching vehicle names for autocomplete.",
+                "params": {
+                    "q": "Search text",
+                    "mode": "all | ground | air | naval | helicopter (default: all)",
+                    "limit": "Integer from 1 to 50 (default: 10)"
+                },
+                "returns": "List of vehicle id and name objects"
+            },
+            "/daily": {
+                "description": "Get today's vehicle for every requested game and mode in one call.",
+                "params": {
+                    "games": "Comma separated blur | clue (default: blur,clue)",
+                    "modes": "Comma separated all | ground | air | naval | helicopter (default: all)",
+                    "names": "true to include the name list for each mode (default: false)"
+                },
+                "returns": "Date, picks keyed by game then mode, and optional names keyed by mode"
+            },
+            "/rollover": {
+                "description": "Stream an event once each new day's vehicles are ready.",
+                "params": {},
+                "returns": "Server-sent rollover events with the date, pick ids by game then mode, and a fetch_after_ms delay"
+            },
+            "/stats": {
+                "description": "Get counts and shares across the vehicle catalogue.",
+                "params": {},
+                "returns": "Summary object computed by the pipeline at load time"
+            },
+            "/image": {
+                "description": "Redirect to a pre-rendered image of a vehicle at a blur level.",
+                "params": {
+                    "id": "Vehicle _id",
+                    "level": "blur-lg | blur-md | blur-sm | blur-xs | blur-none (default: blur-none)"
+                },
+                "returns": "Redirect to an immutable /images/<digest> url"
             }
         },
         "docs": "/docs",
@@ -156,18 +369,52 @@ async def root():
 
 
 @app.get("/random", response_model=Vehicle)
-async def root(mode: str = "all", game: str = "blur"):
+async def root(request: Request, mode: str = "all", game: str = "blur"):
     if not validate_mode(mode):
         raise HTTPException(status_code=400, detail="Mode value not accepted.")
-    document = get_doc_from_cache(mode, game)
-    if document:
-        return document
-    data = get_objects(mode)
-    hash_i = get_date_hash_index(len(data), get_offset_from_game(game))
-    cache_document(data[hash_i], mode, game)
-    logger.info("Random vehicle is: %s", Vehicle(**data[hash_i]))
-    data[hash_i]["_id"] = str(data[hash_i]["_id"])
-    return Vehicle(**data[hash_i])
+    max_age = get_seconds_to_midnight()
+    key = ("random", mode, game, datetime.now().date().isoformat())
+    return await get_fresh_or_stale(request, key, key[:3],
+                                    lambda: Vehicle(**get_random_vehicle(mode, game)),
+                                    max_age, f"public, max-age={max_age}", key[3])
+
+
+@app.get("/daily", response_model=DailyBundle)
+async def root(request: Request, games: str = "blur,clue", modes: str = "all", names: bool = False):
+    game_list = list(dict.fromkeys(games.split(",")))
+    mode_list = list(dict.fromkeys(modes.split(",")))
+    if not all(validate_game(game) for game in game_list):
+        raise HTTPException(status_code=400, detail="Game value not accepted.")
+    if not all(validate_mode(mode) for mode in mode_list):
+        raise HTTPException(status_code=400, detail="Mode value not accepted.")
+
+    def build():
+        pairs = [(mode, game) for game in game_list for mode in mode_list]
+        picks = get_daily_picks(pairs)
+        bundle = {
+            "date": datetime.now().strftime(r"%d_%m_%Y"),
+            "picks": {game: {mode: Vehicle(**picks[(mode, game)]) for mode in mode_list}
+                      for game in game_list}
+        }
+        if names:
+            bundle["names"] = {
+                mode: [VehicleOption(**{**doc, "_id": str(doc["_id"])})
+                       for doc in get_objects(mode, fields=["_id", "name"])]
+                for mode in mode_list
+            }
+        return DailyBundle(**bundle)
+
+    max_age = get_seconds_to_midnight()
+    key = ("daily", tuple(game_list), tuple(mode_list), names, datetime.now().date().isoformat())
+    entry = await get_cached_body_off_loop(key, build, max_age)
+    return get_response(request, entry, f"public, max-age={max_age}")
+
+
+@app.get("/rollover")
+async def root(request: Request):
+    return StreamingResponse(stream_events(request.headers.get("last-event-id")),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.get("/vehicles", response_model=list[Vehicle])
@@ -176,41 +423,113 @@ async def root(mode: str = "all", limit: int = 10):
         raise HTTPException(status_code=400, detail="Mode value not accepted.")
     if not validate_limit(limit):
         raise HTTPException(status_code=400, detail="Limit value not accepted.")
-    documents = get_objects(mode, limit)
+    documents = await run_in_threadpool(get_objects, mode, limit)
     for v in documents:
         v["_id"] = str(v["_id"])
     return [Vehicle(**doc) for doc in documents]
 
 
-@app.get("/names", response_model=list[VehicleOption])
-async def root(mode: str = "all"):
+@app.get("/names", response_model=list[VehicleOption] | NamesDelta)
+async def root(request: Request, response: Response, mode: str = "all", since: int | None = None):
     if not validate_mode(mode):
         raise HTTPException(status_code=400, detail="Mode value not accepted.")
-    documents = get_objects(mode)
-    for v in documents:
-        v["_id"] = str(v["_id"])
-    return [VehicleOption(**doc) for doc in documents]
+    try:
+        version = await run_in_threadpool(get_catalogue_version)
+    except BackendUnavailable:
+        if since is not None:
+            raise
+        version = None
+    if since is not None:
+        if since > version:
+            version = await run_in_threadpool(get_catalogue_version, refresh=True)
+        if since < 0 or since > version:
+            raise HTTPException(status_code=400, detail="Since value not accepted.")
+        response.headers["X-Catalogue-Version"] = str(version)
+        if since == version:
+            return NamesDelta(version=version, names=[], removed=[])
+        return NamesDelta(**await run_in_threadpool(get_name_delta, since, version, mode))
+
+    def build():
+        documents = get_objects(mode, fields=["_id", "name"])
+        return [VehicleOption(**{**doc, "_id": str(doc["_id"])}) for doc in documents]
+
+    names = await get_fresh_or_stale(request, ("names", mode, version), ("names", mode), build,
+                                     VERSION_TTL, "no-cache", version)
+    if version is not None:
+        names.headers["X-Catalogue-Version"] = str(version)
+    return names
+
+
+@app.get("/search", response_model=list[VehicleOption])
+async def root(q: str, mode: str = "all", limit: int = 10):
+    if not validate_query(q):
+        raise HTTPException(status_code=400, detail="Query value not accepted.")
+    if not validate_mode(mode):
+        raise HTTPException(status_code=400, detail="Mode value not accepted.")
+    if not validate_limit(limit) or limit > 50:
+        raise HTTPException(status_code=400, detail="Limit value not accepted.")
+    index = await run_in_threadpool(get_search_index, get_search_documents)
+    return [VehicleOption(**doc) for doc in index.search(q, mode, limit)]
+
+
+@app.get("/stats", response_model=dict)
+async def root():
+    stats = await run_in_threadpool(get_stats)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Statistics not available.")
+    return stats
 
 
 @app.get("/historic", response_model=list[CacheVehicle] | None)
-async def root(date: str = "07_07_2025", game: str = "blur", mode: str = "all"):
+async def root(request: Request, date: str = "07_07_2025", game: str = "blur", mode: str = "all"):
     if not validate_game(game):
         raise HTTPException(status_code=400, detail="Game value not accepted.")
     if not validate_date(date):
         raise HTTPException(status_code=400, detail="Date value not accepted, must be in format, DD_MM_YYYY")
     if not validate_mode(mode):
         raise HTTPException(status_code=400, detail="Mode value not accepted.")
-    documents = get_archive(date, game, mode)
-    if documents:
-        return [CacheVehicle(**doc) for doc in documents]
-    return None
+
+    def build():
+        documents = get_archive(date, game, mode)
+        if documents:
+            return [CacheVehicle(**doc) for doc in documents]
+        return None
+
+    cache_control, ttl = get_historic_cache_control(date)
+    key = ("historic", date, game, mode)
+    return await get_fresh_or_stale(request, key, key, build, ttl, cache_control, capped=True)
 
 
 @app.get("/cached_dates", response_model=list[str] | None)
 async def root(game: str = "blur"):
     if not validate_game(game):
         raise HTTPException(status_code=400, detail="Game value not accepted.")
-    documents = get_archive(None, game)
-    if documents:
-        return sorted(list(set(doc["date"].replace("/", "_") for doc in documents)))
+    dates = await run_in_threadpool(get_cached_dates, game)
+    if dates:
+        return sorted(set(d.replace("/", "_") for d in dates))
     return None
+
+
+@app.get("/images/{digest}")
+async def root(digest: str, request: Request):
+    path = get_image_path(digest)
+    if not path:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{digest}"'
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
+
+@app.get("/image")
+async def root(id: str, level: str = "blur-none"):
+    if not validate_level(level):
+        raise HTTPException(status_code=400, detail="Level value not accepted.")
+    digest = get_digest(id, level)
+    if not digest:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    return RedirectResponse(f"/images/{digest}", status_code=307,
+                            headers={"Cache-Control": "public, max-age=3600"})
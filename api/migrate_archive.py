@@ -0,0 +1,77 @@
+"""Script for migrating full document archive rows to compact vehicle references."""
+
+from logging import getLogger, INFO, StreamHandler
+from re import search
+from sys import stdout
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+from data import CACHE_KEY, get_collection
+
+
+def get_vehicle_id(record: dict, names: dict) -> str | None:
+    """Return vehicle _id for a legacy archive row from its image url or name."""
+    match = search(r"/images/([^/]+)\.png$", str(record.get("image_url", "")))
+    if match:
+        return match.group(1)
+    return names.get(record.get("name"))
+
+
+def remove_duplicates(cache: Collection) -> int:
+    """Delete all but the first archive row of each date and game type, returning how many."""
+    duplicates = []
+    for group in cache.aggregate([
+            {"$sort": {"_id": 1}},
+            {"$group": {"_id": {"date": "$date", "data_set": "$data_set",
+                                "game_mode": "$game_mode"},
+                        "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}}]):
+        duplicates += group["ids"][1:]
+    if duplicates:
+        cache.delete_many({"_id": {"$in": duplicates}})
+    return len(duplicates)
+
+
+def migrate(cache: Collection, vehicles: Collection, retired: Collection) -> dict:
+    """Replace legacy archive rows with compact references, keeping gone vehicles in retired."""
+    logger = getLogger()
+    names = {doc["name"]: doc["_id"] for doc in vehicles.find({}, ["_id", "name"])}
+    live = set(names.values())
+    counts = {"migrated": 0, "unresolved": 0, "retired": 0}
+    for record in cache.find({"vehicle_id": {"$exists": False}}):
+        vehicle_id = get_vehicle_id(record, names)
+        if vehicle_id is None:
+            logger.warning("Could not resolve archive row %s.", record["_id"])
+            counts["unresolved"] += 1
+            continue
+        if vehicle_id not in live:
+            vehicle = {k: v for k, v in record.items()
+                       if k not in ["_id", "date", "data_set", "game_mode"]}
+            retired.update_one({"_id": vehicle_id},
+                               {"$setOnInsert": {**vehicle, "_id": vehicle_id}}, upsert=True)
+            counts["retired"] += 1
+        cache.replace_one({"_id": record["_id"]}, {
+            "date": record["date"],
+            "data_set": record["data_set"],
+            "game_mode": record["game_mode"],
+            "vehicle_id": vehicle_id
+        })
+        counts["migrated"] += 1
+    counts["duplicates"] = remove_duplicates(cache)
+    cache.create_index([("game_mode", ASCENDING), ("data_set", ASCENDING),
+                        ("date", ASCENDING)])
+    cache.create_index(CACHE_KEY, unique=True, name="cache_pick")
+    logger.info("Migrated %s archive rows, %s unresolved, %s of retired vehicles, "
+                "%s duplicates removed.", counts["migrated"], counts["unresolved"],
+                counts["retired"], counts["duplicates"])
+    return counts
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logger = getLogger()
+    logger.setLevel(INFO)
+    logger.addHandler(StreamHandler(stdout))
+    migrate(get_collection("cache"), get_collection("vehicles"), get_collection("retired"))
@@ -0,0 +1,71 @@
+"""Module for sampling profiles of API requests, enabled by environment variables."""
+
+from os import environ as ENV, makedirs
+from os.path import join
+from threading import get_ident
+from datetime import datetime, timezone
+from random import random
+from re import sub
+from logging import getLogger
+
+from fastapi import Request
+
+from sampler import Sampler
+
+PROFILE_HEADER = "x-profile"
+INTERVAL = 0.001
+_settings = {"sample_rate": None}
+
+
+def get_sample_rate() -> float:
+    """Return fraction of requests to profile, read once and 0 if it is not a number."""
+    if _settings["sample_rate"] is None:
+        try:
+            _settings["sample_rate"] = float(ENV.get("PROFILE_SAMPLE_RATE", 0))
+        except ValueError:
+            getLogger().warning("Ignoring PROFILE_SAMPLE_RATE %r, it is not a number.",
+                                ENV["PROFILE_SAMPLE_RATE"])
+            _settings["sample_rate"] = 0.0
+    return _settings["sample_rate"]
+
+
+def reset_profiling():
+    """Reread the settings on the next request."""
+    _settings["sample_rate"] = None
+
+
+def should_profile(request: Request) -> bool:
+    """Return true if profiling is enabled and the request is sampled or asks for it."""
+    if not ENV.get("PROFILE_DIR"):
+        return False
+    token = ENV.get("PROFILE_TOKEN")
+    if token and request.headers.get(PROFILE_HEADER) == token:
+        return True
+    return random() < get_sample_rate()
+
+
+def get_profile_name(request: Request) -> str:
+    """Return file name for a request profile."""
+    timestamp = datetime.now(timezone.utc).strftime(r"%Y%m%dT%H%M%S%fZ")
+    path = sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+    return f"{timestamp}-{request.method}-{path}.collapsed"
+
+
+async def profile_request(request: Request, call_next):
+    """Middleware that samples the event loop thread while a chosen request runs."""
+    if not should_profile(request):
+        return await call_next(request)
+    sampler = Sampler(get_ident(), INTERVAL)
+    sampler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        sampler.stop()
+    name = get_profile_name(request)
+    try:
+        makedirs(ENV["PROFILE_DIR"], exist_ok=True)
+        sampler.write(join(ENV["PROFILE_DIR"], name))
+        response.headers["X-Profile-Id"] = name
+    except OSError as e:
+        getLogger().warning("Could not write profile %s: %s", name, e)
+    return response
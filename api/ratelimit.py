@@ -0,0 +1,114 @@
+"""Module for per client token bucket rate limiting."""
+
+from collections import OrderedDict
+from math import ceil
+from os import environ as ENV
+from time import monotonic
+from logging import getLogger
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+DEFAULT_COSTS = {"/": 0, "/ready": 0, "/names": 10, "/vehicles": 5, "/daily": 3, "/search": 2}
+MAX_KEYS = 10000
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by client and route, held in a bounded LRU."""
+
+    def __init__(self, rate: float, burst: float, costs: dict[str, float] = None,
+                 max_keys: int = MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.costs = costs if costs is not None else DEFAULT_COSTS
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    def take(self, key: tuple, cost: float, now: float = None) -> float:
+        """Spend cost tokens from a bucket, returning 0 or the seconds until it could."""
+        now = monotonic() if now is None else now
+        cost = min(cost, self.burst)
+        tokens, updated = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+    def get_cost(self, route: str) -> float:
+        """Return token cost of a route, one unless configured."""
+        return self.costs.get(route, 1)
+
+
+def get_costs(setting: str | None) -> dict[str, float]:
+    """Return route costs with overrides from a string such as /names=20,/search=1."""
+    costs = dict(DEFAULT_COSTS)
+    for pair in (setting or "").split(","):
+        if "=" in pair:
+            route, cost = pair.split("=", 1)
+            costs[route.strip()] = float(cost)
+    return costs
+
+
+def get_route(path: str) -> str:
+    """Return the first path segment so every image or date shares one bucket."""
+    return "/" + path.lstrip("/").split("/", 1)[0]
+
+
+def get_trusted_hops() -> int:
+    """Return number of proxies in front of the API whose X-Forwarded-For entries are trusted."""
+    setting = ENV.get("RATE_LIMIT_TRUST_PROXY", "")
+    if setting.isdigit():
+        return int(setting)
+    return 1 if setting else 0
+
+
+def get_client_ip(request: Request) -> str:
+    """Return client address, from the X-Forwarded-For entry a trusted proxy appended."""
+    forwarded = request.headers.get("x-forwarded-for")
+    hops = get_trusted_hops()
+    if forwarded and hops:
+        addresses = [address.strip() for address in forwarded.split(",")]
+        if len(addresses) >= hops:
+            return addresses[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+_limiter = {"instance": None}
+
+
+def get_limiter() -> TokenBucketLimiter | None:
+    """Return limiter built from the environment, or None when it is disabled."""
+    if _limiter["instance"] is None:
+        rate = float(ENV.get("RATE_LIMIT_PER_SECOND", 0))
+        if rate <= 0:
+            return None
+        _limiter["instance"] = TokenBucketLimiter(
+            rate, float(ENV.get("RATE_LIMIT_BURST", 50)), get_costs(ENV.get("RATE_LIMIT_COSTS")))
+    return _limiter["instance"]
+
+
+def reset_limiter():
+    """Forget every bucket and reread the settings on the next request."""
+    _limiter["instance"] = None
+
+
+async def rate_limit(request: Request, call_next):
+    """Middleware that answers 429 with Retry-After once a client's bucket is empty."""
+    limiter = get_limiter()
+    if limiter is None:
+        return await call_next(request)
+    route = get_route(request.url.path)
+    client = get_client_ip(request)
+    wait = limiter.take((client, route), limiter.get_cost(route))
+    if wait:
+        getLogger().warning("Rate limited %s on %s for %.1fs.", client, route, wait)
+        return JSONResponse({"detail": "Too many requests."}, status_code=429,
+                            headers={"Retry-After": str(ceil(wait))})
+    return await call_next(request)
@@ -0,0 +1,212 @@
+"""Module for bounding database calls and remembering the last good responses."""
+
+from atexit import register
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import ContextVar
+from json import loads, dumps
+from os import environ as ENV, replace
+from os.path import exists
+from threading import Lock, Timer
+from time import monotonic
+from logging import getLogger
+
+from fastapi import Request
+
+STALE_CACHE_CONTROL = "public, max-age=30"
+PERSIST_DELAY = 1.0
+MAX_CAPPED_ENTRIES = 500
+
+
+class BackendUnavailable(Exception):
+    """Raised when the database is slow, failing or behind an open circuit."""
+
+
+class CircuitBreaker:
+    """Stop calling a failing backend until a cool down has passed."""
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self) -> bool:
+        """Return true if a call may be attempted, letting one through after the cool down."""
+        if self.opened_at is None:
+            return True
+        if monotonic() - self.opened_at >= self.reset_after:
+            self.opened_at = monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        """Close the circuit."""
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold."""
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                getLogger().warning("Opening database circuit after %s failures.", self.failures)
+            self.opened_at = monotonic()
+
+    def reset(self):
+        """Forget every failure."""
+        self.record_success()
+
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="storage")
+_deadline = ContextVar("database_deadline", default=None)
+
+
+def get_request_budget() -> float:
+    """Return seconds every database call of one request may take in total."""
+    return int(ENV.get("DB_BUDGET_MS", 2000)) / 1000
+
+
+async def limit_database_time(request: Request, call_next):
+    """Middleware giving all database calls of a request one shared deadline."""
+    token = _deadline.set(monotonic() + get_request_budget())
+    try:
+        return await call_next(request)
+    finally:
+        _deadline.reset(token)
+
+
+def call_with_budget(call, budget: float, breaker: CircuitBreaker, failures: tuple):
+    """Return result of call, raising BackendUnavailable if it fails or overruns budget
+    or what is left of the request's deadline."""
+    deadline = _deadline.get()
+    if deadline is not None:
+        budget = min(budget, deadline - monotonic())
+        if budget <= 0:
+            raise BackendUnavailable("Request has used up its database time.")
+    if not breaker.allow():
+        raise BackendUnavailable("Database circuit is open.")
+    future = _executor.submit(call)
+    try:
+        result = future.result(timeout=budget)
+    except FutureTimeoutError as e:
+        breaker.record_failure()
+        raise BackendUnavailable(f"Database call took over {budget}s.") from e
+    except failures as e:
+        breaker.record_failure()
+        raise BackendUnavailable(str(e)) from e
+    breaker.record_success()
+    return result
+
+
+class GuardedStorage:
+    """Storage proxy running every call within a time budget behind a circuit breaker."""
+
+    def __init__(self, storage, budget: float, breaker: CircuitBreaker, failures: tuple):
+        self.storage = storage
+        self.budget = budget
+        self.breaker = breaker
+        self.failures = failures
+
+    def __getattr__(self, name):
+        method = getattr(self.storage, name)
+
+        def guarded(*args, **kwargs):
+            return call_with_budget(lambda: method(*args, **kwargs),
+                                    self.budget, self.breaker, self.failures)
+        return guarded
+
+
+_last_good = {"loaded": False, "values": OrderedDict(), "timer": None}
+_last_good_lock = Lock()
+_write_lock = Lock()
+
+
+def get_key(key: tuple) -> str:
+    """Return string form of a response key."""
+    return "|".join(str(part) for part in key)
+
+
+def load_last_good():
+    """Read persisted responses once, if a path is configured."""
+    path = ENV.get("LAST_KNOWN_GOOD_PATH")
+    if not _last_good["loaded"] and path and exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            _last_good["values"].update(loads(f.read()))
+    _last_good["loaded"] = True
+
+
+def persist_last_good():
+    """Write remembered responses to LAST_KNOWN_GOOD_PATH, if one is configured."""
+    path = ENV.get("LAST_KNOWN_GOOD_PATH")
+    with _last_good_lock:
+        _last_good["timer"] = None
+        text = dumps(_last_good["values"], separators=(",", ":"))
+    if path:
+        with _write_lock:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                f.write(text)
+            replace(f"{path}.tmp", path)
+
+
+def schedule_persist():
+    """Persist remembered responses on a timer thread, batching changes made meanwhile."""
+    if ENV.get("LAST_KNOWN_GOOD_PATH") and _last_good["timer"] is None:
+        timer = Timer(PERSIST_DELAY, persist_last_good)
+        timer.daemon = True
+        _last_good["timer"] = timer
+        timer.start()
+
+
+def flush_last_good():
+    """Persist any changes still waiting for their timer."""
+    timer = _last_good["timer"]
+    if timer is not None:
+        timer.cancel()
+        persist_last_good()
+
+
+register(flush_last_good)
+
+
+def remember(key: tuple, body: bytes, etag: str, version=None, capped: bool = False):
+    """Keep a successful response body and the version it is for, persisting it when changed.
+
+    Capped responses are kept in least recently used order and only the newest
+    MAX_CAPPED_ENTRIES of them are remembered."""
+    load_last_good()
+    key = get_key(key)
+    with _last_good_lock:
+        values = _last_good["values"]
+        previous = values.get(key)
+        if previous and previous["etag"] == etag and previous.get("version") == version:
+            values.move_to_end(key)
+            return
+        values[key] = {"etag": etag, "version": version, "body": body.decode("utf-8")}
+        if capped:
+            values[key]["capped"] = True
+        values.move_to_end(key)
+        capped_keys = [k for k, value in values.items() if value.get("capped")]
+        for k in capped_keys[:-MAX_CAPPED_ENTRIES]:
+            del values[k]
+        schedule_persist()
+
+
+def recall(key: tuple, version=None):
+    """Return the last successful response content for key, if any and from version when given."""
+    load_last_good()
+    key = get_key(key)
+    with _last_good_lock:
+        value = _last_good["values"].get(key)
+        if not value or (version is not None and value.get("version") != version):
+            return None
+        _last_good["values"].move_to_end(key)
+    return loads(value["body"])
+
+
+def clear_last_good():
+    """Forget every remembered response."""
+    with _last_good_lock:
+        if _last_good["timer"] is not None:
+            _last_good["timer"].cancel()
+        _last_good.update({"loaded": False, "values": OrderedDict(), "timer": None})
@@ -0,0 +1,90 @@
+"""Module for announcing the daily rollover to clients over server-sent events."""
+
+from asyncio import Queue, QueueFull, sleep, wait_for, TimeoutError as AsyncTimeoutError
+from datetime import datetime
+from json import dumps
+from os import environ as ENV
+from random import random
+from logging import getLogger
+
+from http_cache import get_seconds_to_midnight
+
+KEEP_ALIVE = 15
+RETRY_SECONDS = 30
+MIN_RECONNECT_MS = 3000
+
+_subscribers = set()
+_latest = {"event": None}
+
+
+def get_spread() -> float:
+    """Return seconds over which clients are told to spread their fetches."""
+    return float(ENV.get("ROLLOVER_SPREAD_SECONDS", 60))
+
+
+def get_fetch_hint(spread: float) -> int:
+    """Return a random delay in milliseconds for one client to wait before fetching."""
+    return int(random() * spread * 1000)
+
+
+def format_event(name: str, data: dict, event_id: str = None) -> str:
+    """Return one server-sent event."""
+    lines = [f"event: {name}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def announce(event: dict):
+    """Keep event as the latest rollover and hand it to every open stream."""
+    _latest["event"] = event
+    for queue in list(_subscribers):
+        try:
+            queue.put_nowait(event)
+        except QueueFull:
+            getLogger().warning("Dropped rollover event for a slow stream.")
+    getLogger().info("Announced rollover for %s to %s streams.", event["date"], len(_subscribers))
+
+
+def get_subscriber_count() -> int:
+    """Return number of open streams."""
+    return len(_subscribers)
+
+
+async def stream_events(last_event_id: str = None):
+    """Yield rollover events for one client, each with its own fetch hint."""
+    queue = Queue(maxsize=4)
+    _subscribers.add(queue)
+    spread = get_spread()
+    try:
+        yield f"retry: {MIN_RECONNECT_MS + get_fetch_hint(spread / 4)}\n\n"
+        latest = _latest["event"]
+        if last_event_id and latest and latest["date"] != last_event_id:
+            yield format_event("rollover", {**latest, "fetch_after_ms": get_fetch_hint(spread)},
+                               latest["date"])
+        while True:
+            try:
+                event = await wait_for(queue.get(), KEEP_ALIVE)
+            except AsyncTimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event("rollover", {**event, "fetch_after_ms": get_fetch_hint(spread)},
+                               event["date"])
+    finally:
+        _subscribers.discard(queue)
+
+
+async def run_rollover(prepare):
+    """Prepare each new day's picks just after midnight, then announce them."""
+    logger = getLogger()
+    while True:
+        await sleep(get_seconds_to_midnight() + 1)
+        while True:
+            try:
+                picks = await prepare()
+                break
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Preparing rollover failed, retrying in %ss: %s", RETRY_SECONDS, e)
+                await sleep(RETRY_SECONDS)
+        announce({"date": datetime.now().date().isoformat(), "picks": picks})
@@ -0,0 +1,53 @@
+"""Module for sampling thread stacks into collapsed stack counts."""
+
+from os.path import basename
+from sys import _current_frames
+from threading import Thread, Event, get_ident
+from collections import Counter
+
+
+def get_collapsed_stack(frame) -> str:
+    """Return frame and its callers as one collapsed stack, outermost first."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Sampler:
+    """Background thread that counts collapsed stacks of one thread, or every other thread."""
+
+    def __init__(self, thread_id: int = None, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="sampler", daemon=True)
+
+    def _run(self):
+        own = get_ident()
+        while not self._stop.wait(self.interval):
+            frames = _current_frames()
+            if self.thread_id is not None:
+                frames = {self.thread_id: frames[self.thread_id]} \
+                    if self.thread_id in frames else {}
+            for thread_id, frame in frames.items():
+                if thread_id != own:
+                    self.counts[get_collapsed_stack(frame)] += 1
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        """Write stacks in the collapsed format read by flamegraph tools."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,125 @@
+"""Module for the in-memory vehicle name search index."""
+
+from bisect import bisect_left
+from heapq import nlargest
+from re import sub
+from time import monotonic
+from unicodedata import normalize, combining
+from logging import getLogger
+
+INDEX_TTL = 600
+
+
+def normalise(text: str) -> str:
+    """Return lower case text without diacritics, icon chars or punctuation."""
+    text = normalize("NFKD", text or "")
+    text = "".join(c for c in text if not combining(c))
+    text = sub(r"[^\w]+", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def get_trigrams(text: str) -> set[str]:
+    """Return set of padded trigrams for a compact string."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Prefix and trigram index over vehicle names."""
+
+    def __init__(self, documents: list[dict]):
+        self.documents = []
+        self.keys = []
+        self.compact = []
+        self.prefixes = []
+        self.grams = []
+        self.trigrams = {}
+        for doc in documents:
+            if not doc.get("name"):
+                continue
+            i = len(self.documents)
+            key = normalise(doc["name"])
+            compact = key.replace(" ", "")
+            self.documents.append({"_id": str(doc["_id"]), "name": doc["name"],
+                                   "mode": doc.get("mode")})
+            self.keys.append(key)
+            self.compact.append(compact)
+            for token in {compact, *key.split()}:
+                self.prefixes.append((token, i))
+            self.grams.append(get_trigrams(compact))
+            for gram in self.grams[i]:
+                self.trigrams.setdefault(gram, set()).add(i)
+        self.prefixes.sort()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def get_prefix_hits(self, query: str) -> set[int]:
+        """Return documents with a name or word starting with query."""
+        hits = set()
+        position = bisect_left(self.prefixes, (query, -1))
+        while position < len(self.prefixes):
+            token, i = self.prefixes[position]
+            if not token.startswith(query):
+                break
+            hits.add(i)
+            position += 1
+        return hits
+
+    def get_word_hits(self, words: list[str]) -> set[int]:
+        """Return documents where every query word starts a word of the name."""
+        hits = self.get_prefix_hits(words[0])
+        for word in words[1:]:
+            hits &= self.get_prefix_hits(word)
+        return hits
+
+    def get_fuzzy_hits(self, grams: set[str], mode: str) -> set[int]:
+        """Return documents sharing at least a third of the query trigrams."""
+        counts = {}
+        for gram in grams:
+            for i in self.trigrams.get(gram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        threshold = max(1, len(grams) // 3)
+        return {i for i, count in counts.items() if count >= threshold
+                and (mode == "all" or self.documents[i]["mode"] == mode)}
+
+    def get_score(self, i: int, query: str, compact_query: str, grams: set[str]) -> float:
+        """Return relevance of document i to a normalised query."""
+        if self.keys[i] == query or self.compact[i] == compact_query:
+            return 3.0
+        if self.compact[i].startswith(compact_query):
+            return 2.0 + len(compact_query) / len(self.compact[i])
+        similarity = len(grams & self.grams[i]) / len(grams | self.grams[i])
+        words = self.keys[i].split()
+        if all(any(w.startswith(q) for w in words) for q in query.split()):
+            return 1.0 + similarity
+        return similarity
+
+    def search(self, query: str, mode: str = "all", limit: int = 10) -> list[dict]:
+        """Return the top matching documents for query within mode."""
+        query = normalise(query)
+        compact_query = query.replace(" ", "")
+        if not compact_query:
+            return []
+        candidates = self.get_prefix_hits(compact_query) | self.get_word_hits(query.split())
+        if mode != "all":
+            candidates = {i for i in candidates if self.documents[i]["mode"] == mode}
+        grams = get_trigrams(compact_query)
+        if len(candidates) < limit:
+            candidates |= self.get_fuzzy_hits(grams, mode)
+        scored = ((self.get_score(i, query, compact_query, grams), i) for i in candidates)
+        best = nlargest(limit, scored, key=lambda pair: (pair[0], -len(self.keys[pair[1]])))
+        return [self.documents[i] for score, i in best if score > 0.1]
+
+
+_state = {"index": None, "built": 0.0}
+
+
+def get_search_index(loader) -> SearchIndex:
+    """Return cached search index, rebuilding it from loader when stale."""
+    if _state["index"] is None or monotonic() - _state["built"] > INDEX_TTL:
+        logger = getLogger()
+        logger.info("Building vehicle name search index...")
+        _state["index"] = SearchIndex(loader())
+        _state["built"] = monotonic()
+    return _state["index"]
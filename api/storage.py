@@ -0,0 +1,195 @@
+"""Module for the API storage interface and its embedded SQLite implementation."""
+
+from json import loads
+from sqlite3 import connect, Connection
+from threading import Lock
+from typing import Protocol
+from logging import getLogger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vehicles (
+    _id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vehicles_mode ON vehicles (mode);
+CREATE TABLE IF NOT EXISTS cache (
+    date TEXT NOT NULL,
+    data_set TEXT NOT NULL,
+    game_mode TEXT NOT NULL,
+    vehicle_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_lookup ON cache (game_mode, data_set, date);
+CREATE INDEX IF NOT EXISTS cache_date ON cache (date);
+DELETE FROM cache WHERE rowid NOT IN (
+    SELECT MIN(rowid) FROM cache GROUP BY date, data_set, game_mode
+);
+CREATE UNIQUE INDEX IF NOT EXISTS cache_pick ON cache (date, data_set, game_mode);
+CREATE TABLE IF NOT EXISTS retired (
+    _id TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    _id TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    _id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER NOT NULL,
+    vehicle_id TEXT NOT NULL,
+    change TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mode TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_version ON changes (version);
+"""
+CACHE_COLUMNS = ["date", "data_set", "game_mode", "vehicle_id"]
+CHANGE_COLUMNS = ["version", "vehicle_id", "change", "name", "mode"]
+
+
+class Storage(Protocol):
+    """Operations the API needs from its database."""
+
+    def get_vehicles(self, mode: str, limit: int = None, fields: list[str] = None) -> list[dict]:
+        """Return vehicles for a game mode, or every vehicle for all."""
+
+    def get_vehicles_by_id(self, ids: list) -> list[dict]:
+        """Return vehicles with any of the given ids, including retired ones still archived."""
+
+    def get_cache_records(self, day: str, pairs: list[tuple[str, str]]) -> list[dict]:
+        """Return archive records for a date and any (mode, game) pair."""
+
+    def add_cache_records(self, records: list[dict]):
+        """Store archive records, skipping any game type already archived on that date."""
+
+    def get_archive_records(self, game: str, mode: str, day: str = None) -> list[dict]:
+        """Return archive records for a game type, optionally on one date."""
+
+    def get_cached_dates(self, game: str, mode: str) -> list[str]:
+        """Return every date with an archive record for a game type."""
+
+    def get_stats(self) -> dict | None:
+        """Return the catalogue statistics document."""
+
+    def get_catalogue_version(self) -> int:
+        """Return the current catalogue version, 0 before the first recorded change."""
+
+    def get_changes(self, since: int, until: int, mode: str = "all") -> list[dict]:
+        """Return name changes after since up to until, oldest first."""
+
+    def ping(self):
+        """Raise if the database cannot be reached."""
+
+
+def create_schema(conn: Connection):
+    """Create any missing tables and indexes."""
+    conn.executescript(SCHEMA)
+
+
+def get_projection(document: dict, fields: list[str] | None) -> dict:
+    """Return document limited to fields, always keeping _id like MongoDB."""
+    if not fields:
+        return document
+    return {k: document[k] for k in ["_id", *fields] if k in document}
+
+
+class SQLiteStorage:
+    """Storage in a local SQLite file written by the pipeline."""
+
+    def __init__(self, path: str):
+        self.conn: Connection = connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        create_schema(self.conn)
+        self.lock = Lock()
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Return all rows for a query, serialised across threads."""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def get_vehicles(self, mode: str, limit: int = None, fields: list[str] = None) -> list[dict]:
+        sql = "SELECT document FROM vehicles"
+        params = ()
+        if mode != "all":
+            sql += " WHERE mode = ?"
+            params = (mode,)
+        sql += " ORDER BY rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return [get_projection(loads(row[0]), fields) for row in self.query(sql, params)]
+
+    def get_vehicles_by_id(self, ids: list) -> list[dict]:
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        ids = tuple(str(i) for i in ids)
+        rows = self.query(f"SELECT document FROM vehicles WHERE _id IN ({marks}) UNION ALL "
+                          f"SELECT document FROM retired WHERE _id IN ({marks}) "
+                          "AND _id NOT IN (SELECT _id FROM vehicles)", ids + ids)
+        return [loads(row[0]) for row in rows]
+
+    def get_cache_records(self, day: str, pairs: list[tuple[str, str]]) -> list[dict]:
+        if not pairs:
+            return []
+        match = " OR ".join(["(data_set = ? AND game_mode = ?)"] * len(pairs))
+        params = (day, *[value for pair in pairs for value in pair])
+        rows = self.query(f"SELECT {', '.join(CACHE_COLUMNS)} FROM cache "
+                          f"WHERE date = ? AND ({match}) ORDER BY rowid", params)
+        return [dict(zip(CACHE_COLUMNS, row)) for row in rows]
+
+    def add_cache_records(self, records: list[dict]):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO cache (date, data_set, game_mode, vehicle_id) "
+                "VALUES (?, ?, ?, ?)",
+                [tuple(str(r[c]) for c in CACHE_COLUMNS) for r in records])
+
+    def get_archive_records(self, game: str, mode: str, day: str = None) -> list[dict]:
+        sql = f"SELECT {', '.join(CACHE_COLUMNS)} FROM cache WHERE game_mode = ? AND data_set = ?"
+        params = (game, mode)
+        if day:
+            sql += " AND date = ?"
+            params += (day,)
+        rows = self.query(sql + " ORDER BY rowid", params)
+        return [dict(zip(CACHE_COLUMNS, row)) for row in rows]
+
+    def get_cached_dates(self, game: str, mode: str) -> list[str]:
+        rows = self.query("SELECT DISTINCT date FROM cache WHERE game_mode = ? AND data_set = ?",
+                          (game, mode))
+        return [row[0] for row in rows]
+
+    def get_stats(self) -> dict | None:
+        rows = self.query("SELECT document FROM stats WHERE _id = ?", ("catalogue",))
+        return loads(rows[0][0]) if rows else None
+
+    def get_catalogue_version(self) -> int:
+        rows = self.query("SELECT version FROM versions WHERE _id = ?", ("catalogue",))
+        return rows[0][0] if rows else 0
+
+    def get_changes(self, since: int, until: int, mode: str = "all") -> list[dict]:
+        sql = f"SELECT {', '.join(CHANGE_COLUMNS)} FROM changes WHERE version > ? AND version <= ?"
+        params = (since, until)
+        if mode != "all":
+            sql += " AND mode = ?"
+            params += (mode,)
+        rows = self.query(sql + " ORDER BY version, rowid", params)
+        return [dict(zip(CHANGE_COLUMNS, row)) for row in rows]
+
+    def ping(self):
+        self.query("SELECT 1")
+
+
+_stores = {}
+
+
+def get_sqlite_storage(path: str) -> SQLiteStorage:
+    """Return shared SQLite storage for a path, opening it on first use."""
+    if path not in _stores:
+        logger = getLogger()
+        logger.info("Opening SQLite storage at %s...", path)
+        _stores[path] = SQLiteStorage(path)
+    return _stores[path]
@@ -0,0 +1,52 @@
+"""Module for testing the async_log module."""
+
+from logging import getLogger, DEBUG
+
+from pytest import fixture
+
+import async_log
+from async_log import Truncated, set_logger, stop_logger
+
+
+@fixture
+def queue_logger(monkeypatch):
+    """Return root logger with a fresh queue listener, removed afterwards."""
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    monkeypatch.setattr(async_log, "_listener", {"instance": None, "handler": None})
+    logger = set_logger()
+    yield logger
+    stop_logger()
+    logger.setLevel("WARNING")
+
+
+def test_truncated_summarises_large_documents():
+    """Test that large documents are cut down when formatted."""
+    doc = {f"key_{i}": "x" * 500 for i in range(50)}
+    text = str(Truncated(doc))
+    assert len(text) < 1000
+    assert text.endswith("...}")
+
+
+def test_truncated_not_formatted_below_level():
+    """Test that debug arguments are never formatted at info level."""
+    class Exploding:
+        def __repr__(self):
+            raise AssertionError("formatted")
+
+    getLogger("quiet").setLevel("INFO")
+    getLogger("quiet").debug("%s", Truncated(Exploding()))
+
+
+def test_set_logger_installs_one_handler(queue_logger):
+    """Test that setting the logger twice adds one queue handler."""
+    set_logger()
+    assert queue_logger.level == DEBUG
+    assert queue_logger.handlers.count(async_log._listener["handler"]) == 1
+
+
+def test_set_logger_writes_through_queue(capfd, monkeypatch):
+    """Test that records reach stdout through the listener thread."""
+    monkeypatch.setattr(async_log, "_listener", {"instance": None, "handler": None})
+    set_logger().info("queued %s", "message")
+    stop_logger()
+    assert "INFO test_async_log: queued message" in capfd.readouterr().out
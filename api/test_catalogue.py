@@ -0,0 +1,95 @@
+"""Module for testing the catalogue module."""
+
+from json import dumps
+
+from pyarrow import table, OSFile
+from pyarrow.ipc import new_file
+
+from catalogue import Catalogue, open_catalogue, get_catalogue
+
+
+def get_mock_table():
+    """Return a table laid out the way the pipeline publishes it."""
+    data = table({
+        "_id": ["f-16c", "p-51", "m1_abrams"],
+        "mode": ["air", "air", "ground"],
+        "name": ["F-16C", "P-51", "M1 Abrams"],
+        "_id_order": [0, 2, 1]
+    })
+    return data.replace_schema_metadata({
+        "mode_ranges": dumps({"air": [0, 2], "ground": [2, 1]})
+    })
+
+
+def write_mock_catalogue(path):
+    """Write the mock table as an arrow ipc file."""
+    data = get_mock_table()
+    with OSFile(str(path), "wb") as sink:
+        with new_file(sink, data.schema) as writer:
+            writer.write_table(data)
+
+
+def test_get_rows_by_mode():
+    """Test that rows are sliced by their mode range."""
+    catalogue = Catalogue(get_mock_table())
+    rows = catalogue.get_rows("air")
+    assert [row["_id"] for row in rows] == ["f-16c", "p-51"]
+    assert "_id_order" not in rows[0]
+
+
+def test_get_rows_limit_and_fields():
+    """Test that rows can be limited and projected."""
+    catalogue = Catalogue(get_mock_table())
+    rows = catalogue.get_rows("all", 2, ["_id", "name"])
+    assert rows == [{"_id": "f-16c", "name": "F-16C"}, {"_id": "p-51", "name": "P-51"}]
+
+
+def test_get_rows_all_in_database_order():
+    """Test that every row is returned in database order when the source order is published."""
+    data = get_mock_table()
+    catalogue = Catalogue(data.append_column("_source_order", [[2, 0, 1]]))
+    assert [row["_id"] for row in catalogue.get_rows("all")] == ["m1_abrams", "f-16c", "p-51"]
+    assert catalogue.get_rows("all", 1, ["_id"]) == [{"_id": "m1_abrams"}]
+    assert "_source_order" not in catalogue.get_rows("air")[0]
+
+
+def test_get_rows_unknown_mode():
+    """Test that a mode with no vehicles returns no rows."""
+    catalogue = Catalogue(get_mock_table())
+    assert catalogue.get_rows("naval") == []
+
+
+def test_get_by_id():
+    """Test that documents are found through the id index."""
+    catalogue = Catalogue(get_mock_table())
+    assert catalogue.get_by_id("m1_abrams")["name"] == "M1 Abrams"
+    assert catalogue.get_by_id("p-51")["mode"] == "air"
+    assert catalogue.get_by_id("missing") is None
+
+
+def test_open_catalogue(tmp_path):
+    """Test that a published file is memory mapped into a catalogue."""
+    path = tmp_path / "catalogue.arrow"
+    write_mock_catalogue(path)
+    catalogue = open_catalogue(str(path))
+    assert len(catalogue) == 3
+
+
+def test_get_catalogue_unset(monkeypatch):
+    """Test that no catalogue is returned without a configured path."""
+    monkeypatch.delenv("CATALOGUE_PATH", raising=False)
+    assert get_catalogue() is None
+
+
+def test_get_catalogue_missing_file(monkeypatch, tmp_path):
+    """Test that no catalogue is returned before the pipeline publishes one."""
+    monkeypatch.setenv("CATALOGUE_PATH", str(tmp_path / "missing.arrow"))
+    assert get_catalogue() is None
+
+
+def test_get_catalogue_reuses_mapping(monkeypatch, tmp_path):
+    """Test that the catalogue is only remapped when the file changes."""
+    path = tmp_path / "catalogue.arrow"
+    write_mock_catalogue(path)
+    monkeypatch.setenv("CATALOGUE_PATH", str(path))
+    assert get_catalogue() is get_catalogue()
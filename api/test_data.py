@@ -1,12 +1,21 @@
 """Module for testing the data module."""
 
 from unittest.mock import patch, MagicMock
+from time import sleep
 
 from freezegun import freeze_time
-from bson import ObjectId
+from pytest import raises
+from pymongo.errors import BulkWriteError
+from pymongo.operations import UpdateOne
 
-from data import (get_collection, get_date_hash_index, get_objects,
-                  cache_document, get_doc_from_cache, get_archive)
+from data import (get_client, get_collection, get_date_hash_index, get_objects,
+                  cache_document, get_doc_from_cache, get_archive, get_stats,
+                  get_docs_from_cache, cache_documents, resolve_references,
+                  get_vehicles_by_id, get_cached_dates, get_storage,
+                  get_name_delta, get_catalogue_version, reset_breaker)
+from storage import SQLiteStorage
+from resilience import BackendUnavailable
+import data
 
 
 @patch("data.MongoClient")
@@ -19,6 +28,14 @@ def test_get_collection(mock_mongo_client):
         mock_db.__getitem__.assert_called_once_with("test_collection")
 
 
+@patch("data.MongoClient")
+def test_get_client_is_shared(mock_mongo_client):
+    """Test that the get_client function reuses one client per connection string."""
+    with patch.dict("data.ENV", {"DB_CONN_STRING": "shared_str"}):
+        assert get_client() is get_client()
+    mock_mongo_client.assert_called_once()
+
+
 @freeze_time("2025-07-08")
 def test_get_date_hash_index():
     """Test that the get_date_hash_index function returns a valid index."""
@@ -41,23 +58,74 @@ def test_get_objects(mock_get_collection):
     mock_collection.find.return_value.limit.assert_called_once_with(1)
 
 
+@patch("data.get_collection")
+@patch("data.get_catalogue")
+def test_get_objects_from_catalogue(mock_get_catalogue, mock_get_collection):
+    """Test that the get_objects function prefers the published catalogue."""
+    mock_get_catalogue.return_value.get_rows.return_value = [{"name": "test"}]
+
+    objects = get_objects("air", fields=["_id", "name"])
+    assert objects[0]["name"] == "test"
+    mock_get_catalogue.return_value.get_rows.assert_called_once_with("air", None, ["_id", "name"])
+    mock_get_collection.assert_not_called()
+
+
+@patch("data.get_collection")
+def test_get_objects_with_fields(mock_get_collection):
+    """Test that the get_objects function projects requested fields from MongoDB."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = [{"_id": "test", "name": "test"}]
+    mock_get_collection.return_value = mock_collection
+
+    get_objects("ground", fields=["_id", "name"])
+    mock_collection.find.assert_called_once_with({"mode": "ground"}, ["_id", "name"])
+
+
 @patch("data.get_collection")
 def test_cache_document(mock_get_collection):
-    """Test that the cache_document function inserts a document."""
+    """Test that the cache_document function inserts a compact reference."""
     mock_collection = MagicMock()
     mock_get_collection.return_value = mock_collection
-    test_doc = {"_id": ObjectId(), "name": "test"}
+    test_doc = {"_id": "p-51", "name": "test", "description": "A long description."}
 
     with freeze_time("2025-07-08"):
         cache_document(test_doc, "all", "blur")
     
     expected_doc = {
-        "name": "test",
         "date": "08/07/2025",
         "data_set": "all",
-        "game_mode": "blur"
+        "game_mode": "blur",
+        "vehicle_id": "p-51"
     }
-    mock_collection.insert_one.assert_called_once_with(expected_doc)
+    mock_collection.bulk_write.assert_called_once_with([UpdateOne(
+        {"date": "08/07/2025", "data_set": "all", "game_mode": "blur"},
+        {"$setOnInsert": expected_doc}, upsert=True)], ordered=False)
+    assert test_doc["_id"] == "p-51"
+
+
+@patch("data.get_collection")
+def test_cache_document_lost_race(mock_get_collection):
+    """Test that losing an archive race to another worker on the unique index is not an error."""
+    mock_collection = MagicMock()
+    mock_collection.bulk_write.side_effect = BulkWriteError(
+        {"writeErrors": [{"code": 11000, "errmsg": "E11000 duplicate key"}]})
+    mock_get_collection.return_value = mock_collection
+    with patch.dict(data._cache_index, {"created": False}):
+        cache_document({"_id": "p-51"}, "all", "blur")
+    mock_collection.create_index.assert_called_once_with(
+        [("date", 1), ("data_set", 1), ("game_mode", 1)], unique=True, name="cache_pick")
+
+
+@patch("data.get_collection")
+def test_cache_document_other_write_errors(mock_get_collection):
+    """Test that archive write errors other than duplicates are raised."""
+    mock_collection = MagicMock()
+    mock_collection.bulk_write.side_effect = BulkWriteError(
+        {"writeErrors": [{"code": 121, "errmsg": "Document failed validation"}]})
+    mock_get_collection.return_value = mock_collection
+    with raises(BackendUnavailable):
+        cache_document({"_id": "p-51"}, "all", "blur")
+    reset_breaker()
 
 
 @patch("data.get_collection")
@@ -80,6 +148,50 @@ def test_get_doc_from_cache(mock_get_collection):
     mock_collection.find.assert_called_once_with(expected_query)
 
 
+@patch("data.get_collection")
+def test_get_docs_from_cache(mock_get_collection):
+    """Test that the get_docs_from_cache function finds many pairs in one query."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = [
+        {"name": "a", "data_set": "all", "game_mode": "blur"},
+        {"name": "b", "data_set": "air", "game_mode": "clue"}
+    ]
+    mock_get_collection.return_value = mock_collection
+
+    with freeze_time("2025-07-08"):
+        docs = get_docs_from_cache([("all", "blur"), ("air", "clue"), ("naval", "blur")])
+
+    assert docs[("all", "blur")]["name"] == "a"
+    assert docs[("air", "clue")]["name"] == "b"
+    assert ("naval", "blur") not in docs
+    mock_collection.find.assert_called_once_with({
+        "date": "08/07/2025",
+        "$or": [
+            {"data_set": "all", "game_mode": "blur"},
+            {"data_set": "air", "game_mode": "clue"},
+            {"data_set": "naval", "game_mode": "blur"}
+        ]
+    })
+
+
+@patch("data.get_collection")
+def test_cache_documents(mock_get_collection):
+    """Test that the cache_documents function upserts every pick in one write."""
+    mock_collection = MagicMock()
+    mock_get_collection.return_value = mock_collection
+    doc = {"_id": "p-51", "name": "test"}
+
+    with freeze_time("2025-07-08"):
+        cache_documents({("all", "blur"): doc, ("all", "clue"): doc})
+
+    mock_collection.bulk_write.assert_called_once_with([
+        UpdateOne({"date": "08/07/2025", "data_set": "all", "game_mode": game},
+                  {"$setOnInsert": {"date": "08/07/2025", "data_set": "all", "game_mode": game,
+                                    "vehicle_id": "p-51"}}, upsert=True)
+        for game in ["blur", "clue"]
+    ], ordered=False)
+
+
 @patch("data.get_collection")
 def test_get_archive_with_date(mock_get_collection):
     """Test that the get_archive function returns a list of documents for a specific date."""
@@ -115,3 +227,138 @@ def test_get_archive_no_date(mock_get_collection):
         "data_set": "all"
     }
     mock_collection.find.assert_called_once_with(expected_query)
+
+
+
+@patch("data.get_collection")
+def test_get_cached_dates(mock_get_collection):
+    """Test that the get_cached_dates function only reads distinct dates."""
+    mock_collection = MagicMock()
+    mock_collection.distinct.return_value = ["08/07/2025"]
+    mock_get_collection.return_value = mock_collection
+
+    assert get_cached_dates("clue") == ["08/07/2025"]
+    mock_collection.distinct.assert_called_once_with(
+        "date", {"game_mode": "clue", "data_set": "all"})
+
+
+@patch("data.get_collection")
+def test_get_vehicles_by_id(mock_get_collection):
+    """Test that the get_vehicles_by_id function uses one batched query."""
+    mock_collection = MagicMock()
+    mock_collection.find.return_value = [{"_id": "p-51", "name": "P-51"},
+                                         {"_id": "a-20g", "name": "A-20G"}]
+    mock_get_collection.return_value = mock_collection
+
+    vehicles = get_vehicles_by_id(["p-51", "p-51", "a-20g"])
+    assert vehicles["p-51"] == {"_id": "p-51", "name": "P-51"}
+    mock_collection.find.assert_called_once_with({"_id": {"$in": ["p-51", "a-20g"]}})
+
+
+@patch("data.get_collection")
+def test_get_vehicles_by_id_includes_retired(mock_get_collection):
+    """Test that vehicles removed from the catalogue are found in the retired collection."""
+    collections = {"vehicles": MagicMock(), "retired": MagicMock()}
+    collections["vehicles"].find.return_value = [{"_id": "p-51", "name": "P-51"}]
+    collections["retired"].find.return_value = [{"_id": "gone", "name": "Gone"}]
+    mock_get_collection.side_effect = lambda name="vehicles": collections[name]
+
+    vehicles = get_vehicles_by_id(["p-51", "gone"])
+    assert vehicles["gone"] == {"_id": "gone", "name": "Gone"}
+    collections["retired"].find.assert_called_once_with({"_id": {"$in": ["gone"]}})
+
+
+@patch("data.get_storage")
+@patch("data.get_catalogue")
+def test_get_vehicles_by_id_from_catalogue(mock_get_catalogue, mock_get_storage):
+    """Test that only vehicles missing from the catalogue are looked up in storage."""
+    mock_get_catalogue.return_value.get_by_id.side_effect = \
+        lambda i: {"_id": i, "name": "P-51"} if i == "p-51" else None
+    mock_get_storage.return_value.get_vehicles_by_id.return_value = [{"_id": "gone"}]
+
+    assert set(get_vehicles_by_id(["p-51", "gone"])) == {"p-51", "gone"}
+    mock_get_storage.return_value.get_vehicles_by_id.assert_called_once_with(["gone"])
+
+
+@patch("data.get_vehicles_by_id")
+def test_resolve_references(mock_get_vehicles_by_id):
+    """Test that references are joined and legacy full copies pass through."""
+    mock_get_vehicles_by_id.return_value = {"p-51": {"_id": "p-51", "name": "P-51"}}
+    records = [
+        {"date": "08/07/2025", "data_set": "all", "game_mode": "blur", "vehicle_id": "p-51"},
+        {"date": "07/07/2025", "data_set": "all", "game_mode": "blur", "name": "Legacy"},
+        {"date": "06/07/2025", "data_set": "all", "game_mode": "blur", "vehicle_id": "gone"}
+    ]
+
+    documents = resolve_references(records)
+    assert documents == [
+        {"_id": "p-51", "name": "P-51", "date": "08/07/2025",
+         "data_set": "all", "game_mode": "blur"},
+        records[1]
+    ]
+    mock_get_vehicles_by_id.assert_called_once_with(["p-51", "gone"])
+
+
+@patch("data.get_collection")
+def test_get_stats_held_in_memory(mock_get_collection):
+    """Test that the get_stats function reads the summary once between refreshes."""
+    mock_collection = MagicMock()
+    mock_collection.find_one.return_value = {"_id": "catalogue", "total": 2}
+    mock_get_collection.return_value = mock_collection
+
+    with patch.dict(data._stats, {"document": None, "fetched": 0.0}):
+        assert get_stats()["total"] == 2
+        assert get_stats()["total"] == 2
+
+    mock_get_collection.assert_called_once_with("stats")
+    mock_collection.find_one.assert_called_once_with({"_id": "catalogue"})
+
+
+@patch("data.get_collection")
+def test_get_catalogue_version_refresh(mock_get_collection):
+    """Test that a refresh rereads the catalogue version within the hold time."""
+    mock_collection = MagicMock()
+    mock_collection.find_one.side_effect = [{"version": 4}, {"version": 5}]
+    mock_get_collection.return_value = mock_collection
+
+    with patch.dict(data._version, {"value": None, "fetched": 0.0}):
+        assert get_catalogue_version() == 4
+        assert get_catalogue_version() == 4
+        assert get_catalogue_version(refresh=True) == 5
+
+    assert mock_collection.find_one.call_count == 2
+
+
+def test_get_storage_sqlite(monkeypatch, tmp_path):
+    """Test that SQLITE_PATH selects the embedded storage."""
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "thundle.db"))
+    assert isinstance(get_storage().storage, SQLiteStorage)
+    assert get_storage().storage is get_storage().storage
+
+
+@patch("data.get_storage")
+def test_get_name_delta(mock_get_storage):
+    """Test that the latest change per vehicle wins."""
+    mock_get_storage.return_value.get_changes.return_value = [
+        {"version": 2, "vehicle_id": "p-51", "change": "added", "name": "P-51", "mode": "air"},
+        {"version": 3, "vehicle_id": "p-51", "change": "renamed", "name": "P-51D", "mode": "air"},
+        {"version": 3, "vehicle_id": "a-20g", "change": "removed", "name": "A-20G", "mode": "air"},
+    ]
+    assert get_name_delta(1, 3, "air") == {
+        "version": 3,
+        "names": [{"_id": "p-51", "name": "P-51D"}],
+        "removed": ["a-20g"]
+    }
+    mock_get_storage.return_value.get_changes.assert_called_once_with(1, 3, "air")
+
+
+def test_get_storage_times_out_slow_database(monkeypatch, tmp_path):
+    """Test that a stalled database call is abandoned at the budget."""
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "thundle.db"))
+    monkeypatch.setenv("DB_BUDGET_MS", "50")
+    reset_breaker()
+    storage = get_storage()
+    monkeypatch.setattr(storage.storage, "get_stats", lambda: sleep(0.5))
+    with raises(BackendUnavailable):
+        get_storage().get_stats()
+    reset_breaker()
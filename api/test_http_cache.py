@@ -0,0 +1,73 @@
+"""Module for testing the http_cache module."""
+
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from freezegun import freeze_time
+
+from http_cache import (CachedBody, clear_cache, get_cached_body, get_response,
+                        get_seconds_to_midnight)
+
+
+def get_request(headers: dict = None):
+    """Return a mock request with the given headers."""
+    request = MagicMock()
+    request.headers = headers or {}
+    return request
+
+
+def test_get_seconds_to_midnight():
+    """Test that max age runs to the next midnight."""
+    assert get_seconds_to_midnight(datetime(2025, 7, 8, 23, 0, 0)) == 3600
+    assert get_seconds_to_midnight(datetime(2025, 7, 8, 23, 59, 59, 900000)) == 1
+
+
+def test_cached_body_only_gzips_large_bodies():
+    """Test that small bodies are not compressed."""
+    assert CachedBody({"a": 1}).gzipped is None
+    assert CachedBody({"a": "x" * 2000}).gzipped is not None
+
+
+def test_get_cached_body_builds_once():
+    """Test that a fresh body is reused rather than rebuilt."""
+    clear_cache()
+    build = MagicMock(return_value={"name": "test"})
+    first = get_cached_body(("key",), build, 60)
+    assert get_cached_body(("key",), build, 60) is first
+    build.assert_called_once()
+
+
+def test_get_cached_body_expires():
+    """Test that bodies are rebuilt after their ttl."""
+    clear_cache()
+    build = MagicMock(return_value={"name": "test"})
+    with freeze_time("2025-07-08 12:00:00") as frozen:
+        get_cached_body(("key",), build, 60)
+        frozen.tick(61)
+        get_cached_body(("key",), build, 60)
+    assert build.call_count == 2
+
+
+def test_get_response_not_modified():
+    """Test that a matching etag returns 304 without a body."""
+    entry = CachedBody({"name": "test"})
+    response = get_response(get_request({"if-none-match": f'"{entry.etag}"'}), entry, "public")
+    assert response.status_code == 304
+    assert response.body == b""
+
+
+def test_get_response_gzip():
+    """Test that large bodies are sent compressed when accepted."""
+    entry = CachedBody({"a": "x" * 2000})
+    response = get_response(get_request({"accept-encoding": "gzip, br"}), entry, "public")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.body == entry.gzipped
+    assert response.headers["etag"].endswith('-gzip"')
+
+
+def test_empty_body_cached_briefly():
+    """Test that an empty body is never held or sent as long lived."""
+    entry = CachedBody(None)
+    assert entry.expires is not None
+    response = get_response(get_request(), entry, "public, max-age=31536000, immutable")
+    assert response.headers["cache-control"] == "public, max-age=60"
@@ -0,0 +1,44 @@
+"""Module for testing the image_store module."""
+
+from json import dumps
+
+from image_store import get_image_path, get_digest
+
+DIGEST = "ab" + "0" * 62
+
+
+def write_store(root):
+    """Write a store containing a single image and index entry."""
+    (root / "ab").mkdir()
+    (root / "ab" / f"{DIGEST}.webp").write_bytes(b"webp")
+    (root / "index.json").write_text(dumps({"p-51": {"blur-lg": DIGEST}}))
+
+
+def test_get_image_path(monkeypatch, tmp_path):
+    """Test that a stored digest resolves to its file."""
+    write_store(tmp_path)
+    monkeypatch.setenv("IMAGE_STORE_PATH", str(tmp_path))
+    assert get_image_path(DIGEST) == str(tmp_path / "ab" / f"{DIGEST}.webp")
+
+
+def test_get_image_path_rejects_bad_digest(monkeypatch, tmp_path):
+    """Test that digests which are not sha256 hex are rejected."""
+    write_store(tmp_path)
+    monkeypatch.setenv("IMAGE_STORE_PATH", str(tmp_path))
+    assert get_image_path("../index.json") is None
+    assert get_image_path("cd" + "0" * 62) is None
+
+
+def test_get_image_path_unset(monkeypatch):
+    """Test that no image is returned without a configured store."""
+    monkeypatch.delenv("IMAGE_STORE_PATH", raising=False)
+    assert get_image_path(DIGEST) is None
+
+
+def test_get_digest(monkeypatch, tmp_path):
+    """Test that the index maps a vehicle and level to a digest."""
+    write_store(tmp_path)
+    monkeypatch.setenv("IMAGE_STORE_PATH", str(tmp_path))
+    assert get_digest("p-51", "blur-lg") == DIGEST
+    assert get_digest("p-51", "blur-sm") is None
+    assert get_digest("missing", "blur-lg") is None
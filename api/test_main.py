@@ -1,12 +1,26 @@
 """Module for testing the main module."""
 
+import asyncio
 from unittest.mock import patch
 from fastapi.testclient import TestClient
+from freezegun import freeze_time
+from pytest import fixture, raises
 from bson import ObjectId
-from main import app
+from main import app, prepare_rollover, stop_rollover, _rollover
+from http_cache import clear_cache
+from ratelimit import reset_limiter
+from resilience import BackendUnavailable, clear_last_good
 
 client = TestClient(app)
 
+
+@fixture(autouse=True)
+def clear_response_cache():
+    """Start every test with an empty response cache, rate limiter and last good store."""
+    clear_cache()
+    reset_limiter()
+    clear_last_good()
+
 def get_mock_vehicle():
     """Return a mock vehicle."""
     return {
@@ -29,6 +43,23 @@ def get_mock_vehicle():
     }
 
 
+@patch("main.get_status")
+def test_ready(mock_get_status):
+    """Test the ready endpoint once warm up has finished."""
+    mock_get_status.return_value = {"ready": True, "running": False, "steps_ms": {}, "errors": {}}
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+
+@patch("main.get_status")
+def test_ready_warming(mock_get_status):
+    """Test the ready endpoint while warm up is still running."""
+    mock_get_status.return_value = {"ready": False, "running": True, "steps_ms": {}, "errors": {}}
+    response = client.get("/ready")
+    assert response.status_code == 503
+
+
 def test_root():
     """Test the root endpoint."""
     response = client.get("/")
@@ -63,6 +94,91 @@ def test_random_with_cache(mock_get_doc_from_cache):
     assert json_response["name"] == "Test Plane"
 
 
+@patch("main.get_doc_from_cache")
+def test_random_clue_payload(mock_get_doc_from_cache):
+    """Test the random endpoint serves the precomputed clue payload."""
+    mock_get_doc_from_cache.return_value = {**get_mock_vehicle(),
+                                            "clue_description": "A ??? plane.",
+                                            "clues": ["A ??? plane."]}
+    response = client.get("/random?game=clue")
+    assert response.json()["clue_description"] == "A ??? plane."
+    assert response.json()["clues"] == ["A ??? plane."]
+
+
+@patch("main.get_doc_from_cache")
+def test_random_cache_headers(mock_get_doc_from_cache):
+    """Test the random endpoint is cached until midnight and served from memory."""
+    mock_get_doc_from_cache.return_value = get_mock_vehicle()
+    with freeze_time("2025-07-08 23:00:00"):
+        response = client.get("/random")
+        repeat = client.get("/random", headers={"If-None-Match": response.headers["etag"]})
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    assert repeat.status_code == 304
+    mock_get_doc_from_cache.assert_called_once()
+
+
+@patch("main.get_doc_from_cache")
+def test_random_serves_last_good_when_database_down(mock_get_doc_from_cache):
+    """Test the random endpoint serves today's pick while the database is unavailable."""
+    mock_get_doc_from_cache.return_value = get_mock_vehicle()
+    with freeze_time("2025-07-08 12:00:00"):
+        client.get("/random")
+    clear_cache()
+    mock_get_doc_from_cache.side_effect = BackendUnavailable("timed out")
+    with freeze_time("2025-07-08 13:00:00"):
+        response = client.get("/random")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Test Plane"
+    assert response.headers["cache-control"] == "public, max-age=30"
+    assert "Stale" in response.headers["warning"]
+
+
+@patch("main.get_doc_from_cache")
+def test_random_does_not_serve_yesterdays_pick(mock_get_doc_from_cache):
+    """Test the random endpoint answers 503 rather than serve an earlier day's pick."""
+    mock_get_doc_from_cache.return_value = get_mock_vehicle()
+    with freeze_time("2025-07-08 12:00:00"):
+        client.get("/random")
+    mock_get_doc_from_cache.side_effect = BackendUnavailable("timed out")
+    with freeze_time("2025-07-09 12:00:00"):
+        response = client.get("/random")
+    assert response.status_code == 503
+
+
+@patch("main.get_doc_from_cache", side_effect=BackendUnavailable("circuit open"))
+def test_random_unavailable_without_last_good(mock_get_doc_from_cache):
+    """Test the random endpoint answers 503 when nothing good is remembered."""
+    response = client.get("/random")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+
+
+def test_stop_rollover_cancels_task():
+    """Test that shutting down cancels the rollover task."""
+    async def run():
+        task = asyncio.create_task(asyncio.sleep(60))
+        _rollover["task"] = task
+        await stop_rollover()
+        assert _rollover["task"] is None
+        with raises(asyncio.CancelledError):
+            await task
+    asyncio.run(run())
+
+
+@patch("main.get_doc_from_cache")
+@patch("main.get_daily_picks")
+def test_prepare_rollover_caches_random(mock_get_daily_picks, mock_get_doc_from_cache):
+    """Test that the rollover precomputes every /random body and returns the pick ids."""
+    mock_get_daily_picks.side_effect = lambda pairs: {pair: get_mock_vehicle() for pair in pairs}
+    with freeze_time("2025-07-09 00:00:01"):
+        picks = asyncio.run(prepare_rollover())
+        response = client.get("/random?mode=air&game=clue")
+    assert picks["clue"]["air"] == "60c72b9f9b1d8e001f8e4c6d"
+    assert set(picks["blur"]) == {"all", "ground", "air", "naval", "helicopter"}
+    assert response.json()["name"] == "Test Plane"
+    mock_get_doc_from_cache.assert_not_called()
+
+
 def test_random_invalid_mode():
     """Test the random endpoint with an invalid mode."""
     response = client.get("/random?mode=invalid")
@@ -70,6 +186,55 @@ def test_random_invalid_mode():
     assert response.json()["detail"] == "Mode value not accepted."
 
 
+@patch("main.get_docs_from_cache")
+@patch("main.get_objects")
+@patch("main.cache_documents")
+def test_daily(mock_cache_documents, mock_get_objects, mock_get_docs_from_cache):
+    """Test the daily endpoint resolves cached and new picks together."""
+    cached = get_mock_vehicle()
+    mock_get_docs_from_cache.return_value = {("all", "blur"): cached}
+    new = get_mock_vehicle()
+    new["name"] = "New Plane"
+    mock_get_objects.return_value = [new]
+
+    response = client.get("/daily?games=blur,clue&modes=all")
+    assert response.status_code == 200
+    json_response = response.json()
+    assert json_response["picks"]["blur"]["all"]["name"] == "Test Plane"
+    assert json_response["picks"]["clue"]["all"]["name"] == "New Plane"
+    assert "names" not in json_response or json_response["names"] is None
+    mock_get_docs_from_cache.assert_called_once_with([("all", "blur"), ("all", "clue")])
+    mock_get_objects.assert_called_once_with("all")
+    mock_cache_documents.assert_called_once()
+
+
+@patch("main.get_docs_from_cache")
+@patch("main.get_objects")
+def test_daily_with_names(mock_get_objects, mock_get_docs_from_cache):
+    """Test the daily endpoint includes the name list for each mode."""
+    mock_get_docs_from_cache.return_value = {("air", "blur"): get_mock_vehicle()}
+    mock_get_objects.return_value = [{"_id": "p-51", "name": "P-51"}]
+
+    response = client.get("/daily?games=blur&modes=air&names=true")
+    assert response.status_code == 200
+    assert response.json()["names"] == {"air": [{"_id": "p-51", "name": "P-51"}]}
+    mock_get_objects.assert_called_once_with("air", fields=["_id", "name"])
+
+
+def test_daily_invalid_game():
+    """Test the daily endpoint with an invalid game."""
+    response = client.get("/daily?games=blur,invalid")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Game value not accepted."
+
+
+def test_daily_invalid_mode():
+    """Test the daily endpoint with an invalid mode."""
+    response = client.get("/daily?modes=all,invalid")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Mode value not accepted."
+
+
 @patch("main.get_objects")
 def test_vehicles(mock_get_objects):
     """Test the vehicles endpoint."""
@@ -95,18 +260,87 @@ def test_vehicles_invalid_limit():
     assert response.json()["detail"] == "Limit value not accepted."
 
 
+@patch("main.get_catalogue_version", return_value=4)
 @patch("main.get_objects")
-def test_names(mock_get_objects):
+def test_names(mock_get_objects, mock_get_catalogue_version):
     """Test the names endpoint."""
     mock_get_objects.return_value = [get_mock_vehicle()]
     response = client.get("/names")
     assert response.status_code == 200
+    assert response.headers["x-catalogue-version"] == "4"
     json_response = response.json()
     assert isinstance(json_response, list)
     assert json_response[0]["name"] == "Test Plane"
     assert "_id" in json_response[0]
 
 
+@patch("main.get_catalogue_version", return_value=4)
+@patch("main.get_name_delta")
+@patch("main.get_objects")
+def test_names_since(mock_get_objects, mock_get_name_delta, mock_get_catalogue_version):
+    """Test the names endpoint returns only the changes since a version."""
+    mock_get_name_delta.return_value = {"version": 4, "names": [{"_id": "p-51", "name": "P-51D"}],
+                                        "removed": ["a-20g"]}
+    response = client.get("/names?mode=air&since=2")
+    assert response.json() == {"version": 4, "names": [{"_id": "p-51", "name": "P-51D"}],
+                               "removed": ["a-20g"]}
+    mock_get_name_delta.assert_called_once_with(2, 4, "air")
+    mock_get_objects.assert_not_called()
+
+
+@patch("main.get_catalogue_version", return_value=4)
+def test_names_since_ahead(mock_get_catalogue_version):
+    """Test the names endpoint rejects a version from the future."""
+    response = client.get("/names?since=5")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Since value not accepted."
+    mock_get_catalogue_version.assert_called_with(refresh=True)
+
+
+@patch("main.get_catalogue_version")
+@patch("main.get_name_delta")
+def test_names_since_ahead_of_held_version(mock_get_name_delta, mock_get_catalogue_version):
+    """Test the names endpoint refetches a held version a client is already ahead of."""
+    mock_get_catalogue_version.side_effect = lambda refresh=False: 5 if refresh else 4
+    response = client.get("/names?since=5")
+    assert response.status_code == 200
+    assert response.json() == {"version": 5, "names": [], "removed": []}
+    assert response.headers["x-catalogue-version"] == "5"
+    mock_get_name_delta.assert_not_called()
+
+
+@patch("main.get_catalogue_version")
+@patch("main.get_objects")
+def test_names_serves_last_good_when_database_down(mock_get_objects, mock_get_catalogue_version):
+    """Test the names endpoint serves the last good list without a version while down."""
+    mock_get_catalogue_version.return_value = 4
+    mock_get_objects.return_value = [get_mock_vehicle()]
+    client.get("/names")
+    mock_get_catalogue_version.side_effect = BackendUnavailable("timed out")
+    mock_get_objects.side_effect = BackendUnavailable("timed out")
+    response = client.get("/names")
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Test Plane"
+    assert "x-catalogue-version" not in response.headers
+    assert client.get("/names?since=2").status_code == 503
+
+
+@patch("main.get_catalogue_version")
+@patch("main.get_objects")
+def test_names_stale_only_for_same_version(mock_get_objects, mock_get_catalogue_version):
+    """Test the names endpoint never sends a stale list with a newer version header."""
+    mock_get_catalogue_version.return_value = 4
+    mock_get_objects.return_value = [get_mock_vehicle()]
+    client.get("/names")
+    mock_get_objects.side_effect = BackendUnavailable("timed out")
+    clear_cache()
+    response = client.get("/names")
+    assert response.status_code == 200
+    assert response.headers["x-catalogue-version"] == "4"
+    mock_get_catalogue_version.return_value = 5
+    assert client.get("/names").status_code == 503
+
+
 def test_names_invalid_mode():
     """Test the names endpoint with an invalid mode."""
     response = client.get("/names?mode=invalid")
@@ -114,6 +348,48 @@ def test_names_invalid_mode():
     assert response.json()["detail"] == "Mode value not accepted."
 
 
+@patch("main.get_search_index")
+def test_search(mock_get_search_index):
+    """Test the search endpoint."""
+    mock_get_search_index.return_value.search.return_value = [
+        {"_id": "p-51", "name": "P-51", "mode": "air"}]
+    response = client.get("/search?q=p5&mode=air&limit=5")
+    assert response.status_code == 200
+    assert response.json() == [{"_id": "p-51", "name": "P-51"}]
+    mock_get_search_index.return_value.search.assert_called_once_with("p5", "air", 5)
+
+
+def test_search_invalid_query():
+    """Test the search endpoint with an empty query."""
+    response = client.get("/search?q=%20")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Query value not accepted."
+
+
+def test_search_invalid_limit():
+    """Test the search endpoint with a limit above the maximum."""
+    response = client.get("/search?q=p5&limit=51")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Limit value not accepted."
+
+
+@patch("main.get_stats")
+def test_stats(mock_get_stats):
+    """Test the stats endpoint."""
+    mock_get_stats.return_value = {"_id": "catalogue", "total": 2, "by_mode": {"air": 2}}
+    response = client.get("/stats")
+    assert response.status_code == 200
+    assert response.json()["by_mode"] == {"air": 2}
+
+
+@patch("main.get_stats")
+def test_stats_missing(mock_get_stats):
+    """Test the stats endpoint before the pipeline has stored statistics."""
+    mock_get_stats.return_value = None
+    response = client.get("/stats")
+    assert response.status_code == 404
+
+
 @patch("main.get_archive")
 def test_historic(mock_get_archive):
     """Test the historic endpoint."""
@@ -129,6 +405,49 @@ def test_historic(mock_get_archive):
     assert json_response[0]["name"] == "Test Plane"
 
 
+@patch("main.get_archive")
+def test_historic_past_date_immutable(mock_get_archive):
+    """Test the historic endpoint marks past dates as immutable."""
+    mock_get_archive.return_value = [{**get_mock_vehicle(), "game_mode": "blur",
+                                      "data_set": "all", "date": "08/07/2025"}]
+    with freeze_time("2025-07-09"):
+        response = client.get("/historic?date=08_07_2025")
+    assert "immutable" in response.headers["cache-control"]
+    assert "etag" in response.headers
+
+
+@patch("main.get_archive")
+def test_historic_empty_past_date_short_lived(mock_get_archive):
+    """Test the historic endpoint only briefly caches a past date with no archive."""
+    mock_get_archive.return_value = None
+    with freeze_time("2025-07-09 12:00:00"):
+        response = client.get("/historic?date=08_07_2025")
+    with freeze_time("2025-07-09 12:02:00"):
+        client.get("/historic?date=08_07_2025")
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert mock_get_archive.call_count == 2
+
+
+@patch("main.get_archive")
+def test_historic_empty_not_remembered(mock_get_archive):
+    """Test the historic endpoint does not keep an empty archive as its last good response."""
+    mock_get_archive.return_value = None
+    client.get("/historic?date=08_07_2025")
+    clear_cache()
+    mock_get_archive.side_effect = BackendUnavailable("timed out")
+    response = client.get("/historic?date=08_07_2025")
+    assert response.status_code == 503
+
+
+@patch("main.get_archive")
+def test_historic_today_short_lived(mock_get_archive):
+    """Test the historic endpoint only briefly caches today's archive."""
+    mock_get_archive.return_value = None
+    with freeze_time("2025-07-08"):
+        response = client.get("/historic?date=08_07_2025")
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+
 def test_historic_invalid_game():
     """Test the historic endpoint with an invalid game."""
     response = client.get("/historic?game=invalid")
@@ -150,12 +469,10 @@ def test_historic_invalid_mode():
     assert response.json()["detail"] == "Mode value not accepted."
 
 
-@patch("main.get_archive")
-def test_cached_dates(mock_get_archive):
+@patch("main.get_cached_dates")
+def test_cached_dates(mock_get_cached_dates):
     """Test the cached_dates endpoint."""
-    mock_vehicle = get_mock_vehicle()
-    mock_vehicle["date"] = "08/07/2025"
-    mock_get_archive.return_value = [mock_vehicle]
+    mock_get_cached_dates.return_value = ["08/07/2025"]
     response = client.get("/cached_dates")
     assert response.status_code == 200
     json_response = response.json()
@@ -168,3 +485,52 @@ def test_cached_dates_invalid_game():
     response = client.get("/cached_dates?game=invalid")
     assert response.status_code == 400
     assert response.json()["detail"] == "Game value not accepted."
+
+
+
+@patch("main.get_image_path")
+def test_images(mock_get_image_path, tmp_path):
+    """Test the images endpoint serves stored files with immutable caching."""
+    path = tmp_path / "image.webp"
+    path.write_bytes(b"webp")
+    mock_get_image_path.return_value = str(path)
+    response = client.get("/images/abc")
+    assert response.status_code == 200
+    assert response.content == b"webp"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"] == '"abc"'
+
+
+@patch("main.get_image_path")
+def test_images_not_modified(mock_get_image_path, tmp_path):
+    """Test the images endpoint answers matching etags with 304."""
+    path = tmp_path / "image.webp"
+    path.write_bytes(b"webp")
+    mock_get_image_path.return_value = str(path)
+    response = client.get("/images/abc", headers={"If-None-Match": '"abc"'})
+    assert response.status_code == 304
+
+
+@patch("main.get_image_path")
+def test_images_missing(mock_get_image_path):
+    """Test the images endpoint with an unknown digest."""
+    mock_get_image_path.return_value = None
+    response = client.get("/images/abc")
+    assert response.status_code == 404
+
+
+@patch("main.get_digest")
+def test_image_redirect(mock_get_digest):
+    """Test the image endpoint redirects to the content addressed url."""
+    mock_get_digest.return_value = "abc"
+    response = client.get("/image?id=p-51&level=blur-lg", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "/images/abc"
+    mock_get_digest.assert_called_once_with("p-51", "blur-lg")
+
+
+def test_image_invalid_level():
+    """Test the image endpoint with an invalid level."""
+    response = client.get("/image?id=p-51&level=invalid")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Level value not accepted."
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Module for testing the migrate_archive script."""
+
+from unittest.mock import MagicMock, call
+
+from data import CACHE_KEY
+from migrate_archive import get_vehicle_id, migrate, remove_duplicates
+
+
+def test_get_vehicle_id_from_image_url():
+    """Test that legacy rows resolve from their image url."""
+    record = {"image_url": "https://static.encyclopedia.warthunder.com/images/p-51.png"}
+    assert get_vehicle_id(record, {}) == "p-51"
+
+
+def test_get_vehicle_id_from_name():
+    """Test that legacy rows without an image url resolve by name."""
+    assert get_vehicle_id({"name": "P-51"}, {"P-51": "p-51"}) == "p-51"
+    assert get_vehicle_id({"name": "Unknown"}, {"P-51": "p-51"}) is None
+
+
+def test_migrate():
+    """Test that legacy rows are replaced by compact references."""
+    cache, vehicles, retired = MagicMock(), MagicMock(), MagicMock()
+    vehicles.find.return_value = [{"_id": "a-20g", "name": "A-20G"}]
+    cache.find.return_value = [
+        {"_id": 1, "date": "08/07/2025", "data_set": "all", "game_mode": "blur",
+         "name": "A-20G", "description": "Long text."},
+        {"_id": 2, "date": "09/07/2025", "data_set": "all", "game_mode": "blur",
+         "name": "Unknown"}
+    ]
+
+    counts = migrate(cache, vehicles, retired)
+
+    assert counts == {"migrated": 1, "unresolved": 1, "retired": 0, "duplicates": 0}
+    cache.find.assert_called_once_with({"vehicle_id": {"$exists": False}})
+    cache.replace_one.assert_called_once_with({"_id": 1}, {
+        "date": "08/07/2025", "data_set": "all", "game_mode": "blur", "vehicle_id": "a-20g"
+    })
+    retired.update_one.assert_not_called()
+    assert call(CACHE_KEY, unique=True, name="cache_pick") in cache.create_index.call_args_list
+
+
+def test_migrate_retires_gone_vehicles():
+    """Test that a legacy row for a vehicle no longer live keeps one copy in retired."""
+    cache, vehicles, retired = MagicMock(), MagicMock(), MagicMock()
+    vehicles.find.return_value = []
+    cache.find.return_value = [
+        {"_id": day, "date": f"0{day}/07/2025", "data_set": "all", "game_mode": "blur",
+         "name": "P-51", "image_url": "https://example.com/images/p-51.png"}
+        for day in [8, 9]
+    ]
+
+    counts = migrate(cache, vehicles, retired)
+
+    assert counts == {"migrated": 2, "unresolved": 0, "retired": 2, "duplicates": 0}
+    retired.update_one.assert_called_with({"_id": "p-51"}, {"$setOnInsert": {
+        "_id": "p-51", "name": "P-51", "image_url": "https://example.com/images/p-51.png"
+    }}, upsert=True)
+
+
+def test_remove_duplicates():
+    """Test that all but the first row of each date and game type are deleted."""
+    cache = MagicMock()
+    cache.aggregate.return_value = [{"_id": {"date": "08/07/2025"}, "ids": [1, 4, 7]}]
+    assert remove_duplicates(cache) == 2
+    cache.delete_many.assert_called_once_with({"_id": {"$in": [4, 7]}})
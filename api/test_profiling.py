@@ -0,0 +1,86 @@
+"""Module for testing the profiling module."""
+
+from threading import get_ident
+from time import sleep
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest import fixture
+
+from profiling import profile_request, get_sample_rate, reset_profiling
+from sampler import Sampler
+
+
+def busy_wait():
+    sleep(0.05)
+
+
+async def busy_route():
+    sleep(0.03)
+    return {"ok": True}
+
+
+@fixture
+def client():
+    reset_profiling()
+    app = FastAPI()
+    app.middleware("http")(profile_request)
+    app.get("/slow/route")(busy_route)
+    return TestClient(app)
+
+
+def test_profiling_disabled(client, monkeypatch):
+    """Test that nothing is profiled when PROFILE_DIR is unset."""
+    monkeypatch.delenv("PROFILE_DIR", raising=False)
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    response = client.get("/slow/route")
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_profiling_sampled(client, monkeypatch, tmp_path):
+    """Test that a sampled request writes a collapsed stack file."""
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    response = client.get("/slow/route")
+    name = response.headers["X-Profile-Id"]
+    assert name.endswith("-GET-slow_route.collapsed")
+    lines = (tmp_path / name).read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_route (test_profiling.py" in line for line in lines)
+
+
+def test_profiling_header_requires_token(client, monkeypatch, tmp_path):
+    """Test that the debug header only profiles when it matches PROFILE_TOKEN."""
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "0")
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    assert "X-Profile-Id" not in client.get("/slow/route", headers={"X-Profile": "wrong"}).headers
+    assert "X-Profile-Id" in client.get("/slow/route", headers={"X-Profile": "secret"}).headers
+
+
+def test_sample_rate_read_once(monkeypatch):
+    """Test that the sample rate is parsed once and a malformed value disables sampling."""
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "often")
+    reset_profiling()
+    assert get_sample_rate() == 0
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    assert get_sample_rate() == 0
+    reset_profiling()
+
+
+def test_sampler_one_thread(tmp_path):
+    """Test that a sampler given a thread id only counts that thread's stacks."""
+    sampler = Sampler(get_ident(), interval=0.001)
+    sampler.start()
+    busy_wait()
+    sampler.stop()
+    assert sampler.counts
+    assert all("busy_wait (test_profiling.py" in stack for stack in sampler.counts)
+    path = tmp_path / "out.collapsed"
+    sampler.write(str(path))
+    stack, count = path.read_text().splitlines()[0].rsplit(" ", 1)
+    assert ";" in stack
+    assert int(count) > 0
@@ -0,0 +1,117 @@
+"""Module for testing the ratelimit module."""
+
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest import fixture
+
+from ratelimit import (TokenBucketLimiter, get_costs, get_route, rate_limit,
+                       reset_limiter, get_client_ip, get_limiter)
+
+
+async def names_route():
+    return ["p-51"]
+
+
+@fixture
+def client(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_PER_SECOND", "1")
+    monkeypatch.setenv("RATE_LIMIT_BURST", "20")
+    monkeypatch.setenv("RATE_LIMIT_COSTS", "/names=10")
+    reset_limiter()
+    app = FastAPI()
+    app.middleware("http")(rate_limit)
+    app.get("/names")(names_route)
+    app.get("/search")(names_route)
+    yield TestClient(app)
+    reset_limiter()
+
+
+def test_take_refills_over_time():
+    """Test that a bucket refuses once empty and refills at the rate."""
+    limiter = TokenBucketLimiter(rate=2, burst=4)
+    assert limiter.take(("ip", "/names"), 4, now=0) == 0
+    assert limiter.take(("ip", "/names"), 1, now=0) == 0.5
+    assert limiter.take(("ip", "/names"), 1, now=0.5) == 0
+
+
+def test_take_cost_above_burst():
+    """Test that a cost above the burst can still be paid from a full bucket."""
+    limiter = TokenBucketLimiter(rate=1, burst=2)
+    assert limiter.take(("ip", "/names"), 10, now=0) == 0
+
+
+def test_take_evicts_least_recent_key():
+    """Test that the key table stays bounded."""
+    limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+    for ip in ["a", "b", "a", "c"]:
+        limiter.take((ip, "/"), 0, now=0)
+    assert list(limiter.buckets) == [("a", "/"), ("c", "/")]
+
+
+def test_get_costs():
+    """Test that configured costs override the defaults."""
+    costs = get_costs("/names=20, /search=1")
+    assert costs["/names"] == 20
+    assert costs["/search"] == 1
+    assert costs["/ready"] == 0
+
+
+def test_get_route():
+    """Test that paths are grouped by their first segment."""
+    assert get_route("/images/abc") == "/images"
+    assert get_route("/") == "/"
+
+
+def test_rate_limit_returns_429(client):
+    """Test that an empty bucket gets a 429 with Retry-After."""
+    assert client.get("/names").status_code == 200
+    assert client.get("/names").status_code == 200
+    response = client.get("/names")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/search").status_code == 200
+
+
+def test_rate_limit_disabled(client, monkeypatch):
+    """Test that a zero rate turns the limiter off."""
+    monkeypatch.setenv("RATE_LIMIT_PER_SECOND", "0")
+    reset_limiter()
+    for _ in range(5):
+        assert client.get("/names").status_code == 200
+
+
+def get_request(forwarded: str = None):
+    """Return a request from the proxy address with an optional X-Forwarded-For header."""
+    request = MagicMock()
+    request.headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    request.client.host = "10.0.0.1"
+    return request
+
+
+def test_limiter_off_by_default(monkeypatch):
+    """Test that the limiter is only enabled when a rate is configured."""
+    monkeypatch.delenv("RATE_LIMIT_PER_SECOND", raising=False)
+    reset_limiter()
+    assert get_limiter() is None
+
+
+def test_client_ip_ignores_forwarded_without_trust(monkeypatch):
+    """Test that X-Forwarded-For is ignored unless a proxy is trusted."""
+    monkeypatch.delenv("RATE_LIMIT_TRUST_PROXY", raising=False)
+    assert get_client_ip(get_request("1.1.1.1")) == "10.0.0.1"
+
+
+def test_client_ip_ignores_spoofed_forwarded(monkeypatch):
+    """Test that entries a client adds before the proxy's cannot choose its bucket."""
+    monkeypatch.setenv("RATE_LIMIT_TRUST_PROXY", "1")
+    assert get_client_ip(get_request("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    assert get_client_ip(get_request("7.7.7.7, 203.0.113.7")) == "203.0.113.7"
+
+
+def test_client_ip_trusted_hops(monkeypatch):
+    """Test that the entry appended by the outermost trusted proxy is used."""
+    monkeypatch.setenv("RATE_LIMIT_TRUST_PROXY", "2")
+    assert get_client_ip(get_request("6.6.6.6, 203.0.113.7, 10.0.0.2")) == "203.0.113.7"
+    assert get_client_ip(get_request("203.0.113.7")) == "10.0.0.1"
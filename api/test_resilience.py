@@ -0,0 +1,166 @@
+"""Module for testing the resilience module."""
+
+from time import sleep, monotonic
+from unittest.mock import patch
+
+from pytest import fixture, raises
+
+import resilience
+from resilience import (BackendUnavailable, CircuitBreaker, GuardedStorage, call_with_budget,
+                        remember, recall, clear_last_good, flush_last_good)
+
+
+class SlowStorage:
+    """Stand in for a database that stalls or fails."""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def get_stats(self) -> dict:
+        self.calls += 1
+        sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"total": 1}
+
+
+@fixture(autouse=True)
+def empty_last_good():
+    """Start every test with nothing remembered."""
+    clear_last_good()
+    yield
+    clear_last_good()
+
+
+def test_breaker_opens_at_threshold():
+    """Test that the breaker refuses calls after enough failures."""
+    breaker = CircuitBreaker(threshold=2, reset_after=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_breaker_half_opens_after_reset():
+    """Test that one trial call is let through after the cool down and success closes it."""
+    breaker = CircuitBreaker(threshold=1, reset_after=30)
+    with patch("resilience.monotonic", return_value=100.0):
+        breaker.record_failure()
+    with patch("resilience.monotonic", return_value=131.0):
+        assert breaker.allow()
+        assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_call_with_budget_times_out():
+    """Test that a slow call is abandoned at its budget."""
+    breaker = CircuitBreaker(threshold=5)
+    start = monotonic()
+    with raises(BackendUnavailable):
+        call_with_budget(lambda: sleep(0.5), 0.05, breaker, (OSError,))
+    assert monotonic() - start < 0.4
+    assert breaker.failures == 1
+
+
+def test_call_with_budget_shares_request_deadline():
+    """Test that calls in one request only get what is left of its deadline."""
+    breaker = CircuitBreaker(threshold=5)
+    token = resilience._deadline.set(monotonic() + 0.1)
+    try:
+        start = monotonic()
+        with raises(BackendUnavailable):
+            call_with_budget(lambda: sleep(0.5), 1, breaker, (OSError,))
+        assert monotonic() - start < 0.4
+        with raises(BackendUnavailable):
+            call_with_budget(lambda: None, 1, breaker, (OSError,))
+    finally:
+        resilience._deadline.reset(token)
+    assert breaker.failures == 1
+
+
+def test_call_with_budget_passes_other_errors():
+    """Test that errors which are not database failures are not counted."""
+    breaker = CircuitBreaker(threshold=1)
+    with raises(KeyError):
+        call_with_budget(lambda: {}["missing"], 1, breaker, (OSError,))
+    assert breaker.allow()
+
+
+def test_guarded_storage_stops_calling_failing_storage():
+    """Test that the guarded storage stops reaching a failing stand in once open."""
+    storage = SlowStorage(error=OSError("refused"))
+    guarded = GuardedStorage(storage, 1, CircuitBreaker(threshold=2), (OSError,))
+    for _ in range(4):
+        with raises(BackendUnavailable):
+            guarded.get_stats()
+    assert storage.calls == 2
+
+
+def test_guarded_storage_returns_result():
+    """Test that the guarded storage returns results within budget."""
+    guarded = GuardedStorage(SlowStorage(), 1, CircuitBreaker(), (OSError,))
+    assert guarded.get_stats() == {"total": 1}
+
+
+def test_remember_and_recall_in_memory(monkeypatch):
+    """Test that remembered bodies are recalled by key."""
+    monkeypatch.delenv("LAST_KNOWN_GOOD_PATH", raising=False)
+    remember(("names", "air"), b'[{"name":"P-51"}]', "a")
+    assert recall(("names", "air")) == [{"name": "P-51"}]
+    assert recall(("names", "ground")) is None
+
+
+def test_recall_checks_version(monkeypatch):
+    """Test that a body remembered for one version is not recalled for another."""
+    monkeypatch.delenv("LAST_KNOWN_GOOD_PATH", raising=False)
+    remember(("random", "all", "blur"), b'{"name":"P-51"}', "a", "2025-07-08")
+    assert recall(("random", "all", "blur"), "2025-07-08") == {"name": "P-51"}
+    assert recall(("random", "all", "blur"), "2025-07-09") is None
+    assert recall(("random", "all", "blur")) == {"name": "P-51"}
+
+
+def test_remember_persists_across_restarts(monkeypatch, tmp_path):
+    """Test that remembered bodies are read back from disk after a restart."""
+    monkeypatch.setenv("LAST_KNOWN_GOOD_PATH", str(tmp_path / "last_good.json"))
+    remember(("random", "all", "blur"), b'{"name":"P-51"}', "a")
+    assert not (tmp_path / "last_good.json").exists()
+    flush_last_good()
+    clear_last_good()
+    assert recall(("random", "all", "blur")) == {"name": "P-51"}
+
+
+def test_remember_persists_in_background(monkeypatch, tmp_path):
+    """Test that remembered bodies are written by the timer thread after the delay."""
+    monkeypatch.setenv("LAST_KNOWN_GOOD_PATH", str(tmp_path / "last_good.json"))
+    monkeypatch.setattr(resilience, "PERSIST_DELAY", 0.01)
+    remember(("names", "air"), b'[]', "a")
+    resilience._last_good["timer"].join()
+    assert (tmp_path / "last_good.json").exists()
+    assert resilience._last_good["timer"] is None
+
+
+def test_remember_skips_unchanged(monkeypatch, tmp_path):
+    """Test that an unchanged body is not written again."""
+    monkeypatch.setenv("LAST_KNOWN_GOOD_PATH", str(tmp_path / "last_good.json"))
+    remember(("names", "air"), b'[]', "a")
+    flush_last_good()
+    remember(("names", "air"), b'[]', "a")
+    assert resilience._last_good["timer"] is None
+    assert resilience._last_good["values"]["names|air"]["etag"] == "a"
+
+
+def test_remember_caps_least_recently_used(monkeypatch):
+    """Test that only the most recently used capped bodies are kept."""
+    monkeypatch.delenv("LAST_KNOWN_GOOD_PATH", raising=False)
+    monkeypatch.setattr(resilience, "MAX_CAPPED_ENTRIES", 2)
+    remember(("names", "air"), b'[]', "a")
+    for day in ["01_07_2025", "02_07_2025"]:
+        remember(("historic", day), b'[{"name":"P-51"}]', day, capped=True)
+    assert recall(("historic", "01_07_2025")) == [{"name": "P-51"}]
+    remember(("historic", "03_07_2025"), b'[{"name":"P-51"}]', "c", capped=True)
+    assert recall(("historic", "02_07_2025")) is None
+    assert recall(("historic", "01_07_2025")) == [{"name": "P-51"}]
+    assert recall(("names", "air")) == []
@@ -0,0 +1,86 @@
+"""Module for testing the rollover module."""
+
+from asyncio import run, sleep, wait_for
+from unittest.mock import patch, AsyncMock
+
+from pytest import fixture, raises
+
+import rollover
+from rollover import (announce, format_event, get_fetch_hint, stream_events,
+                      get_subscriber_count, run_rollover)
+
+
+@fixture(autouse=True)
+def no_latest_event(monkeypatch):
+    """Start every test with no announced rollover."""
+    monkeypatch.setattr(rollover, "_latest", {"event": None})
+
+
+def test_format_event():
+    """Test that events are written in server-sent event format."""
+    assert format_event("rollover", {"date": "2025-07-09"}, "2025-07-09") == \
+        'event: rollover\nid: 2025-07-09\ndata: {"date":"2025-07-09"}\n\n'
+
+
+def test_get_fetch_hint_within_spread():
+    """Test that fetch hints fall within the spread."""
+    hints = [get_fetch_hint(60) for _ in range(200)]
+    assert all(0 <= hint < 60000 for hint in hints)
+    assert len(set(hints)) > 1
+
+
+def test_stream_receives_announcement(monkeypatch):
+    """Test that an open stream gets the announced picks with its own fetch hint."""
+    monkeypatch.setenv("ROLLOVER_SPREAD_SECONDS", "10")
+
+    async def listen():
+        stream = stream_events()
+        assert (await anext(stream)).startswith("retry: ")
+        waiting = anext(stream)
+        await sleep(0)
+        announce({"date": "2025-07-09", "picks": {"blur": {"all": "p-51"}}})
+        event = await wait_for(waiting, 1)
+        await stream.aclose()
+        return event
+
+    event = run(listen())
+    assert event.startswith("event: rollover\nid: 2025-07-09\n")
+    assert '"picks":{"blur":{"all":"p-51"}}' in event
+    assert '"fetch_after_ms":' in event
+    assert get_subscriber_count() == 0
+
+
+def test_stream_replays_missed_rollover():
+    """Test that a client reconnecting with an older event id is sent the latest rollover."""
+    announce({"date": "2025-07-09", "picks": {}})
+
+    async def connect(last_event_id):
+        stream = stream_events(last_event_id)
+        await anext(stream)
+        try:
+            return await wait_for(anext(stream), 0.05)
+        except TimeoutError:
+            return None
+        finally:
+            await stream.aclose()
+
+    assert "id: 2025-07-09" in run(connect("2025-07-08"))
+    assert run(connect("2025-07-09")) is None
+
+
+def test_run_rollover_retries_then_announces():
+    """Test that a failed preparation is retried before the rollover is announced."""
+    prepare = AsyncMock(side_effect=[OSError("down"), {"blur": {"all": "p-51"}}])
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) > 2:
+            raise RuntimeError("stop")
+
+    with patch("rollover.sleep", fake_sleep), \
+            patch("rollover.get_seconds_to_midnight", return_value=10):
+        with raises(RuntimeError):
+            run(run_rollover(prepare))
+    assert sleeps == [11, rollover.RETRY_SECONDS, 11]
+    assert rollover._latest["event"]["picks"] == {"blur": {"all": "p-51"}}
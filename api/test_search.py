@@ -0,0 +1,75 @@
+"""Module for testing the search module."""
+
+import search
+from search import normalise, SearchIndex, get_search_index
+
+
+def get_mock_documents():
+    """Return documents with awkward real world names."""
+    names = {
+        "f_16c": ("F-16C", "air"),
+        "f_16a": ("F-16A", "air"),
+        "pzkpfw_iv_ausf_h": ("▄Pz.Kpfw. IV Ausf. H", "ground"),
+        "cs_skoda_t_25": ("Škoda T 25", "ground"),
+        "us_m1_abrams": ("M1 Abrams", "ground"),
+    }
+    return [{"_id": k, "name": n, "mode": m} for k, (n, m) in names.items()]
+
+
+def test_normalise():
+    """Test that case, diacritics, icons and punctuation are removed."""
+    assert normalise("▄Pz.Kpfw. IV Ausf. H") == "pz kpfw iv ausf h"
+    assert normalise("Škoda T 25") == "skoda t 25"
+
+
+def test_search_prefix():
+    """Test that a compact prefix matches punctuated names."""
+    index = SearchIndex(get_mock_documents())
+    results = index.search("f16")
+    assert {doc["_id"] for doc in results} == {"f_16a", "f_16c"}
+
+
+def test_search_exact_first():
+    """Test that an exact name is ranked above other prefix matches."""
+    index = SearchIndex(get_mock_documents())
+    assert index.search("F-16C")[0]["_id"] == "f_16c"
+
+
+def test_search_words_and_diacritics():
+    """Test that word prefixes and unaccented queries match."""
+    index = SearchIndex(get_mock_documents())
+    assert index.search("pz iv")[0]["_id"] == "pzkpfw_iv_ausf_h"
+    assert index.search("skoda")[0]["_id"] == "cs_skoda_t_25"
+
+
+def test_search_typo():
+    """Test that trigram matching tolerates small typos."""
+    index = SearchIndex(get_mock_documents())
+    assert index.search("abrms")[0]["_id"] == "us_m1_abrams"
+
+
+def test_search_mode_and_limit():
+    """Test that results are filtered by mode and limited."""
+    index = SearchIndex(get_mock_documents())
+    assert index.search("f16", "ground") == []
+    assert len(index.search("f", "air", 1)) == 1
+
+
+def test_search_empty_query():
+    """Test that a query of only punctuation returns nothing."""
+    index = SearchIndex(get_mock_documents())
+    assert index.search("--") == []
+
+
+def test_get_search_index_is_cached(monkeypatch):
+    """Test that the index is only built once within its lifetime."""
+    monkeypatch.setattr(search, "_state", {"index": None, "built": 0.0})
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return get_mock_documents()
+
+    first = get_search_index(loader)
+    assert get_search_index(loader) is first
+    assert len(calls) == 1
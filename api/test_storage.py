@@ -0,0 +1,109 @@
+"""Module for testing the storage module."""
+
+from json import dumps
+
+from pytest import fixture
+
+from storage import SQLiteStorage, get_projection
+
+
+@fixture
+def storage(tmp_path):
+    store = SQLiteStorage(str(tmp_path / "thundle.db"))
+    vehicles = [{"_id": "p-51", "mode": "air", "name": "P-51"},
+                {"_id": "t-34", "mode": "ground", "name": "T-34"},
+                {"_id": "a-20g", "mode": "air", "name": "A-20G"}]
+    store.conn.executemany("INSERT INTO vehicles (_id, mode, document) VALUES (?, ?, ?)",
+                           [(v["_id"], v["mode"], dumps(v)) for v in vehicles])
+    store.conn.execute("INSERT INTO stats (_id, document) VALUES (?, ?)",
+                       ("catalogue", dumps({"_id": "catalogue", "total": 3})))
+    return store
+
+
+def get_record(date, vehicle_id, mode="all", game="blur"):
+    return {"date": date, "data_set": mode, "game_mode": game, "vehicle_id": vehicle_id}
+
+
+def test_get_projection():
+    """Test that projections always keep the _id."""
+    assert get_projection({"_id": "a", "name": "A", "tier": 1}, ["name"]) == {"_id": "a", "name": "A"}
+
+
+def test_get_vehicles(storage):
+    """Test that vehicles are filtered by mode, limit and fields."""
+    assert [v["_id"] for v in storage.get_vehicles("all")] == ["p-51", "t-34", "a-20g"]
+    assert [v["_id"] for v in storage.get_vehicles("air", limit=1)] == ["p-51"]
+    assert storage.get_vehicles("ground", fields=["_id", "name"]) == [{"_id": "t-34", "name": "T-34"}]
+
+
+def test_get_vehicles_by_id(storage):
+    """Test that vehicles are found by id with one query."""
+    assert {v["_id"] for v in storage.get_vehicles_by_id(["p-51", "gone"])} == {"p-51"}
+    assert storage.get_vehicles_by_id([]) == []
+
+
+def test_cache_records(storage):
+    """Test that archive records are written and read by date and pairs."""
+    storage.add_cache_records([get_record("01/01/2025", "p-51"),
+                               get_record("01/01/2025", "t-34", "ground"),
+                               get_record("02/01/2025", "a-20g")])
+    assert storage.get_cache_records("01/01/2025", [("all", "blur")]) == \
+        [get_record("01/01/2025", "p-51")]
+    assert len(storage.get_cache_records("01/01/2025", [("all", "blur"), ("ground", "blur")])) == 2
+    assert [r["date"] for r in storage.get_archive_records("blur", "all")] == \
+        ["01/01/2025", "02/01/2025"]
+    assert storage.get_archive_records("blur", "all", "02/01/2025") == \
+        [get_record("02/01/2025", "a-20g")]
+    assert storage.get_cached_dates("blur", "ground") == ["01/01/2025"]
+
+
+def test_cache_records_skip_archived_pairs(storage):
+    """Test that a pair already archived for a date is not archived again by another worker."""
+    storage.add_cache_records([get_record("01/01/2025", "p-51")])
+    storage.add_cache_records([get_record("01/01/2025", "p-51"),
+                               get_record("01/01/2025", "t-34", "ground")])
+    assert len(storage.get_archive_records("blur", "all")) == 1
+    assert len(storage.get_archive_records("blur", "ground")) == 1
+
+
+def test_duplicate_archive_rows_removed_on_open(tmp_path):
+    """Test that a file archived twice before the unique index keeps the first row of each pair."""
+    path = str(tmp_path / "legacy.db")
+    store = SQLiteStorage(path)
+    store.conn.execute("DROP INDEX cache_pick")
+    store.conn.executemany(
+        "INSERT INTO cache (date, data_set, game_mode, vehicle_id) VALUES (?, ?, ?, ?)",
+        [("01/01/2025", "all", "blur", "p-51"), ("01/01/2025", "all", "blur", "t-34")])
+    store.conn.commit()
+    assert SQLiteStorage(path).get_archive_records("blur", "all") == \
+        [get_record("01/01/2025", "p-51")]
+
+
+def test_get_vehicles_by_id_includes_retired(storage):
+    """Test that retired vehicles are found by id, with live vehicles taking precedence."""
+    storage.conn.executemany("INSERT INTO retired (_id, document) VALUES (?, ?)",
+                             [("gone", dumps({"_id": "gone", "name": "Gone"})),
+                              ("p-51", dumps({"_id": "p-51", "name": "Old P-51"}))])
+    vehicles = storage.get_vehicles_by_id(["p-51", "gone"])
+    assert sorted(v["name"] for v in vehicles) == ["Gone", "P-51"]
+
+
+def test_get_stats(storage):
+    """Test that the statistics document is decoded."""
+    assert storage.get_stats() == {"_id": "catalogue", "total": 3}
+
+
+def test_changes(storage):
+    """Test that changes are read between versions and filtered by mode."""
+    assert storage.get_catalogue_version() == 0
+    storage.conn.execute("INSERT INTO versions (_id, version) VALUES ('catalogue', 2)")
+    storage.conn.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?)", [
+        (1, "p-51", "added", "P-51", "air"),
+        (2, "t-34", "added", "T-34", "ground"),
+        (2, "p-51", "renamed", "P-51D", "air"),
+    ])
+    assert storage.get_catalogue_version() == 2
+    assert [c["name"] for c in storage.get_changes(1, 2)] == ["T-34", "P-51D"]
+    assert [c["name"] for c in storage.get_changes(0, 2, "air")] == ["P-51", "P-51D"]
+    assert storage.get_changes(0, 1) == [
+        {"version": 1, "vehicle_id": "p-51", "change": "added", "name": "P-51", "mode": "air"}]
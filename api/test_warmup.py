@@ -0,0 +1,27 @@
+"""Module for testing the warmup module."""
+
+from warmup import run_steps, start_warmup, get_status
+
+
+def test_run_steps_ready():
+    """Test that successful steps mark the API ready with timings."""
+    calls = []
+    run_steps({"one": lambda: calls.append(1), "two": lambda: calls.append(2)})
+    status = get_status()
+    assert calls == [1, 2]
+    assert status["ready"] is True
+    assert set(status["steps_ms"]) == {"one", "two"}
+
+
+def test_run_steps_records_errors():
+    """Test that a failing step is recorded and later steps still run."""
+    calls = []
+
+    def fail():
+        raise ConnectionError("no mongo")
+
+    start_warmup({"fail": fail, "after": lambda: calls.append(1)}).join()
+    status = get_status()
+    assert calls == [1]
+    assert status["ready"] is False
+    assert status["errors"] == {"fail": "no mongo"}
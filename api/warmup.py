@@ -0,0 +1,42 @@
+"""Module for warming API connections and caches in the background after startup."""
+
+from threading import Thread
+from time import perf_counter
+from logging import getLogger
+
+_status = {"ready": False, "running": False, "steps": {}, "errors": {}}
+
+
+def run_steps(steps: dict):
+    """Run each named warm up step, recording its duration or error."""
+    logger = getLogger()
+    _status["running"] = True
+    for name, step in steps.items():
+        start = perf_counter()
+        try:
+            step()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Warm up step %s failed: %s", name, e)
+            _status["errors"][name] = str(e)
+        _status["steps"][name] = round((perf_counter() - start) * 1000, 1)
+    _status["running"] = False
+    _status["ready"] = not _status["errors"]
+    logger.info("Warm up finished in %sms.", sum(_status["steps"].values()))
+
+
+def start_warmup(steps: dict) -> Thread:
+    """Run warm up steps in a daemon thread so startup is not delayed."""
+    _status.update({"ready": False, "steps": {}, "errors": {}})
+    thread = Thread(target=run_steps, args=(steps,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_status() -> dict:
+    """Return readiness and the duration of each warm up step."""
+    return {
+        "ready": _status["ready"],
+        "running": _status["running"],
+        "steps_ms": dict(_status["steps"]),
+        "errors": dict(_status["errors"])
+    }
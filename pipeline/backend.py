@@ -0,0 +1,182 @@
+"""Module for the pipeline storage interface and its embedded SQLite implementation."""
+
+from datetime import date, datetime
+from json import dumps, loads
+from math import isnan
+from sqlite3 import connect
+from typing import Protocol
+from logging import getLogger
+
+from pandas import NaT
+
+from changelog import get_name_map
+
+MIN_KEEP_RATIO = 0.9
+DERIVED_FIELDS = ["blur_images", "clue_description", "clues"]
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vehicles (
+    _id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vehicles_mode ON vehicles (mode);
+CREATE TABLE IF NOT EXISTS cache (
+    date TEXT NOT NULL,
+    data_set TEXT NOT NULL,
+    game_mode TEXT NOT NULL,
+    vehicle_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_lookup ON cache (game_mode, data_set, date);
+CREATE INDEX IF NOT EXISTS cache_date ON cache (date);
+DELETE FROM cache WHERE rowid NOT IN (
+    SELECT MIN(rowid) FROM cache GROUP BY date, data_set, game_mode
+);
+CREATE UNIQUE INDEX IF NOT EXISTS cache_pick ON cache (date, data_set, game_mode);
+CREATE TABLE IF NOT EXISTS retired (
+    _id TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    _id TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    _id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER NOT NULL,
+    vehicle_id TEXT NOT NULL,
+    change TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mode TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_version ON changes (version);
+"""
+
+
+class Storage(Protocol):
+    """Operations the load phase needs from its database."""
+
+    def insert_new(self, documents: list[dict]) -> int:
+        """Insert documents whose _id is not stored yet and refresh derived fields of the rest,
+        returning how many were added."""
+
+    def replace_all(self, documents: list[dict], allow_shrink: bool = False):
+        """Atomically replace every vehicle with documents, retiring dropped archived ones."""
+
+    def get_all(self) -> list[dict]:
+        """Return every stored vehicle."""
+
+    def store_stats(self, stats: dict):
+        """Replace the catalogue statistics document."""
+
+    def get_names(self) -> dict[str, dict]:
+        """Return name and mode of every stored vehicle keyed by _id."""
+
+    def record_changes(self, changes: list[dict]) -> int:
+        """Store changes under a new catalogue version if there are any, returning the version."""
+
+
+def get_json_value(value):
+    """Return value with missing values such as NaT and NaN replaced by None."""
+    if isinstance(value, dict):
+        return {k: get_json_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [get_json_value(v) for v in value]
+    if value is NaT or (isinstance(value, float) and isnan(value)):
+        return None
+    return value
+
+
+def encode(document: dict) -> str:
+    """Return document as json, with dates as iso strings and missing values as null."""
+    return dumps(get_json_value(document), default=lambda v: v.isoformat()
+                 if isinstance(v, (date, datetime)) else str(v))
+
+
+def get_derived(document: dict) -> dict:
+    """Return the fields of document the pipeline computes rather than scrapes."""
+    return {field: document[field] for field in DERIVED_FIELDS if field in document}
+
+
+def check_counts(count: int, expected: int, live_count: int, allow_shrink: bool = False):
+    """Raise ValueError if a replacement does not match the transform output."""
+    if count != expected:
+        raise ValueError(f"Staging has {count} documents, expected {expected}.")
+    if not allow_shrink and count < live_count * MIN_KEEP_RATIO:
+        raise ValueError(f"Staging has {count} documents but live has {live_count}, "
+                         "refusing to shrink the catalogue.")
+
+
+class SQLiteStorage:
+    """Storage in a local SQLite file the API can read."""
+
+    def __init__(self, path: str):
+        self.conn = connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get_rows(self, documents: list[dict]) -> list[tuple]:
+        """Return vehicle table rows for documents."""
+        return [(str(doc["_id"]), doc["mode"], encode(doc)) for doc in documents]
+
+    def insert_new(self, documents: list[dict]) -> int:
+        logger = getLogger()
+        with self.conn:
+            stored = dict(self.conn.execute("SELECT _id, document FROM vehicles").fetchall())
+            new = {}
+            for doc in documents:
+                if str(doc["_id"]) not in stored:
+                    new.setdefault(str(doc["_id"]), doc)
+            new = list(new.values())
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO vehicles (_id, mode, document) VALUES (?, ?, ?)",
+                self.get_rows(new))
+            self.conn.executemany(
+                "UPDATE vehicles SET document = ? WHERE _id = ?",
+                [(encode({**loads(stored[str(doc["_id"])]), **get_derived(doc)}), str(doc["_id"]))
+                 for doc in documents if str(doc["_id"]) in stored and get_derived(doc)])
+        logger.info("Inserted %s new documents into SQLite.", len(new))
+        return len(new)
+
+    def replace_all(self, documents: list[dict], allow_shrink: bool = False):
+        logger = getLogger()
+        documents = list({doc["_id"]: doc for doc in documents}.values())
+        logger.info("Replacing SQLite vehicles with %s documents...", len(documents))
+        with self.conn:
+            live_count = self.conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+            self.conn.execute("INSERT OR REPLACE INTO retired (_id, document) SELECT _id, document "
+                              "FROM vehicles WHERE _id IN (SELECT vehicle_id FROM cache)")
+            self.conn.execute("DELETE FROM vehicles")
+            self.conn.executemany("INSERT INTO vehicles (_id, mode, document) VALUES (?, ?, ?)",
+                                  self.get_rows(documents))
+            self.conn.execute("DELETE FROM retired WHERE _id IN (SELECT _id FROM vehicles)")
+            count = self.conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0]
+            check_counts(count, len(documents), live_count, allow_shrink)
+
+    def get_all(self) -> list[dict]:
+        rows = self.conn.execute("SELECT document FROM vehicles ORDER BY rowid").fetchall()
+        return [loads(row[0]) for row in rows]
+
+    def get_names(self) -> dict[str, dict]:
+        return get_name_map(self.get_all())
+
+    def record_changes(self, changes: list[dict]) -> int:
+        with self.conn:
+            row = self.conn.execute("SELECT version FROM versions WHERE _id = 'catalogue'").fetchone()
+            version = row[0] if row else 0
+            if not changes:
+                return version
+            version += 1
+            self.conn.execute("INSERT OR REPLACE INTO versions (_id, version) VALUES ('catalogue', ?)",
+                              (version,))
+            self.conn.executemany(
+                "INSERT INTO changes (version, vehicle_id, change, name, mode) VALUES (?, ?, ?, ?, ?)",
+                [(version, c["vehicle_id"], c["change"], c["name"], c["mode"]) for c in changes])
+        return version
+
+    def store_stats(self, stats: dict):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO stats (_id, document) VALUES (?, ?)",
+                              (stats["_id"], encode(stats)))
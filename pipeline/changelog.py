@@ -0,0 +1,26 @@
+"""Module for diffing vehicle names between catalogue versions."""
+
+from logging import getLogger
+
+
+def get_name_map(documents: list[dict]) -> dict[str, dict]:
+    """Return name and mode of each document keyed by _id."""
+    return {str(doc["_id"]): {"name": doc["name"], "mode": doc["mode"]} for doc in documents}
+
+
+def get_changes(previous: dict[str, dict], documents: list[dict]) -> list[dict]:
+    """Return added, renamed and removed vehicles between two catalogues."""
+    logger = getLogger()
+    current = get_name_map(documents)
+    changes = []
+    for vehicle_id, entry in current.items():
+        before = previous.get(vehicle_id)
+        if before is None:
+            changes.append({"vehicle_id": vehicle_id, "change": "added", **entry})
+        elif before["name"] != entry["name"] or before["mode"] != entry["mode"]:
+            changes.append({"vehicle_id": vehicle_id, "change": "renamed", **entry})
+    for vehicle_id, entry in previous.items():
+        if vehicle_id not in current:
+            changes.append({"vehicle_id": vehicle_id, "change": "removed", **entry})
+    logger.info("Catalogue has %s name changes.", len(changes))
+    return changes
@@ -0,0 +1,66 @@
+"""Module for building clue game payloads from wiki descriptions."""
+
+from re import compile as compile_regex, escape, sub, split, IGNORECASE, Pattern
+from logging import getLogger
+
+from pandas import DataFrame, Series, isna
+
+MASK = "???"
+MIN_CLUE_CHARS = 40
+MAX_CLUES = 6
+
+
+def get_name_variants(name: str) -> list[str]:
+    """Return spellings of a vehicle name that should be hidden, longest first."""
+    base = sub(r"\s*\([^)]*\)", "", name).strip()
+    variants = {name.strip(), base}
+    variants.update(token for token in split(r"\s+", base)
+                    if len(token) >= 3 and any(c.isdigit() for c in token))
+    return sorted((v for v in variants if v), key=len, reverse=True)
+
+
+def get_name_pattern(name: str) -> Pattern:
+    """Return regex matching any name variant, ignoring case and separator style."""
+    parts = []
+    for variant in get_name_variants(name):
+        chunks = [escape(c) for c in split(r"[\s\-.]+", variant) if c]
+        parts.append(r"[\s\-.]*".join(chunks))
+    return compile_regex(r"(?<!\w)(?:" + "|".join(parts) + r")(?!\w)", IGNORECASE)
+
+
+def redact(description: str, name: str) -> str:
+    """Return description with the vehicle name and its variants masked."""
+    return get_name_pattern(name).sub(MASK, description)
+
+
+def get_clues(redacted: str) -> list[str]:
+    """Return clue fragments, least revealing first, from a redacted description."""
+    sentences = [s.strip() for s in split(r"(?<=[.!?])\s+(?=[A-Z\"(])", redacted) if s.strip()]
+    fragments = []
+    for sentence in sentences:
+        if fragments and len(fragments[-1]) < MIN_CLUE_CHARS:
+            fragments[-1] = f"{fragments[-1]} {sentence}"
+        else:
+            fragments.append(sentence)
+    while len(fragments) > MAX_CLUES:
+        fragments[-2:] = [" ".join(fragments[-2:])]
+    return fragments[::-1]
+
+
+def add_clues(df: DataFrame) -> DataFrame:
+    """Return dataframe with clue_description and clues columns added."""
+    logger = getLogger()
+    logger.info("Building clue payloads for %s vehicles...", len(df))
+    redacted, clues = [], []
+    for name, description in zip(df["name"], df["description"]):
+        if isna(description) or isna(name):
+            redacted.append(None)
+            clues.append([])
+            continue
+        text = redact(description, name)
+        redacted.append(text)
+        clues.append(get_clues(text))
+    df = df.copy()
+    df["clue_description"] = Series(redacted, index=df.index, dtype=object)
+    df["clues"] = Series(clues, index=df.index, dtype=object)
+    return df
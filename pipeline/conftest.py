@@ -65,11 +65,12 @@ def sample_df():
 
 
 @fixture(autouse=True)
-def _set_env(monkeypatch):
+def _set_env(monkeypatch, tmp_path):
     """Populate required env vars for the module."""
     monkeypatch.setenv("DB_CONN_STRING", "mongodb://example.com")
     monkeypatch.setenv("DB_NAME", "test_db")
     monkeypatch.setenv("DB_COLLECTION", "vehicles")
+    monkeypatch.setenv("SCRAPE_JOURNAL", str(tmp_path / "scrape_journal.jsonl"))
     
 
 @fixture
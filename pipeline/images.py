@@ -0,0 +1,149 @@
+"""Module for pre-rendering blurred vehicle images into a content addressed store."""
+
+from os import getpid, remove, replace
+from os.path import join, exists
+from io import BytesIO
+from json import loads, dumps
+from hashlib import sha256
+from asyncio import run, gather, Semaphore, to_thread
+from pathlib import Path
+from logging import getLogger
+
+from aiohttp import ClientSession, ClientTimeout
+from pandas import DataFrame
+from PIL import Image, ImageFilter
+
+BLUR_LEVELS = {
+    "blur-lg": 16,
+    "blur-md": 12,
+    "blur-sm": 8,
+    "blur-xs": 4,
+    "blur-none": 0
+}
+MAX_WIDTH = 640
+QUALITY = 80
+INDEX_NAME = "index.json"
+
+
+def get_digest_path(root: str, digest: str) -> str:
+    """Return path of a stored object from its digest."""
+    return join(root, digest[:2], f"{digest}.webp")
+
+
+def store_variant(root: str, data: bytes) -> str:
+    """Write bytes to the store under their sha256 digest and return it."""
+    digest = sha256(data).hexdigest()
+    path = Path(get_digest_path(root, digest))
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{getpid()}.tmp")
+        tmp.write_bytes(data)
+        replace(tmp, path)
+    return digest
+
+
+def render_variants(image_bytes: bytes) -> dict[str, bytes]:
+    """Return resized webp bytes for every blur level."""
+    with Image.open(BytesIO(image_bytes)) as image:
+        image = image.convert("RGBA")
+        if image.width > MAX_WIDTH:
+            height = round(image.height * MAX_WIDTH / image.width)
+            image = image.resize((MAX_WIDTH, height), Image.Resampling.LANCZOS)
+        variants = {}
+        for level, radius in BLUR_LEVELS.items():
+            blurred = image.filter(ImageFilter.GaussianBlur(radius)) if radius else image
+            buffer = BytesIO()
+            blurred.save(buffer, format="WEBP", quality=QUALITY, method=4)
+            variants[level] = buffer.getvalue()
+    return variants
+
+
+def load_index(root: str, name: str = INDEX_NAME) -> dict:
+    """Return map of identifier to stored digests for each level."""
+    path = join(root, name)
+    if not exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return loads(f.read())
+
+
+def save_index(root: str, index: dict, name: str = INDEX_NAME):
+    """Atomically write the identifier index."""
+    path = join(root, name)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(dumps(index, indent=4, sort_keys=True))
+    replace(f"{path}.tmp", path)
+
+
+def merge_indexes(root: str, names: list[str]):
+    """Merge shard indexes into the identifier index and remove them."""
+    index = load_index(root)
+    for name in names:
+        index.update(load_index(root, name))
+    save_index(root, index)
+    for name in names:
+        if exists(join(root, name)):
+            remove(join(root, name))
+
+
+def is_stored(root: str, digests: dict) -> bool:
+    """Return true if every level for a vehicle is present in the store."""
+    return set(digests) == set(BLUR_LEVELS) and all(
+        exists(get_digest_path(root, d)) for d in digests.values())
+
+
+async def download_image(session: ClientSession, semaphore: Semaphore, url: str) -> bytes | None:
+    """Return image bytes or None if the download fails."""
+    logger = getLogger()
+    async with semaphore:
+        try:
+            async with session.get(url) as resp:
+                if resp.status != 200:
+                    logger.warning("Image request for %s returned %s", url, resp.status)
+                    return None
+                return await resp.read()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Error downloading %s: %s", url, e)
+            return None
+
+
+async def render_vehicle(session: ClientSession, semaphore: Semaphore,
+                         root: str, identifier: str, url: str) -> dict | None:
+    """Download one vehicle image and store each blur level."""
+    image_bytes = await download_image(session, semaphore, url)
+    if image_bytes is None:
+        return None
+    try:
+        variants = await to_thread(render_variants, image_bytes)
+    except OSError as e:
+        getLogger().warning("Could not render image for %s: %s", identifier, e)
+        return None
+    return {level: store_variant(root, data) for level, data in variants.items()}
+
+
+async def render_all(df: DataFrame, root: str, concurrency: int = 10,
+                     index_name: str = INDEX_NAME) -> dict:
+    """Return index of stored digests, only downloading vehicles not yet stored."""
+    logger = getLogger()
+    index = load_index(root, index_name)
+    todo = [(i, url) for i, url in zip(df["_id"], df["image_url"])
+            if not is_stored(root, index.get(i, {}))]
+    logger.info("Rendering blur levels for %s of %s vehicles...", len(todo), len(df))
+    semaphore = Semaphore(concurrency)
+    async with ClientSession(timeout=ClientTimeout(total=30)) as session:
+        results = await gather(*[render_vehicle(session, semaphore, root, i, url)
+                                 for i, url in todo])
+    for (identifier, _), digests in zip(todo, results):
+        if digests:
+            index[identifier] = digests
+    save_index(root, index, index_name)
+    return index
+
+
+def render_images(df: DataFrame, root: str, index_name: str = INDEX_NAME) -> DataFrame:
+    """Return dataframe with a blur_images column of digests per level."""
+    Path(root).mkdir(parents=True, exist_ok=True)
+    index = run(render_all(df, root, index_name=index_name))
+    df = df.copy()
+    df["blur_images"] = [index.get(i) for i in df["_id"]]
+    return df
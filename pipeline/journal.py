@@ -0,0 +1,83 @@
+"""Module for journaling wiki scrape results so interrupted runs can resume."""
+
+from os import environ as ENV, fsync, remove, replace
+from os.path import exists
+from json import loads, dumps
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+
+JOURNAL_TTL = timedelta(days=1)
+SYNC_EVERY = 50
+
+
+def get_journal_path() -> str | None:
+    """Return path of the scrape journal, or None if journaling is off."""
+    return ENV.get("SCRAPE_JOURNAL") or None
+
+
+def remove_journal(path: str | None):
+    """Delete a scrape journal once the run it was resuming has been loaded."""
+    if path and exists(path):
+        remove(path)
+
+
+def read_journal(path: str, now: datetime) -> dict[str, dict]:
+    """Return journal entries by _id, skipping expired entries and torn lines."""
+    entries = {}
+    if not exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = loads(line)
+            except ValueError:
+                continue
+            if now - datetime.fromisoformat(entry["scraped"]) <= JOURNAL_TTL:
+                entries[entry["_id"]] = entry
+    return entries
+
+
+class ScrapeJournal:
+    """Append only json lines file of completed wiki fetches."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = read_journal(path, datetime.now(timezone.utc))
+        self.compact()
+        self.file = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        self.unsynced = 0
+
+    def compact(self):
+        """Atomically rewrite the journal with only its live entries."""
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            f.writelines(dumps(entry) + "\n" for entry in self.entries.values())
+        replace(f"{self.path}.tmp", self.path)
+
+    def append(self, result: dict):
+        """Durably record one completed fetch."""
+        entry = {**result, "scraped": datetime.now(timezone.utc).isoformat()}
+        self.file.write(dumps(entry) + "\n")
+        self.file.flush()
+        self.entries[result["_id"]] = entry
+        self.unsynced += 1
+        if self.unsynced >= SYNC_EVERY:
+            fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def get_pending(self, identifiers: list[str]) -> list[str]:
+        """Return identifiers without a journaled result."""
+        logger = getLogger()
+        pending = [i for i in identifiers if i not in self.entries]
+        logger.info("Scrape journal has %s of %s vehicles, fetching %s.",
+                    len(identifiers) - len(pending), len(identifiers), len(pending))
+        return pending
+
+    def get_results(self, identifiers: list[str]) -> list[dict]:
+        """Return journaled results for identifiers, without their timestamps."""
+        return [{k: v for k, v in self.entries[i].items() if k != "scraped"}
+                for i in identifiers if i in self.entries]
+
+    def close(self):
+        """Flush the journal to disk and close it."""
+        fsync(self.file.fileno())
+        self.file.close()
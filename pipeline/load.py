@@ -1,15 +1,23 @@
 """Module for loading data to cloud storage."""
 
 from os import environ as ENV
-from logging import getLogger, INFO, StreamHandler
-from sys import stdout
+from logging import getLogger
 
 from pandas import DataFrame, read_csv
 from dotenv import load_dotenv
 from pymongo.mongo_client import MongoClient
-from pymongo.collection import Collection
+from pymongo.collection import Collection, ReturnDocument
 from pymongo.server_api import ServerApi
 
+from snapshot import snapshot
+from publish import publish
+from stats import get_stats
+from backend import Storage, SQLiteStorage, check_counts, get_derived
+from changelog import get_name_map, get_changes
+from queue_log import set_logger
+
+BATCH_SIZE = 1000
+
 
 def get_client() -> MongoClient:
     """Return Mongo client."""
@@ -18,27 +26,142 @@ def get_client() -> MongoClient:
     return MongoClient(ENV["DB_CONN_STRING"], server_api=ServerApi('1'))
 
 
-def upload_files(mongo: MongoClient, documents: list[dict]):
-    """Upload all documents for MongoDB."""
+def upload_files(mongo: MongoClient, documents: list[dict]) -> int:
+    """Upload all documents for MongoDB, returning how many were new."""
     logger = getLogger()
     logger.info("Uploading documents to MongoDB: %s.", mongo.address)
     db = mongo[ENV["DB_NAME"]]
     collection = db[ENV["DB_COLLECTION"]]
-    for doc in documents:
-        insert_document(collection, doc)
+    return sum(bool(insert_document(collection, doc)) for doc in documents)
 
 
 def insert_document(col: Collection, doc: dict):
-    """Insert document if id does not already exist."""
+    """Insert document if id does not already exist, otherwise refresh its derived fields."""
     logger = getLogger()
     if col.find_one({"_id": doc["_id"]}) is None:
         logger.info("Uploading document to MongoDB: %s.", doc['_id'])
         col.insert_one(doc)
         return True
-    logger.info("Document with _id %s already exists.", doc['_id'])
+    derived = get_derived(doc)
+    if derived:
+        logger.info("Document with _id %s already exists, updating %s.", doc['_id'], list(derived))
+        col.update_one({"_id": doc["_id"]}, {"$set": derived})
+    else:
+        logger.info("Document with _id %s already exists.", doc['_id'])
     return False
 
 
+def validate_staging(staging: Collection, expected: int, live_count: int,
+                     allow_shrink: bool = False):
+    """Raise ValueError if staging does not match the transform output."""
+    check_counts(staging.count_documents({}), expected, live_count, allow_shrink)
+
+
+def retire_archived(db, live_name: str, ids: set):
+    """Copy vehicles the daily archive points to but a load drops into the retired collection."""
+    logger = getLogger()
+    dropped = [i for i in db["cache"].distinct("vehicle_id") if i not in ids]
+    retired = 0
+    for doc in db[live_name].find({"_id": {"$in": dropped}}):
+        db["retired"].replace_one({"_id": doc["_id"]}, doc, upsert=True)
+        retired += 1
+    if retired:
+        logger.info("Retired %s archived vehicles no longer in the catalogue.", retired)
+
+
+def swap_collection(mongo: MongoClient, documents: list[dict], allow_shrink: bool = False):
+    """Bulk load a staging collection and atomically rename it over the live one."""
+    logger = getLogger()
+    db = mongo[ENV["DB_NAME"]]
+    live_name = ENV["DB_COLLECTION"]
+    staging = db[f"{live_name}_staging"]
+    documents = list({doc["_id"]: doc for doc in documents}.values())
+    logger.info("Loading %s documents into staging collection...", len(documents))
+    staging.drop()
+    for start in range(0, len(documents), BATCH_SIZE):
+        staging.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+    staging.create_index("mode")
+    try:
+        validate_staging(staging, len(documents),
+                         db[live_name].estimated_document_count(), allow_shrink)
+    except ValueError:
+        staging.drop()
+        raise
+    retire_archived(db, live_name, {doc["_id"] for doc in documents})
+    logger.info("Swapping staging collection over %s...", live_name)
+    staging.rename(live_name, dropTarget=True)
+
+
+def get_all_documents(mongo: MongoClient) -> list[dict]:
+    """Return every document currently in the vehicle collection."""
+    logger = getLogger()
+    logger.info("Reading full collection for statistics and catalogue...")
+    db = mongo[ENV["DB_NAME"]]
+    return list(db[ENV["DB_COLLECTION"]].find({}))
+
+
+def store_stats(mongo: MongoClient, stats: dict):
+    """Replace the catalogue summary document in the stats collection."""
+    logger = getLogger()
+    logger.info("Storing catalogue statistics for %s vehicles...", stats["total"])
+    db = mongo[ENV["DB_NAME"]]
+    db["stats"].replace_one({"_id": stats["_id"]}, stats, upsert=True)
+
+
+class MongoStorage:
+    """Storage in the MongoDB vehicle collection."""
+
+    def __init__(self, mongo: MongoClient):
+        self.mongo = mongo
+
+    def insert_new(self, documents: list[dict]) -> int:
+        return upload_files(self.mongo, documents)
+
+    def replace_all(self, documents: list[dict], allow_shrink: bool = False):
+        swap_collection(self.mongo, documents, allow_shrink)
+
+    def get_all(self) -> list[dict]:
+        return get_all_documents(self.mongo)
+
+    def store_stats(self, stats: dict):
+        store_stats(self.mongo, stats)
+
+    def get_names(self) -> dict[str, dict]:
+        return get_names(self.mongo)
+
+    def record_changes(self, changes: list[dict]) -> int:
+        return record_changes(self.mongo, changes)
+
+
+def get_storage() -> Storage:
+    """Return SQLite storage when SQLITE_PATH is set, otherwise MongoDB."""
+    if ENV.get("SQLITE_PATH"):
+        return SQLiteStorage(ENV["SQLITE_PATH"])
+    return MongoStorage(get_client())
+
+
+def get_names(mongo: MongoClient) -> dict[str, dict]:
+    """Return name and mode of every vehicle keyed by _id."""
+    db = mongo[ENV["DB_NAME"]]
+    return get_name_map(db[ENV["DB_COLLECTION"]].find({}, ["_id", "name", "mode"]))
+
+
+def record_changes(mongo: MongoClient, changes: list[dict]) -> int:
+    """Store changes under a new catalogue version if there are any, returning the version."""
+    logger = getLogger()
+    db = mongo[ENV["DB_NAME"]]
+    if not changes:
+        current = db["versions"].find_one({"_id": "catalogue"})
+        return current["version"] if current else 0
+    version = db["versions"].find_one_and_update(
+        {"_id": "catalogue"}, {"$inc": {"version": 1}},
+        upsert=True, return_document=ReturnDocument.AFTER)["version"]
+    logger.info("Recording %s changes as catalogue version %s...", len(changes), version)
+    db["changes"].insert_many([{**change, "version": version} for change in changes])
+    db["changes"].create_index("version")
+    return version
+
+
 def get_json(df: DataFrame) -> list[dict]:
     """Return list of json objects."""
     logger = getLogger()
@@ -46,19 +169,27 @@ def get_json(df: DataFrame) -> list[dict]:
     return df.to_dict(orient="records")
     
 
-def load(data: DataFrame):
-    """Upload data to MongoDB."""
+def load(data: DataFrame, swap: bool = False):
+    """Upload data to storage, replacing the collection atomically if swap is set."""
     logger = getLogger()
     logger.info("Starting load phase...")
-    mongo = get_client()
+    storage = get_storage()
     json = get_json(data)
-    upload_files(mongo, json)
+    previous = storage.get_names()
+    if swap:
+        storage.replace_all(json)
+    else:
+        storage.insert_new(json)
+    snapshot(data)
+    documents = storage.get_all()
+    version = storage.record_changes(get_changes(previous, documents))
+    storage.store_stats({**get_stats(DataFrame(documents)), "version": version})
+    if ENV.get("CATALOGUE_PATH"):
+        publish(documents, ENV["CATALOGUE_PATH"])
 
 
 if __name__ == "__main__":
     load_dotenv()
-    logger = getLogger()
-    logger.setLevel(INFO)
-    logger.addHandler(StreamHandler(stdout))
+    set_logger()
     data = read_csv("example_df.csv")
     load(data)
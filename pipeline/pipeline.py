@@ -1,22 +1,19 @@
 """Pipeline script from API to parquet files."""
 
+from os import environ as ENV
 from argparse import ArgumentParser, Namespace
-from sys import stdout
-from logging import (getLogger, Logger, INFO,
-                     StreamHandler)
 
 from dotenv import load_dotenv
 
 from extract import extract
 from transform import transform
+from images import render_images
 from load import load
-
-
-def set_logger() -> Logger:
-    """Set root logger."""
-    logger = getLogger()
-    logger.setLevel(INFO)
-    logger.addHandler(StreamHandler(stdout))
+from profiler import RunProfiler
+from shards import (get_shards, run_shard, run_shards, collect_reports, merge_shards,
+                    merge_shard_files, write_run_report, clear_shards)
+from journal import get_journal_path, remove_journal
+from queue_log import set_logger
 
 
 def get_args() -> Namespace:
@@ -27,9 +24,44 @@ def get_args() -> Namespace:
     )
     parser.add_argument('--start', '-s', type=int, required=True)
     parser.add_argument('--end', '-e', type=int, required=True)
+    parser.add_argument('--swap', action='store_true',
+                        help="Replace the collection atomically instead of inserting new documents.")
+    parser.add_argument('--profile', type=str, default=None, metavar='DIR',
+                        help="Write a sampled profile of each stage to this directory.")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Split the page range into this many shards run in parallel.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes used for shards (default: one per core).")
+    parser.add_argument('--shard-dir', type=str, default="shards",
+                        help="Directory shard results and reports are written to.")
+    parser.add_argument('--shard-index', type=int, default=None,
+                        help="Only run this shard, leaving the merge and load to a --merge run.")
+    parser.add_argument('--merge', action='store_true',
+                        help="Merge finished shards from --shard-dir and load them.")
     return parser.parse_args()
 
 
+def run_sharded(args: Namespace):
+    """Run shards, or one shard, then merge their results and load them once."""
+    if args.profile:
+        raise ValueError("Profiling is only supported for unsharded runs.")
+    shards = get_shards(args.start, args.end, args.shards)
+    if args.shard_index is not None:
+        if not 0 <= args.shard_index < len(shards):
+            raise ValueError(f"Shard index must be below {len(shards)}.")
+        run_shard(*shards[args.shard_index], args.shard_dir, get_journal_path())
+        return
+    if args.merge:
+        reports = collect_reports(shards, args.shard_dir)
+    else:
+        reports = run_shards(shards, args.shard_dir, args.workers)
+    merge_shard_files(reports)
+    merged, report = merge_shards(reports)
+    load(merged, swap=args.swap)
+    write_run_report(args.shard_dir, report)
+    clear_shards(args.shard_dir, reports)
+
+
 def run():
     """Run the pipeline."""
     set_logger()
@@ -42,9 +74,21 @@ def run():
         raise ValueError("Need an end value.")
     if start < 0:
         raise ValueError("Start cannot be below 0.")
-    raw_data = extract(start, end)
-    cleaned_df = transform(raw_data)
-    load(cleaned_df)
+    if args.shards > 1 or args.shard_index is not None or args.merge:
+        run_sharded(args)
+        return
+    profiler = RunProfiler(args.profile)
+    with profiler.stage("extract"):
+        raw_data = extract(start, end)
+    with profiler.stage("transform"):
+        cleaned_df = transform(raw_data)
+    if ENV.get("IMAGE_STORE_PATH"):
+        with profiler.stage("images"):
+            cleaned_df = render_images(cleaned_df, ENV["IMAGE_STORE_PATH"])
+    with profiler.stage("load"):
+        load(cleaned_df, swap=args.swap)
+    remove_journal(get_journal_path())
+    profiler.write_summary()
 
 
 if __name__ == "__main__":
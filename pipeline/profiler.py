@@ -0,0 +1,117 @@
+"""Module for sampling profiles of pipeline stages."""
+
+from os import makedirs
+from os.path import join, basename
+from json import dumps
+from sys import _current_frames
+from threading import Thread, Event, get_ident
+from collections import Counter
+from contextlib import contextmanager
+from statistics import median, quantiles
+from time import perf_counter
+from datetime import datetime, timezone
+from logging import getLogger
+
+_tasks = {"active": False, "durations": {}}
+
+
+class Sampler:
+    """Background thread that counts collapsed stacks of every other thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="sampler", daemon=True)
+
+    def _run(self):
+        own = get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in _current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        """Write stacks in the collapsed format read by flamegraph tools."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def record_task(name: str, seconds: float):
+    """Record the wall time of an async task while profiling is active."""
+    if _tasks["active"]:
+        _tasks["durations"].setdefault(name, []).append(seconds)
+
+
+def get_task_summary() -> dict:
+    """Return count and latency percentiles of recorded async tasks."""
+    summary = {}
+    for name, durations in _tasks["durations"].items():
+        summary[name] = {
+            "count": len(durations),
+            "total_s": round(sum(durations), 3),
+            "p50_s": round(median(durations), 3),
+            "p95_s": round(quantiles(durations, n=20)[-1], 3) if len(durations) > 1
+            else round(durations[0], 3),
+            "max_s": round(max(durations), 3)
+        }
+    return summary
+
+
+class RunProfiler:
+    """Per-stage profiles for one pipeline run written under a directory."""
+
+    def __init__(self, directory: str | None):
+        self.directory = directory
+        self.run_id = datetime.now(timezone.utc).strftime(r"%Y%m%dT%H%M%SZ")
+        self.stages = {}
+        if directory:
+            makedirs(directory, exist_ok=True)
+            _tasks.update({"active": True, "durations": {}})
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profile the enclosed block as one named stage."""
+        if not self.directory:
+            yield
+            return
+        sampler = Sampler()
+        sampler.start()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(perf_counter() - start, 3)
+            sampler.stop()
+            sampler.write(join(self.directory, f"{self.run_id}-{name}.collapsed"))
+
+    def write_summary(self) -> dict | None:
+        """Write stage wall times and async task summary as json."""
+        if not self.directory:
+            return None
+        summary = {
+            "run_id": self.run_id,
+            "stages_s": self.stages,
+            "async_tasks": get_task_summary()
+        }
+        with open(join(self.directory, f"{self.run_id}-summary.json"), "w", encoding="utf-8") as f:
+            f.write(dumps(summary, indent=4))
+        _tasks["active"] = False
+        getLogger().info("Wrote pipeline profile to %s", self.directory)
+        return summary
@@ -0,0 +1,68 @@
+"""Module for publishing the vehicle catalogue as a memory mappable file."""
+
+from os import replace, fsync
+from os.path import abspath, dirname
+from json import dumps
+from logging import getLogger
+from tempfile import NamedTemporaryFile
+
+from pandas import DataFrame
+from pyarrow import Table, OSFile, array, int32
+from pyarrow.ipc import new_file
+
+
+def get_sorted_frame(documents: list[dict]) -> DataFrame:
+    """Return dataframe of documents with each mode contiguous, in database order within a mode."""
+    df = DataFrame(documents)
+    df["_id"] = df["_id"].astype(str)
+    return df.sort_values("mode", kind="stable")
+
+
+def get_mode_ranges(df: DataFrame) -> dict[str, list[int]]:
+    """Return map of mode to [start, length] row range in sorted frame."""
+    ranges = {}
+    for mode, rows in df.groupby("mode", sort=True).indices.items():
+        ranges[mode] = [int(rows[0]), len(rows)]
+    return ranges
+
+
+def get_catalogue_table(documents: list[dict]) -> Table:
+    """Return arrow table with mode ranges and id and database ordered row indexes."""
+    df = get_sorted_frame(documents)
+    source_order = df.index.to_numpy().argsort(kind="stable")
+    df = df.reset_index(drop=True)
+    table = Table.from_pandas(df, preserve_index=False)
+    id_order = df["_id"].argsort(kind="stable").to_numpy()
+    table = table.append_column("_id_order", array(id_order, type=int32()))
+    table = table.append_column("_source_order", array(source_order, type=int32()))
+    metadata = {
+        "mode_ranges": dumps(get_mode_ranges(df)),
+        "rows": str(len(df))
+    }
+    return table.replace_schema_metadata(metadata)
+
+
+def write_catalogue(table: Table, path: str):
+    """Atomically write table to path as an uncompressed arrow ipc file."""
+    logger = getLogger()
+    path = abspath(path)
+    logger.info("Publishing catalogue of %s rows to: %s", table.num_rows, path)
+    with NamedTemporaryFile(dir=dirname(path), suffix=".tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    with OSFile(tmp_path, "wb") as sink:
+        with new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    with open(tmp_path, "rb") as f:
+        fsync(f.fileno())
+    replace(tmp_path, path)
+
+
+def publish(documents: list[dict], path: str) -> Table | None:
+    """Publish documents as the catalogue file at path."""
+    logger = getLogger()
+    if not documents:
+        logger.info("No documents to publish, keeping existing catalogue.")
+        return None
+    table = get_catalogue_table(documents)
+    write_catalogue(table, path)
+    return table
@@ -0,0 +1,37 @@
+"""Module for logging through a queue so slow handlers never block the scraping loop."""
+
+from atexit import register
+from logging import getLogger, Formatter, Logger, StreamHandler
+from logging.handlers import QueueHandler, QueueListener
+from os import environ as ENV
+from queue import SimpleQueue
+import sys
+
+FORMAT = "%(asctime)s %(levelname)s %(module)s: %(message)s"
+
+_listener = {"instance": None, "handler": None}
+
+
+def set_logger() -> Logger:
+    """Set root logger to hand records to a background thread for writing."""
+    logger = getLogger()
+    logger.setLevel(ENV.get("LOG_LEVEL", "INFO").upper())
+    if _listener["instance"] is None:
+        queue = SimpleQueue()
+        handler = StreamHandler(sys.stdout)
+        handler.setFormatter(Formatter(FORMAT))
+        listener = QueueListener(queue, handler, respect_handler_level=True)
+        listener.start()
+        register(stop_logger)
+        _listener["handler"] = QueueHandler(queue)
+        logger.addHandler(_listener["handler"])
+        _listener["instance"] = listener
+    return logger
+
+
+def stop_logger():
+    """Write any queued records and remove the queue handler."""
+    if _listener["instance"] is not None:
+        _listener["instance"].stop()
+        getLogger().removeHandler(_listener["handler"])
+        _listener.update({"instance": None, "handler": None})
@@ -0,0 +1,205 @@
+"""Module for running the pipeline over page range shards in parallel processes."""
+
+from os import environ as ENV, makedirs, remove, replace, cpu_count
+from os.path import join, exists
+from json import loads, dumps
+from shutil import copyfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from datetime import datetime, timezone
+from time import perf_counter
+from logging import getLogger
+
+from pandas import DataFrame, concat
+from pyarrow.parquet import read_table, write_table
+
+from extract import extract
+from transform import transform
+from images import INDEX_NAME, render_images, merge_indexes
+from validate import get_cache_path, merge_caches
+from snapshot import get_table
+from journal import JOURNAL_TTL, get_journal_path, remove_journal
+from queue_log import set_logger
+
+
+def get_shards(start: int, end: int, count: int) -> list[tuple[int, int]]:
+    """Return inclusive page ranges splitting start to end into at most count shards."""
+    pages = end - start + 1
+    count = max(1, min(count, pages))
+    size, extra = divmod(pages, count)
+    shards = []
+    first = start
+    for i in range(count):
+        last = first + size - 1 + (i < extra)
+        shards.append((first, last))
+        first = last + 1
+    return shards
+
+
+def get_shard_name(start: int, end: int) -> str:
+    """Return file name stem for a shard."""
+    return f"shard-{start}-{end}"
+
+
+def read_report(directory: str, start: int, end: int) -> dict | None:
+    """Return report of a finished shard still within the journal TTL, otherwise None."""
+    path = join(directory, f"{get_shard_name(start, end)}.json")
+    if not exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        report = loads(f.read())
+    finished = datetime.fromisoformat(report["finished"])
+    if datetime.now(timezone.utc) - finished > JOURNAL_TTL or not exists(report["path"]):
+        return None
+    return report
+
+
+def write_atomic(path: str, text: str):
+    """Write text to path through a temporary file so readers never see half a file."""
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    replace(f"{path}.tmp", path)
+
+
+def seed_copy(source: str, path: str):
+    """Start a shard's own copy of a shared file from it, unless the shard already has one."""
+    if exists(source) and not exists(path):
+        copyfile(source, path)
+
+
+@contextmanager
+def override_env(values: dict):
+    """Set environment variables for a block, restoring their previous values after."""
+    previous = {key: ENV.get(key) for key in values}
+    ENV.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                ENV.pop(key, None)
+            else:
+                ENV[key] = value
+
+
+def run_shard(start: int, end: int, directory: str, journal: str | None) -> dict:
+    """Return report of one shard extracted, transformed and rendered with its own caches."""
+    set_logger()
+    logger = getLogger()
+    makedirs(directory, exist_ok=True)
+    report = read_report(directory, start, end)
+    if report is not None:
+        logger.info("Shard %s to %s already finished, reusing it.", start, end)
+        return {**report, "reused": True}
+    name = get_shard_name(start, end)
+    timings = {}
+    begin = perf_counter()
+    raw_data = extract(start, end)
+    timings["extract"] = perf_counter() - begin
+    begin = perf_counter()
+    check_cache = f"{get_cache_path()}.{name}"
+    seed_copy(get_cache_path(), check_cache)
+    overrides = {"IMAGE_CHECK_CACHE": check_cache}
+    if journal:
+        overrides["SCRAPE_JOURNAL"] = f"{journal}.{name}"
+    with override_env(overrides):
+        df = transform(raw_data)
+    timings["transform"] = perf_counter() - begin
+    index_name = None
+    if ENV.get("IMAGE_STORE_PATH"):
+        begin = perf_counter()
+        index_name = f"index.{name}.json"
+        seed_copy(join(ENV["IMAGE_STORE_PATH"], INDEX_NAME),
+                  join(ENV["IMAGE_STORE_PATH"], index_name))
+        df = render_images(df, ENV["IMAGE_STORE_PATH"], index_name)
+        timings["images"] = perf_counter() - begin
+    path = join(directory, f"{name}.parquet")
+    write_table(get_table(df), f"{path}.tmp")
+    replace(f"{path}.tmp", path)
+    report = {
+        "start": start,
+        "end": end,
+        "path": path,
+        "extracted": len(raw_data),
+        "rows": len(df),
+        "missing_names": int(df["name"].isna().sum()) if "name" in df else 0,
+        "image_check_cache": check_cache,
+        "image_index": index_name,
+        "journal": overrides.get("SCRAPE_JOURNAL"),
+        "seconds": {stage: round(s, 3) for stage, s in timings.items()},
+        "finished": datetime.now(timezone.utc).isoformat(),
+        "reused": False
+    }
+    write_atomic(join(directory, f"{name}.json"), dumps(report, indent=2))
+    logger.info("Shard %s to %s finished with %s rows.", start, end, len(df))
+    return report
+
+
+def run_shards(shards: list[tuple[int, int]], directory: str, workers: int = None) -> list[dict]:
+    """Return reports of shards run across a pool of fresh processes."""
+    workers = min(workers or cpu_count() or 1, len(shards))
+    journal = get_journal_path()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(run_shard, start, end, directory, journal) for start, end in shards]
+        return [future.result() for future in futures]
+
+
+def read_frame(path: str) -> DataFrame:
+    """Return a shard frame, with list and struct cells read back as python objects."""
+    table = read_table(path)
+    return DataFrame(table.to_pylist(), columns=table.column_names)
+
+
+def merge_shards(reports: list[dict]) -> tuple[DataFrame, dict]:
+    """Return shard frames merged in page order without repeated ids, and the run report."""
+    reports = sorted(reports, key=lambda r: r["start"])
+    frames = [read_frame(report["path"]) for report in reports]
+    merged = concat(frames, ignore_index=True) if frames else DataFrame()
+    rows = len(merged)
+    if rows:
+        merged = merged.drop_duplicates("_id", keep="first").reset_index(drop=True)
+    run_report = {
+        "shards": reports,
+        "extracted": sum(r["extracted"] for r in reports),
+        "rows": rows,
+        "duplicates": rows - len(merged),
+        "unique": len(merged),
+        "missing_names": sum(r["missing_names"] for r in reports)
+    }
+    return merged, run_report
+
+
+def merge_shard_files(reports: list[dict]):
+    """Merge each shard's image check cache and image index into the shared ones."""
+    merge_caches(get_cache_path(),
+                 [r["image_check_cache"] for r in reports if r.get("image_check_cache")])
+    indexes = [r["image_index"] for r in reports if r.get("image_index")]
+    if indexes:
+        merge_indexes(ENV["IMAGE_STORE_PATH"], indexes)
+
+
+def clear_shards(directory: str, reports: list[dict]):
+    """Remove every shard frame, report and scrape journal once they have been loaded."""
+    for report in reports:
+        remove_journal(report.get("journal"))
+        name = get_shard_name(report["start"], report["end"])
+        for path in [report["path"], join(directory, f"{name}.json")]:
+            if exists(path):
+                remove(path)
+
+
+def collect_reports(shards: list[tuple[int, int]], directory: str) -> list[dict]:
+    """Return reports of every shard, raising ValueError if any has not finished."""
+    reports = [read_report(directory, start, end) for start, end in shards]
+    missing = [shard for shard, report in zip(shards, reports) if report is None]
+    if missing:
+        raise ValueError(f"Shards not finished: {missing}")
+    return reports
+
+
+def write_run_report(directory: str, report: dict):
+    """Write merged run report beside the shard files."""
+    write_atomic(join(directory, "report.json"), dumps(report, indent=2))
+    getLogger().info("Merged %s shards into %s vehicles, dropping %s duplicates.",
+                     len(report["shards"]), report["unique"], report["duplicates"])
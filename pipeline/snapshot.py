@@ -0,0 +1,87 @@
+"""Module for writing columnar parquet snapshots of each pipeline run."""
+
+from os import environ as ENV
+from os.path import abspath
+from json import dumps
+from datetime import datetime, timezone
+from logging import getLogger
+
+from pandas import DataFrame
+from pyarrow import Table
+from pyarrow.fs import FileSystem
+from pyarrow.dataset import write_dataset, partitioning, ParquetFileFormat
+
+
+def get_run_id() -> str:
+    """Return a sortable identifier for the current run."""
+    return datetime.now(timezone.utc).strftime(r"%Y%m%dT%H%M%SZ")
+
+
+def get_table(df: DataFrame) -> Table:
+    """Return arrow table from dataframe."""
+    logger = getLogger()
+    logger.info("Converting dataframe to arrow table...")
+    return Table.from_pandas(df, preserve_index=False)
+
+
+def get_manifest(table: Table, run_id: str, files: list[dict]) -> dict:
+    """Return manifest describing the files written for a run."""
+    return {
+        "run_id": run_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "rows": table.num_rows,
+        "partition_by": ["mode"],
+        "compression": "zstd",
+        "schema": {field.name: str(field.type) for field in table.schema},
+        "files": sorted(files, key=lambda f: f["path"])
+    }
+
+
+def write_snapshot(df: DataFrame, uri: str, run_id: str = None) -> dict:
+    """Write mode partitioned parquet snapshot and manifest under uri."""
+    logger = getLogger()
+    run_id = run_id or get_run_id()
+    if "://" not in uri:
+        uri = abspath(uri)
+    fs, root = FileSystem.from_uri(uri)
+    run_dir = f"{root.rstrip('/')}/run={run_id}"
+    logger.info("Writing parquet snapshot to: %s", run_dir)
+
+    table = get_table(df)
+    files = []
+
+    def record_file(written):
+        files.append({
+            "path": written.path[len(run_dir) + 1:],
+            "rows": written.metadata.num_rows,
+            "bytes": written.size
+        })
+
+    write_dataset(
+        table,
+        run_dir,
+        filesystem=fs,
+        format="parquet",
+        partitioning=partitioning(table.select(["mode"]).schema, flavor="hive"),
+        file_options=ParquetFileFormat().make_write_options(compression="zstd"),
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=record_file
+    )
+
+    manifest = get_manifest(table, run_id, files)
+    with fs.open_output_stream(f"{run_dir}/_manifest.json") as f:
+        f.write(dumps(manifest, indent=4).encode("utf-8"))
+    with fs.open_output_stream(f"{root.rstrip('/')}/latest.json") as f:
+        f.write(dumps({"run_id": run_id, "path": f"run={run_id}"}).encode("utf-8"))
+    logger.info("Wrote %s rows across %s files.", manifest["rows"], len(files))
+    return manifest
+
+
+def snapshot(df: DataFrame) -> dict | None:
+    """Write snapshot to SNAPSHOT_PATH if it is configured."""
+    uri = ENV.get("SNAPSHOT_PATH")
+    if not uri:
+        getLogger().info("No SNAPSHOT_PATH set, skipping parquet snapshot.")
+        return None
+    return write_snapshot(df, uri)
@@ -0,0 +1,47 @@
+"""Module for computing catalogue statistics at load time."""
+
+from datetime import datetime, timezone
+from logging import getLogger
+
+from pandas import DataFrame
+
+SHARE_COLUMNS = ["is_premium", "is_event", "is_pack", "is_marketplace", "is_squadron"]
+
+
+def get_counts(series) -> dict:
+    """Return value counts with string keys, sorted by value."""
+    counts = series.value_counts().sort_index()
+    return {str(k): int(v) for k, v in counts.items()}
+
+
+def get_br_band(br) -> str:
+    """Return battle rating band label such as 4.0-4.7."""
+    return f"{int(br)}.0-{int(br)}.7"
+
+
+def get_stats(df: DataFrame) -> dict:
+    """Return aggregate statistics over the catalogue dataframe."""
+    logger = getLogger()
+    logger.info("Computing catalogue statistics for %s vehicles...", len(df))
+    stats = {
+        "_id": "catalogue",
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "total": int(len(df))
+    }
+    if df.empty:
+        return stats
+
+    bands = df["realistic_br"].floordiv(1).astype(int)
+    stats["by_mode"] = get_counts(df["mode"])
+    stats["by_country"] = get_counts(df["country"])
+    stats["by_tier"] = get_counts(df["tier"].astype(int))
+    stats["by_br_band"] = {get_br_band(k): v for k, v in get_counts(bands).items()}
+    stats["by_mode_country"] = {
+        mode: {country: int(n) for country, n in counts.items()}
+        for mode, counts in df.groupby("mode")["country"].value_counts().unstack(fill_value=0)
+        .to_dict(orient="index").items()
+    }
+    shares = df[SHARE_COLUMNS].astype(bool).mean()
+    stats["shares"] = {col.removeprefix("is_"): round(float(shares[col]), 4)
+                       for col in SHARE_COLUMNS}
+    return stats
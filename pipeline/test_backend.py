@@ -0,0 +1,81 @@
+# pylint: skip-file
+"""Tests for backend module."""
+
+from datetime import datetime
+from json import loads
+
+from pandas import NaT
+from pytest import fixture, raises
+
+from backend import SQLiteStorage, encode
+
+
+@fixture
+def storage(tmp_path):
+    return SQLiteStorage(str(tmp_path / "thundle.db"))
+
+
+def get_docs(n, mode="ground"):
+    return [{"_id": f"tank_{i}", "mode": mode, "tier": i} for i in range(n)]
+
+
+class TestEncode:
+    def test_dates_as_iso_strings(self):
+        assert encode({"release_date": datetime(2017, 1, 1)}) == \
+            '{"release_date": "2017-01-01T00:00:00"}'
+
+    def test_missing_values_as_null(self):
+        assert encode({"release_date": NaT, "tier": float("nan"), "clues": [NaT]}) == \
+            '{"release_date": null, "tier": null, "clues": [null]}'
+
+
+class TestInsertNew:
+    def test_skips_existing_ids(self, storage):
+        assert storage.insert_new(get_docs(2)) == 2
+        assert storage.insert_new(get_docs(3)) == 1
+        assert [doc["_id"] for doc in storage.get_all()] == ["tank_0", "tank_1", "tank_2"]
+
+    def test_updates_derived_fields_of_existing(self, storage):
+        storage.insert_new(get_docs(1))
+        docs = [{**get_docs(1)[0], "name": "renamed", "blur_images": {"blur-lg": "abc"},
+                 "clue_description": "The ???.", "clues": ["The ???."]}]
+        assert storage.insert_new(docs) == 0
+        stored = storage.get_all()[0]
+        assert stored["blur_images"] == {"blur-lg": "abc"}
+        assert stored["clues"] == ["The ???."]
+        assert "name" not in stored
+
+
+class TestReplaceAll:
+    def test_replaces_every_vehicle(self, storage):
+        storage.insert_new(get_docs(10))
+        storage.replace_all(get_docs(10, mode="air"))
+        assert {doc["mode"] for doc in storage.get_all()} == {"air"}
+
+    def test_refuses_to_shrink(self, storage):
+        storage.insert_new(get_docs(10))
+        with raises(ValueError):
+            storage.replace_all(get_docs(5))
+        assert len(storage.get_all()) == 10
+
+    def test_allow_shrink(self, storage):
+        storage.insert_new(get_docs(10))
+        storage.replace_all(get_docs(5), allow_shrink=True)
+        assert len(storage.get_all()) == 5
+
+    def test_retires_dropped_archived_vehicles(self, storage):
+        storage.insert_new(get_docs(10))
+        storage.conn.executemany(
+            "INSERT INTO cache (date, data_set, game_mode, vehicle_id) VALUES (?, ?, ?, ?)",
+            [("01/01/2025", "all", "blur", "tank_0"), ("02/01/2025", "all", "blur", "tank_9")])
+        storage.replace_all(get_docs(9), allow_shrink=True)
+        retired = storage.conn.execute("SELECT _id, document FROM retired").fetchall()
+        assert [(row[0], loads(row[1])["tier"]) for row in retired] == [("tank_9", 9)]
+
+
+class TestStoreStats:
+    def test_upserts(self, storage):
+        storage.store_stats({"_id": "catalogue", "total": 1})
+        storage.store_stats({"_id": "catalogue", "total": 2})
+        row = storage.conn.execute("SELECT document FROM stats").fetchall()
+        assert row == [('{"_id": "catalogue", "total": 2}',)]
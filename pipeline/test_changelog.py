@@ -0,0 +1,22 @@
+# pylint: skip-file
+"""Tests for changelog module."""
+
+from changelog import get_changes, get_name_map
+
+
+class TestGetChanges:
+    def test_added_renamed_removed(self):
+        previous = {"a": {"name": "A", "mode": "air"}, "b": {"name": "B", "mode": "air"},
+                    "c": {"name": "C", "mode": "ground"}}
+        documents = [{"_id": "a", "name": "A", "mode": "air"},
+                     {"_id": "b", "name": "B2", "mode": "air"},
+                     {"_id": "d", "name": "D", "mode": "naval"}]
+        assert get_changes(previous, documents) == [
+            {"vehicle_id": "b", "change": "renamed", "name": "B2", "mode": "air"},
+            {"vehicle_id": "d", "change": "added", "name": "D", "mode": "naval"},
+            {"vehicle_id": "c", "change": "removed", "name": "C", "mode": "ground"},
+        ]
+
+    def test_no_changes(self):
+        documents = [{"_id": "a", "name": "A", "mode": "air"}]
+        assert get_changes(get_name_map(documents), documents) == []
@@ -0,0 +1,55 @@
+# pylint: skip-file
+"""Tests for clues module."""
+
+from pandas import DataFrame
+
+from clues import MASK, MAX_CLUES, get_name_variants, redact, get_clues, add_clues
+
+DESCRIPTION = ("The M4A3 (76) W is an American medium tank. It was introduced in Update 1.45. "
+               "The M4A3(76)W saw service in Europe alongside other Shermans.")
+
+
+class TestGetNameVariants:
+    def test_variants(self):
+        assert get_name_variants("M4A3 (76) W") == ["M4A3 (76) W", "M4A3 W", "M4A3"]
+
+    def test_plain_name(self):
+        assert get_name_variants("Tiger") == ["Tiger"]
+
+
+class TestRedact:
+    def test_masks_name_and_variants(self):
+        redacted = redact(DESCRIPTION, "M4A3 (76) W")
+        assert "M4A3" not in redacted
+        assert redacted.startswith(f"The {MASK} is an American medium tank.")
+
+    def test_ignores_case_and_separators(self):
+        assert redact("the pz kpfw-vi was heavy", "Pz.Kpfw. VI") == f"the {MASK} was heavy"
+
+    def test_keeps_words_containing_name(self):
+        assert redact("Tigers and a Tiger", "Tiger") == f"Tigers and a {MASK}"
+
+
+class TestGetClues:
+    def test_least_revealing_first(self):
+        clues = get_clues(redact(DESCRIPTION, "M4A3 (76) W"))
+        assert clues[-1].startswith(f"The {MASK} is an American medium tank.")
+        assert clues[0].endswith("alongside other Shermans.")
+
+    def test_merges_short_sentences(self):
+        assert get_clues("Short. Also short. This sentence is quite a bit longer than the others.") == \
+            ["Short. Also short. This sentence is quite a bit longer than the others."]
+
+    def test_caps_number_of_clues(self):
+        text = " ".join(f"Sentence number {i} is long enough to stand alone as a clue." for i in range(10))
+        assert len(get_clues(text)) == MAX_CLUES
+
+
+class TestAddClues:
+    def test_adds_columns(self):
+        df = DataFrame([{"name": "Tiger", "description": "The Tiger is a heavy tank."},
+                        {"name": "T-34", "description": None}])
+        result = add_clues(df)
+        assert result["clue_description"].tolist() == [f"The {MASK} is a heavy tank.", None]
+        assert result["clues"].tolist() == [[f"The {MASK} is a heavy tank."], []]
+        assert "clues" not in df
@@ -0,0 +1,57 @@
+# pylint: skip-file
+"""Tests for images module."""
+
+from io import BytesIO
+from asyncio import run
+from unittest.mock import patch
+
+from pandas import DataFrame
+from PIL import Image
+
+from images import (BLUR_LEVELS, MAX_WIDTH, render_variants, store_variant,
+                    get_digest_path, load_index, render_all)
+
+
+def get_png(width=800, height=400):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestRenderVariants:
+    def test_renders_every_level_resized(self):
+        variants = render_variants(get_png())
+        assert set(variants) == set(BLUR_LEVELS)
+        with Image.open(BytesIO(variants["blur-lg"])) as image:
+            assert image.format == "WEBP"
+            assert image.size == (MAX_WIDTH, 320)
+
+    def test_keeps_small_images(self):
+        variants = render_variants(get_png(100, 50))
+        with Image.open(BytesIO(variants["blur-none"])) as image:
+            assert image.size == (100, 50)
+
+
+class TestStoreVariant:
+    def test_content_addressed(self, tmp_path):
+        digest = store_variant(str(tmp_path), b"data")
+        assert store_variant(str(tmp_path), b"data") == digest
+        with open(get_digest_path(str(tmp_path), digest), "rb") as f:
+            assert f.read() == b"data"
+
+
+class TestRenderAll:
+    def test_downloads_each_vehicle_once(self, tmp_path):
+        df = DataFrame([{"_id": "p-51", "image_url": "http://example.com/p-51.png"}])
+        with patch("images.download_image", return_value=get_png()) as mock_download:
+            index = run(render_all(df, str(tmp_path)))
+            run(render_all(df, str(tmp_path)))
+        assert mock_download.call_count == 1
+        assert set(index["p-51"]) == set(BLUR_LEVELS)
+        assert load_index(str(tmp_path)) == index
+
+    def test_failed_download_is_not_indexed(self, tmp_path):
+        df = DataFrame([{"_id": "p-51", "image_url": "http://example.com/p-51.png"}])
+        with patch("images.download_image", return_value=None):
+            index = run(render_all(df, str(tmp_path)))
+        assert index == {}
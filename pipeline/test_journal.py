@@ -0,0 +1,53 @@
+# pylint: skip-file
+"""Tests for journal module."""
+
+from datetime import datetime, timedelta, timezone
+from json import dumps
+
+from journal import ScrapeJournal, read_journal
+
+
+def get_result(identifier):
+    return {"_id": identifier, "name": identifier.upper(), "description": "desc"}
+
+
+class TestScrapeJournal:
+    def test_resumes_with_pending_only(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        journal = ScrapeJournal(path)
+        journal.append(get_result("a"))
+        journal.close()
+
+        resumed = ScrapeJournal(path)
+        assert resumed.get_pending(["a", "b"]) == ["b"]
+        assert resumed.get_results(["a", "b"]) == [get_result("a")]
+        resumed.close()
+
+    def test_skips_torn_last_line(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = ScrapeJournal(str(path))
+        journal.append(get_result("a"))
+        journal.close()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"_id": "b", "na')
+        resumed = ScrapeJournal(str(path))
+        assert resumed.get_pending(["a", "b"]) == ["b"]
+        resumed.close()
+        assert len(path.read_text().splitlines()) == 1
+
+    def test_expired_entries_dropped_on_compact(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        old = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+        path.write_text(dumps({**get_result("a"), "scraped": old}) + "\n")
+        journal = ScrapeJournal(str(path))
+        assert journal.get_pending(["a"]) == ["a"]
+        journal.close()
+        assert path.read_text() == ""
+
+    def test_compact_keeps_original_timestamp(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        scraped = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+        path.write_text(dumps({**get_result("a"), "scraped": scraped}) + "\n")
+        ScrapeJournal(str(path)).close()
+        now = datetime.now(timezone.utc)
+        assert read_journal(str(path), now)["a"]["scraped"] == scraped
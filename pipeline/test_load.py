@@ -3,7 +3,11 @@
 
 from unittest.mock import MagicMock, patch
 
-from load import get_json, upload_files, insert_document, load
+from pytest import raises
+
+from backend import SQLiteStorage
+from load import (get_json, upload_files, insert_document, store_stats,
+                  validate_staging, swap_collection, load)
 
 
 # ---------------------------------------------------------------------------
@@ -42,6 +46,22 @@ class TestInsertDocument:
         inserted = insert_document(col, doc)
 
         col.insert_one.assert_not_called()
+        col.update_one.assert_not_called()
+        assert inserted is False
+
+    def test_updates_derived_fields_when_exists(self):
+        col = MagicMock()
+        col.find_one.return_value = {"_id": "a-20g"}
+        doc = {"_id": "a-20g", "name": "A-20G", "blur_images": {"blur-lg": "abc"},
+               "clue_description": "The ???.", "clues": ["The ???."]}
+
+        inserted = insert_document(col, doc)
+
+        col.insert_one.assert_not_called()
+        col.update_one.assert_called_once_with(
+            {"_id": "a-20g"}, {"$set": {"blur_images": {"blur-lg": "abc"},
+                                        "clue_description": "The ???.",
+                                        "clues": ["The ???."]}})
         assert inserted is False
 
 
@@ -72,6 +92,96 @@ class TestUploadFiles:
             mock_insert.assert_not_called()
 
 
+# ---------------------------------------------------------------------------
+# Tests for validate_staging and swap_collection
+# ---------------------------------------------------------------------------
+def get_mongo(staging, live):
+    db = MagicMock()
+    db.__getitem__.side_effect = lambda name: staging if name.endswith("_staging") else live
+    mongo = MagicMock()
+    mongo.__getitem__.return_value = db
+    return mongo
+
+
+class TestValidateStaging:
+    def test_passes_matching_count(self):
+        staging = MagicMock()
+        staging.count_documents.return_value = 100
+        validate_staging(staging, 100, 105)
+
+    def test_rejects_missing_documents(self):
+        staging = MagicMock()
+        staging.count_documents.return_value = 99
+        with raises(ValueError):
+            validate_staging(staging, 100, 100)
+
+    def test_rejects_shrinking_catalogue(self):
+        staging = MagicMock()
+        staging.count_documents.return_value = 50
+        with raises(ValueError):
+            validate_staging(staging, 50, 100)
+        validate_staging(staging, 50, 100, allow_shrink=True)
+
+
+class TestSwapCollection:
+    def test_bulk_loads_and_renames(self, sample_docs):
+        staging, live = MagicMock(), MagicMock()
+        staging.count_documents.return_value = len(sample_docs)
+        live.estimated_document_count.return_value = len(sample_docs)
+
+        swap_collection(get_mongo(staging, live), sample_docs + sample_docs[:1])
+
+        staging.drop.assert_called_once()
+        staging.insert_many.assert_called_once_with(sample_docs, ordered=False)
+        staging.create_index.assert_called_once_with("mode")
+        staging.rename.assert_called_once_with("vehicles", dropTarget=True)
+        live.find_one.assert_not_called()
+
+    def test_retires_dropped_archived_vehicles(self, sample_docs):
+        collections = {name: MagicMock() for name in
+                       ["vehicles", "vehicles_staging", "cache", "retired"]}
+        collections["vehicles_staging"].count_documents.return_value = len(sample_docs)
+        collections["vehicles"].estimated_document_count.return_value = len(sample_docs)
+        collections["cache"].distinct.return_value = [sample_docs[0]["_id"], "gone"]
+        collections["vehicles"].find.return_value = [{"_id": "gone", "name": "Gone"}]
+        db = MagicMock()
+        db.__getitem__.side_effect = lambda name: collections[name]
+        mongo = MagicMock()
+        mongo.__getitem__.return_value = db
+
+        swap_collection(mongo, sample_docs)
+
+        collections["vehicles"].find.assert_called_once_with({"_id": {"$in": ["gone"]}})
+        collections["retired"].replace_one.assert_called_once_with(
+            {"_id": "gone"}, {"_id": "gone", "name": "Gone"}, upsert=True)
+
+    def test_failed_validation_keeps_live(self, sample_docs):
+        staging, live = MagicMock(), MagicMock()
+        staging.count_documents.return_value = 1
+        live.estimated_document_count.return_value = 2
+
+        with raises(ValueError):
+            swap_collection(get_mongo(staging, live), sample_docs)
+
+        staging.rename.assert_not_called()
+        assert staging.drop.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# Tests for store_stats
+# ---------------------------------------------------------------------------
+class TestStoreStats:
+    def test_replaces_summary_document(self):
+        collection = MagicMock()
+        mongo = MagicMock()
+        mongo.__getitem__.return_value.__getitem__.return_value = collection
+        stats = {"_id": "catalogue", "total": 2}
+
+        store_stats(mongo, stats)
+
+        collection.replace_one.assert_called_once_with({"_id": "catalogue"}, stats, upsert=True)
+
+
 # ---------------------------------------------------------------------------
 # Tests for load (integration of helpers)
 # ---------------------------------------------------------------------------
@@ -98,3 +208,73 @@ class TestLoad:
             patch("load.get_client", MagicMock(return_value=MagicMock())):
             load(sample_df)
             spy_get_json.assert_called_once_with(sample_df)
+
+    def test_load_swap_mode(self, sample_df):
+        """Test that load swaps collections instead of inserting when asked."""
+        with patch("load.get_client", MagicMock(return_value=MagicMock())),\
+            patch("load.upload_files", MagicMock()) as mock_upload,\
+            patch("load.swap_collection", MagicMock()) as mock_swap:
+            load(sample_df, swap=True)
+        mock_upload.assert_not_called()
+        assert mock_swap.call_args[0][1] == sample_df.to_dict(orient="records")
+
+    def test_load_stores_stats_from_full_collection(self, sample_df):
+        """Test that load computes statistics over every stored document."""
+        documents = [{"_id": "a", "mode": "air", "name": "A"}]
+        with patch("load.get_client", MagicMock(return_value=MagicMock())),\
+            patch("load.upload_files", MagicMock()),\
+            patch("load.get_all_documents", MagicMock(return_value=documents)),\
+            patch("load.record_changes", MagicMock(return_value=3)),\
+            patch("load.get_stats", MagicMock(return_value={"total": 1})) as mock_get_stats,\
+            patch("load.store_stats", MagicMock()) as mock_store_stats:
+            load(sample_df)
+        assert mock_get_stats.call_args[0][0].to_dict(orient="records") == documents
+        assert mock_store_stats.call_args[0][1] == {"total": 1, "version": 3}
+
+    def test_load_publishes_catalogue_when_configured(self, sample_df, monkeypatch):
+        """Test that load republishes the catalogue from the full collection."""
+        monkeypatch.setenv("CATALOGUE_PATH", "catalogue.arrow")
+        with patch("load.get_client", MagicMock(return_value=MagicMock())),\
+            patch("load.upload_files", MagicMock()),\
+            patch("load.get_all_documents", MagicMock(return_value=[{"_id": "a", "name": "A", "mode": "air"}])),\
+            patch("load.get_stats", MagicMock()),\
+            patch("load.store_stats", MagicMock()),\
+            patch("load.publish", MagicMock()) as mock_publish:
+            load(sample_df)
+        mock_publish.assert_called_once_with([{"_id": "a", "name": "A", "mode": "air"}], "catalogue.arrow")
+
+    def test_load_skips_catalogue_by_default(self, sample_df, monkeypatch):
+        """Test that load does not scan the collection without a catalogue path."""
+        monkeypatch.delenv("CATALOGUE_PATH", raising=False)
+        with patch("load.get_client", MagicMock(return_value=MagicMock())),\
+            patch("load.upload_files", MagicMock()),\
+            patch("load.publish", MagicMock()) as mock_publish:
+            load(sample_df)
+        mock_publish.assert_not_called()
+
+    def test_load_into_sqlite(self, sample_df, monkeypatch, tmp_path):
+        """Test that SQLITE_PATH loads into the embedded storage without MongoDB."""
+        monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "thundle.db"))
+        sample_df["mode"] = "ground"
+        sample_df["name"] = sample_df["_id"]
+        with patch("load.get_client", MagicMock()) as mock_get_client,\
+            patch("load.get_stats", MagicMock(return_value={"_id": "catalogue", "total": 3})):
+            load(sample_df)
+        mock_get_client.assert_not_called()
+        stored = SQLiteStorage(str(tmp_path / "thundle.db")).get_all()
+        assert [doc["_id"] for doc in stored] == sample_df["_id"].tolist()
+
+    def test_load_records_name_changes(self, sample_df, monkeypatch, tmp_path):
+        """Test that each load with changes bumps the catalogue version."""
+        monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "thundle.db"))
+        sample_df["mode"] = "ground"
+        sample_df["name"] = sample_df["_id"]
+        with patch("load.get_stats", MagicMock(return_value={"_id": "catalogue", "total": 3})):
+            load(sample_df)
+            load(sample_df)
+            sample_df.loc[0, "name"] = "Renamed"
+            load(sample_df, swap=True)
+        storage = SQLiteStorage(str(tmp_path / "thundle.db"))
+        rows = storage.conn.execute("SELECT version, change, name FROM changes").fetchall()
+        assert [row[0] for row in rows] == [1] * len(sample_df) + [2]
+        assert rows[-1][1:] == ("renamed", "Renamed")
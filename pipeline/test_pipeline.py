@@ -1,2 +1,88 @@
 # pylint: skip-file
-"""Tests for pipeline script."""
\ No newline at end of file
+"""Tests for pipeline script."""
+
+from argparse import Namespace
+from unittest.mock import patch
+
+from pandas import DataFrame
+from pytest import raises
+
+from pipeline import run, run_sharded
+
+
+def get_args(**kwargs):
+    return Namespace(**{"start": 0, "end": 3, "swap": True, "profile": None, "shards": 2,
+                        "workers": None, "shard_dir": "shards", "shard_index": None,
+                        "merge": False, **kwargs})
+
+
+@patch("pipeline.clear_shards")
+@patch("pipeline.merge_shard_files")
+@patch("pipeline.write_run_report")
+@patch("pipeline.load")
+@patch("pipeline.merge_shards", return_value=(DataFrame({"_id": ["a"]}), {}))
+class TestRunSharded:
+    @patch("pipeline.run_shards", return_value=[{"start": 0}])
+    def test_loads_merged_shards_once(self, mock_run_shards, mock_merge, mock_load, mock_report,
+                                      mock_files, mock_clear):
+        run_sharded(get_args())
+        mock_run_shards.assert_called_once_with([(0, 1), (2, 3)], "shards", None)
+        mock_files.assert_called_once_with([{"start": 0}])
+        mock_load.assert_called_once_with(mock_merge.return_value[0], swap=True)
+        mock_report.assert_called_once()
+        mock_clear.assert_called_once_with("shards", [{"start": 0}])
+
+    @patch("pipeline.run_shard")
+    def test_single_shard_does_not_load(self, mock_run_shard, mock_merge, mock_load, mock_report,
+                                        mock_files, mock_clear):
+        run_sharded(get_args(shard_index=1))
+        assert mock_run_shard.call_args.args[:3] == (2, 3, "shards")
+        mock_load.assert_not_called()
+        mock_clear.assert_not_called()
+
+    def test_rejects_profile(self, mock_merge, mock_load, mock_report, mock_files, mock_clear):
+        with raises(ValueError):
+            run_sharded(get_args(profile="profiles"))
+        mock_load.assert_not_called()
+
+    def test_shard_index_out_of_range(self, mock_merge, mock_load, mock_report, mock_files,
+                                      mock_clear):
+        with raises(ValueError):
+            run_sharded(get_args(shard_index=2))
+
+    @patch("pipeline.collect_reports", return_value=[{"start": 0}])
+    @patch("pipeline.run_shards")
+    def test_merge_reads_finished_shards(self, mock_run_shards, mock_collect, mock_merge,
+                                         mock_load, mock_report, mock_files, mock_clear):
+        run_sharded(get_args(merge=True))
+        mock_run_shards.assert_not_called()
+        mock_collect.assert_called_once_with([(0, 1), (2, 3)], "shards")
+        mock_load.assert_called_once()
+
+
+@patch("pipeline.set_logger")
+@patch("pipeline.transform", return_value=DataFrame({"_id": ["a"]}))
+@patch("pipeline.extract", return_value=[])
+class TestRun:
+    def test_removes_journal_after_load(self, mock_extract, mock_transform, mock_logger,
+                                        tmp_path, monkeypatch):
+        journal = tmp_path / "journal.jsonl"
+        journal.write_text("")
+        monkeypatch.setenv("SCRAPE_JOURNAL", str(journal))
+        monkeypatch.delenv("IMAGE_STORE_PATH", raising=False)
+        with patch("pipeline.get_args", return_value=get_args(shards=1)),\
+                patch("pipeline.load"):
+            run()
+        assert not journal.exists()
+
+    def test_keeps_journal_when_load_fails(self, mock_extract, mock_transform, mock_logger,
+                                           tmp_path, monkeypatch):
+        journal = tmp_path / "journal.jsonl"
+        journal.write_text("")
+        monkeypatch.setenv("SCRAPE_JOURNAL", str(journal))
+        monkeypatch.delenv("IMAGE_STORE_PATH", raising=False)
+        with patch("pipeline.get_args", return_value=get_args(shards=1)),\
+                patch("pipeline.load", side_effect=ConnectionError("down")):
+            with raises(ConnectionError):
+                run()
+        assert journal.exists()
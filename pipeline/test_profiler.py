@@ -0,0 +1,67 @@
+# pylint: skip-file
+"""Tests for profiler module."""
+
+from json import loads
+from time import sleep
+
+import profiler
+from profiler import Sampler, RunProfiler, record_task, get_task_summary
+
+
+def busy_wait():
+    sleep(0.05)
+
+
+class TestSampler:
+    def test_collects_collapsed_stacks(self, tmp_path):
+        sampler = Sampler(interval=0.001)
+        sampler.start()
+        busy_wait()
+        sampler.stop()
+        assert sum(sampler.counts.values()) > 0
+        assert any("busy_wait (test_profiler.py" in stack for stack in sampler.counts)
+        path = tmp_path / "out.collapsed"
+        sampler.write(str(path))
+        stack, count = path.read_text().splitlines()[0].rsplit(" ", 1)
+        assert ";" in stack
+        assert int(count) > 0
+
+
+class TestRecordTask:
+    def test_ignored_when_inactive(self):
+        profiler._tasks.update({"active": False, "durations": {}})
+        record_task("wiki_fetch", 1.0)
+        assert get_task_summary() == {}
+
+    def test_summary(self):
+        profiler._tasks.update({"active": True, "durations": {}})
+        for seconds in [0.1, 0.2, 0.3]:
+            record_task("wiki_fetch", seconds)
+        summary = get_task_summary()["wiki_fetch"]
+        profiler._tasks["active"] = False
+        assert summary["count"] == 3
+        assert summary["total_s"] == 0.6
+        assert summary["p50_s"] == 0.2
+        assert summary["max_s"] == 0.3
+
+
+class TestRunProfiler:
+    def test_disabled_writes_nothing(self, tmp_path):
+        run = RunProfiler(None)
+        with run.stage("extract"):
+            pass
+        assert run.write_summary() is None
+        assert run.stages == {}
+
+    def test_writes_stage_profiles_and_summary(self, tmp_path):
+        run = RunProfiler(str(tmp_path))
+        with run.stage("extract"):
+            busy_wait()
+        record_task("wiki_fetch", 0.5)
+        summary = run.write_summary()
+        assert (tmp_path / f"{run.run_id}-extract.collapsed").exists()
+        written = loads((tmp_path / f"{run.run_id}-summary.json").read_text())
+        assert written == summary
+        assert written["stages_s"]["extract"] >= 0.05
+        assert written["async_tasks"]["wiki_fetch"]["count"] == 1
+        assert not profiler._tasks["active"]
@@ -0,0 +1,56 @@
+# pylint: skip-file
+"""Tests for publish module."""
+
+from pyarrow import memory_map
+from pyarrow.ipc import open_file
+
+from publish import get_mode_ranges, get_sorted_frame, get_catalogue_table, publish
+
+
+def get_documents():
+    return [
+        {"_id": "m1_abrams", "mode": "ground", "name": "M1 Abrams"},
+        {"_id": "p-51", "mode": "air", "name": "P-51"},
+        {"_id": "a-20g", "mode": "air", "name": "A-20G"},
+    ]
+
+
+class TestGetModeRanges:
+    def test_modes_are_contiguous(self):
+        df = get_sorted_frame(get_documents()).reset_index(drop=True)
+        assert df["_id"].tolist() == ["p-51", "a-20g", "m1_abrams"]
+        assert get_mode_ranges(df) == {"air": [0, 2], "ground": [2, 1]}
+
+
+class TestGetCatalogueTable:
+    def test_id_order_sorts_ids(self):
+        table = get_catalogue_table(get_documents())
+        ids = table.column("_id").to_pylist()
+        order = table.column("_id_order").to_pylist()
+        assert [ids[i] for i in order] == sorted(ids)
+
+    def test_source_order_keeps_database_order(self):
+        table = get_catalogue_table(get_documents())
+        ids = table.column("_id").to_pylist()
+        order = table.column("_source_order").to_pylist()
+        assert [ids[i] for i in order] == [doc["_id"] for doc in get_documents()]
+
+    def test_metadata_has_mode_ranges(self):
+        table = get_catalogue_table(get_documents())
+        assert b"mode_ranges" in table.schema.metadata
+        assert table.schema.metadata[b"rows"] == b"3"
+
+
+class TestPublish:
+    def test_writes_memory_mappable_file(self, tmp_path):
+        path = tmp_path / "catalogue.arrow"
+        publish(get_documents(), str(path))
+
+        table = open_file(memory_map(str(path), "r")).read_all()
+        assert table.num_rows == 3
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_skips_empty_documents(self, tmp_path):
+        path = tmp_path / "catalogue.arrow"
+        assert publish([], str(path)) is None
+        assert not path.exists()
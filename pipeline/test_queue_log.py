@@ -0,0 +1,32 @@
+# pylint: skip-file
+"""Tests for queue_log module."""
+
+from logging import DEBUG
+
+from pytest import fixture
+
+import queue_log
+from queue_log import set_logger, stop_logger
+
+
+@fixture
+def queue_logger(monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    monkeypatch.setattr(queue_log, "_listener", {"instance": None, "handler": None})
+    logger = set_logger()
+    yield logger
+    stop_logger()
+    logger.setLevel("WARNING")
+
+
+class TestSetLogger:
+    def test_installs_one_handler(self, queue_logger):
+        set_logger()
+        assert queue_logger.level == DEBUG
+        assert queue_logger.handlers.count(queue_log._listener["handler"]) == 1
+
+    def test_writes_through_queue(self, capfd, monkeypatch):
+        monkeypatch.setattr(queue_log, "_listener", {"instance": None, "handler": None})
+        set_logger().info("queued %s", "message")
+        stop_logger()
+        assert "INFO test_queue_log: queued message" in capfd.readouterr().out
@@ -0,0 +1,148 @@
+# pylint: skip-file
+"""Tests for shards module."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from json import loads, dumps
+from unittest.mock import patch
+
+from pandas import DataFrame
+from pyarrow.parquet import write_table
+from pytest import raises
+
+from snapshot import get_table
+from shards import (get_shards, run_shard, run_shards, merge_shards, merge_shard_files,
+                    collect_reports, clear_shards)
+
+
+def get_frame(ids):
+    return DataFrame({"_id": ids, "name": [i.upper() for i in ids]})
+
+
+def fake_transform(raw):
+    return get_frame([r["identifier"] for r in raw])
+
+
+def fake_extract(start, end):
+    return [{"identifier": f"v{page}"} for page in range(start, end + 1)]
+
+
+class TestGetShards:
+    def test_splits_evenly_with_remainder_first(self):
+        assert get_shards(0, 9, 3) == [(0, 3), (4, 6), (7, 9)]
+
+    def test_never_more_shards_than_pages(self):
+        assert get_shards(2, 3, 8) == [(2, 2), (3, 3)]
+
+    def test_single_shard(self):
+        assert get_shards(0, 14, 1) == [(0, 14)]
+
+
+@patch("shards.transform", side_effect=fake_transform)
+@patch("shards.extract", side_effect=fake_extract)
+class TestRunShard:
+    def test_writes_frame_and_report(self, mock_extract, mock_transform, tmp_path):
+        report = run_shard(0, 2, str(tmp_path), "journal.jsonl")
+        assert report["extracted"] == 3
+        assert report["rows"] == 3
+        assert not report["reused"]
+        saved = loads((tmp_path / "shard-0-2.json").read_text())
+        assert saved["path"] == report["path"]
+
+    def test_reuses_finished_shard(self, mock_extract, mock_transform, tmp_path):
+        run_shard(0, 2, str(tmp_path), "journal.jsonl")
+        report = run_shard(0, 2, str(tmp_path), "journal.jsonl")
+        assert report["reused"]
+        mock_extract.assert_called_once()
+
+    def test_reruns_expired_shard(self, mock_extract, mock_transform, tmp_path):
+        report = run_shard(0, 2, str(tmp_path), "journal.jsonl")
+        old = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+        (tmp_path / "shard-0-2.json").write_text(dumps({**report, "finished": old}))
+        assert not run_shard(0, 2, str(tmp_path), "journal.jsonl")["reused"]
+        assert mock_extract.call_count == 2
+
+    def test_uses_own_journal(self, mock_extract, mock_transform, tmp_path, monkeypatch):
+        monkeypatch.setenv("SCRAPE_JOURNAL", "journal.jsonl")
+        journals = []
+        mock_transform.side_effect = lambda raw: journals.append(
+            os.environ["SCRAPE_JOURNAL"]) or fake_transform(raw)
+        run_shard(3, 5, str(tmp_path), "journal.jsonl")
+        assert journals == ["journal.jsonl.shard-3-5"]
+        assert os.environ["SCRAPE_JOURNAL"] == "journal.jsonl"
+
+    def test_uses_own_image_check_cache(self, mock_extract, mock_transform, tmp_path,
+                                        monkeypatch):
+        cache = tmp_path / "checks.json"
+        cache.write_text('{"a": {"ok": true, "checked": "2025-01-01T00:00:00+00:00"}}')
+        monkeypatch.setenv("IMAGE_CHECK_CACHE", str(cache))
+        caches = []
+        mock_transform.side_effect = lambda raw: caches.append(
+            os.environ["IMAGE_CHECK_CACHE"]) or fake_transform(raw)
+        report = run_shard(3, 5, str(tmp_path), None)
+        assert caches == [f"{cache}.shard-3-5"] == [report["image_check_cache"]]
+        assert (tmp_path / "checks.json.shard-3-5").read_text() == cache.read_text()
+        assert os.environ["IMAGE_CHECK_CACHE"] == str(cache)
+
+    def test_run_shards_returns_reports_in_order(self, mock_extract, mock_transform, tmp_path):
+        with patch("shards.ProcessPoolExecutor",
+                   lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)):
+            reports = run_shards(get_shards(0, 5, 3), str(tmp_path), workers=2)
+        assert [(r["start"], r["end"]) for r in reports] == [(0, 1), (2, 3), (4, 5)]
+
+
+class TestMergeShards:
+    def write(self, tmp_path, start, ids):
+        path = str(tmp_path / f"shard-{start}.parquet")
+        write_table(get_table(get_frame(ids)), path)
+        return {"start": start, "end": start, "path": path, "extracted": len(ids),
+                "rows": len(ids), "missing_names": 0}
+
+    def test_reads_lists_and_dicts_back(self, tmp_path):
+        path = str(tmp_path / "shard-0.parquet")
+        df = DataFrame({"_id": ["a"], "clues": [["one", "two"]],
+                        "blur_images": [{"blur-lg": "abc"}]})
+        write_table(get_table(df), path)
+        merged, _ = merge_shards([{"start": 0, "path": path, "extracted": 1,
+                                   "missing_names": 0}])
+        assert merged["clues"][0] == ["one", "two"]
+        assert merged["blur_images"][0] == {"blur-lg": "abc"}
+
+    def test_drops_ids_repeated_across_shards(self, tmp_path):
+        reports = [self.write(tmp_path, 1, ["c", "d"]), self.write(tmp_path, 0, ["a", "b", "c"])]
+        merged, report = merge_shards(reports)
+        assert merged["_id"].tolist() == ["a", "b", "c", "d"]
+        assert report["rows"] == 5
+        assert report["duplicates"] == 1
+        assert report["unique"] == 4
+        assert report["extracted"] == 5
+
+    def test_merges_shard_caches_and_indexes(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("IMAGE_CHECK_CACHE", str(tmp_path / "checks.json"))
+        monkeypatch.setenv("IMAGE_STORE_PATH", str(tmp_path))
+        entry = {"ok": True, "checked": "2025-01-01T00:00:00+00:00"}
+        (tmp_path / "checks.json.shard-0-1").write_text(dumps({"a": entry}))
+        (tmp_path / "checks.json.shard-2-3").write_text(dumps({"b": entry}))
+        (tmp_path / "index.shard-0-1.json").write_text(dumps({"v0": {"blur-lg": "abc"}}))
+        merge_shard_files([
+            {"image_check_cache": str(tmp_path / "checks.json.shard-0-1"),
+             "image_index": "index.shard-0-1.json"},
+            {"image_check_cache": str(tmp_path / "checks.json.shard-2-3"), "image_index": None}
+        ])
+        assert set(loads((tmp_path / "checks.json").read_text())) == {"a", "b"}
+        assert loads((tmp_path / "index.json").read_text()) == {"v0": {"blur-lg": "abc"}}
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["checks.json", "index.json"]
+
+    def test_clear_shards_after_load(self, tmp_path):
+        report = self.write(tmp_path, 0, ["a"])
+        report["end"] = 0
+        report["journal"] = str(tmp_path / "journal.jsonl.shard-0-0")
+        (tmp_path / "journal.jsonl.shard-0-0").write_text("")
+        (tmp_path / "shard-0-0.json").write_text(dumps(report))
+        clear_shards(str(tmp_path), [report])
+        assert not list(tmp_path.iterdir())
+
+    def test_collect_reports_requires_every_shard(self, tmp_path):
+        with raises(ValueError):
+            collect_reports([(0, 1)], str(tmp_path))
@@ -0,0 +1,69 @@
+# pylint: skip-file
+"""Tests for snapshot module."""
+
+from json import loads
+
+from pandas import DataFrame
+from pyarrow.dataset import dataset
+
+from snapshot import get_manifest, get_table, write_snapshot, snapshot
+
+
+def get_vehicle_df():
+    return DataFrame(
+        [
+            {"_id": "a-20g", "mode": "air", "tier": 2, "description": None},
+            {"_id": "f-16c", "mode": "air", "tier": 7, "description": "Jet."},
+            {"_id": "m1_abrams", "mode": "ground", "tier": 7, "description": "Tank."},
+        ]
+    )
+
+
+class TestGetManifest:
+    def test_manifest_lists_files_and_schema(self):
+        table = get_table(get_vehicle_df())
+        files = [{"path": "mode=b/part-0.parquet"}, {"path": "mode=a/part-0.parquet"}]
+
+        manifest = get_manifest(table, "run_1", files)
+
+        assert manifest["rows"] == 3
+        assert manifest["partition_by"] == ["mode"]
+        assert set(manifest["schema"]) == {"_id", "mode", "tier", "description"}
+        assert manifest["files"][0]["path"] == "mode=a/part-0.parquet"
+
+
+class TestWriteSnapshot:
+    def test_writes_partition_per_mode(self, tmp_path):
+        manifest = write_snapshot(get_vehicle_df(), str(tmp_path), "run_1")
+
+        run_dir = tmp_path / "run=run_1"
+        assert (run_dir / "mode=air" / "part-0.parquet").exists()
+        assert (run_dir / "mode=ground" / "part-0.parquet").exists()
+        assert sum(f["rows"] for f in manifest["files"]) == 3
+
+    def test_writes_manifest_and_latest_pointer(self, tmp_path):
+        write_snapshot(get_vehicle_df(), str(tmp_path), "run_1")
+
+        manifest = loads((tmp_path / "run=run_1" / "_manifest.json").read_text())
+        latest = loads((tmp_path / "latest.json").read_text())
+        assert manifest["run_id"] == "run_1"
+        assert latest == {"run_id": "run_1", "path": "run=run_1"}
+
+    def test_snapshot_round_trips(self, tmp_path):
+        write_snapshot(get_vehicle_df(), str(tmp_path), "run_1")
+
+        table = dataset(str(tmp_path / "run=run_1"), partitioning="hive").to_table()
+        ids = sorted(table.column("_id").to_pylist())
+        assert ids == ["a-20g", "f-16c", "m1_abrams"]
+
+
+class TestSnapshot:
+    def test_skips_without_path(self, monkeypatch):
+        monkeypatch.delenv("SNAPSHOT_PATH", raising=False)
+        assert snapshot(get_vehicle_df()) is None
+
+    def test_uses_configured_path(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("SNAPSHOT_PATH", str(tmp_path))
+        manifest = snapshot(get_vehicle_df())
+        assert manifest["rows"] == 3
+        assert (tmp_path / "latest.json").exists()
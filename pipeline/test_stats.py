@@ -0,0 +1,47 @@
+# pylint: skip-file
+"""Tests for stats module."""
+
+from pandas import DataFrame
+
+from stats import get_stats, get_br_band
+
+
+def get_catalogue_df():
+    base = {"is_event": False, "is_pack": False, "is_marketplace": False, "is_squadron": False}
+    return DataFrame([
+        {**base, "mode": "air", "country": "usa", "tier": 2, "realistic_br": 4.3, "is_premium": True},
+        {**base, "mode": "air", "country": "germany", "tier": 2, "realistic_br": 4.0, "is_premium": False},
+        {**base, "mode": "ground", "country": "germany", "tier": 8, "realistic_br": 11.7, "is_premium": False},
+        {**base, "mode": "ground", "country": "usa", "tier": 3, "realistic_br": 5.7, "is_premium": True},
+    ])
+
+
+class TestGetBrBand:
+    def test_band_label(self):
+        assert get_br_band(4) == "4.0-4.7"
+
+
+class TestGetStats:
+    def test_counts(self):
+        stats = get_stats(get_catalogue_df())
+        assert stats["_id"] == "catalogue"
+        assert stats["total"] == 4
+        assert stats["by_mode"] == {"air": 2, "ground": 2}
+        assert stats["by_country"] == {"germany": 2, "usa": 2}
+        assert stats["by_tier"] == {"2": 2, "3": 1, "8": 1}
+
+    def test_br_bands_in_numeric_order(self):
+        stats = get_stats(get_catalogue_df())
+        assert list(stats["by_br_band"]) == ["4.0-4.7", "5.0-5.7", "11.0-11.7"]
+        assert stats["by_br_band"]["4.0-4.7"] == 2
+
+    def test_mode_country_and_shares(self):
+        stats = get_stats(get_catalogue_df())
+        assert stats["by_mode_country"]["air"] == {"germany": 1, "usa": 1}
+        assert stats["shares"]["premium"] == 0.5
+        assert stats["shares"]["event"] == 0.0
+
+    def test_empty_catalogue(self):
+        stats = get_stats(DataFrame())
+        assert stats["total"] == 0
+        assert "by_mode" not in stats
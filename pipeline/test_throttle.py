@@ -0,0 +1,92 @@
+# pylint: skip-file
+"""Tests for throttle module."""
+
+from asyncio import run, gather, sleep
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from throttle import AdaptiveLimiter, parse_retry_after, get_backoff
+
+
+class TestAdaptiveLimiter:
+    def test_fast_responses_increase_limit(self):
+        limiter = AdaptiveLimiter(initial=2)
+
+        async def go():
+            for _ in range(10):
+                await limiter.acquire()
+                limiter.release(latency=0.1)
+
+        run(go())
+        assert limiter.limit > 2
+
+    def test_slow_responses_hold_limit(self):
+        limiter = AdaptiveLimiter(initial=4, target_latency=1.0)
+
+        async def go():
+            await limiter.acquire()
+            limiter.release(latency=5.0)
+
+        run(go())
+        assert limiter.limit == 4
+
+    def test_overload_halves_limit_once_per_cooldown(self):
+        limiter = AdaptiveLimiter(initial=8, cooldown=60)
+
+        async def go():
+            await limiter.acquire()
+            await limiter.acquire()
+            limiter.release(overloaded=True)
+            limiter.release(overloaded=True)
+
+        run(go())
+        assert limiter.limit == 4
+
+    def test_never_exceeds_limit(self):
+        limiter = AdaptiveLimiter(initial=2, maximum=2)
+        peak = 0
+
+        async def task():
+            nonlocal peak
+            await limiter.acquire()
+            peak = max(peak, limiter.in_flight)
+            await sleep(0.01)
+            limiter.release(latency=0.01)
+
+        async def go():
+            await gather(*[task() for _ in range(8)])
+
+        run(go())
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    def test_retry_after_pauses(self):
+        limiter = AdaptiveLimiter()
+
+        async def go():
+            await limiter.acquire()
+            limiter.release(overloaded=True, retry_after=30)
+
+        run(go())
+        assert limiter.paused_until > 0
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("12") == 12.0
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=60)
+        assert 50 < parse_retry_after(format_datetime(when, usegmt=True)) <= 60
+
+    def test_missing_or_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestGetBackoff:
+    def test_honours_retry_after(self):
+        assert get_backoff(0, 7.0) == 7.0
+
+    def test_capped(self):
+        assert get_backoff(20) <= 30.0
@@ -1,15 +1,47 @@
 # pylint: skip-file
 """Tests for transform module."""
 
+from asyncio import run
+from unittest.mock import patch, MagicMock
+
 from pandas import DataFrame
+from pytest import raises
+from aiohttp import ClientError
 
+from journal import ScrapeJournal
+from throttle import AdaptiveLimiter
 from transform import (
+    fetch,
+    fetch_name_and_description,
+    get_name_and_description,
     get_df_from_data,
     get_refined_frame,
     clean_dataframe,
     transform
 )
 
+
+class MockResponse:
+    def __init__(self, status, text="", headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._text = text
+
+    async def text(self):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def get_session(*responses):
+    session = MagicMock()
+    session.get.side_effect = list(responses)
+    return session
+
 class TestGetDfFromData:
     def test_get_df_from_data(self, raw_data):
         df = get_df_from_data(raw_data)
@@ -25,3 +57,87 @@ class TestGetRefinedFrame:
         assert isinstance(refined, DataFrame)
         assert list(refined.columns) == required_columns
         assert refined.shape[1] == len(required_columns)
+
+
+@patch("transform.sleep")
+class TestFetch:
+    def test_returns_text(self, mock_sleep):
+        session = get_session(MockResponse(200, "<html>"))
+        assert run(fetch(session, "url", AdaptiveLimiter())) == "<html>"
+        mock_sleep.assert_not_called()
+
+    def test_retries_overload_with_retry_after(self, mock_sleep):
+        session = get_session(MockResponse(429, headers={"Retry-After": "3"}),
+                              MockResponse(200, "<html>"))
+        limiter = AdaptiveLimiter(initial=4)
+
+
+        async def pause(seconds):
+            limiter.paused_until = 0
+
+        with patch("throttle.sleep", side_effect=pause) as mock_pause:
+            assert run(fetch(session, "url", limiter)) == "<html>"
+        assert 0 < mock_pause.call_args[0][0] <= 3
+        mock_sleep.assert_called_once_with(3.0)
+        assert limiter.limit < 4
+        assert limiter.in_flight == 0
+
+    def test_retries_client_errors(self, mock_sleep):
+        session = MagicMock()
+        session.get.side_effect = [ClientError("reset"), MockResponse(200, "<html>")]
+        assert run(fetch(session, "url", AdaptiveLimiter())) == "<html>"
+
+    def test_gives_up_after_retries(self, mock_sleep):
+        session = get_session(*[MockResponse(503) for _ in range(5)])
+        with raises(ClientError):
+            run(fetch(session, "url", AdaptiveLimiter()))
+        assert session.get.call_count == 5
+
+    def test_does_not_retry_missing_pages(self, mock_sleep):
+        session = get_session(MockResponse(404, "not found"))
+        assert run(fetch(session, "url", AdaptiveLimiter())) == "not found"
+
+
+class TestGetNameAndDescription:
+    def test_resumes_from_journal(self, tmp_path, monkeypatch):
+        path = tmp_path / "journal.jsonl"
+        monkeypatch.setenv("SCRAPE_JOURNAL", str(path))
+        journal = ScrapeJournal(str(path))
+        journal.append({"_id": "a", "name": "Name", "description": "Desc"})
+        journal.close()
+        df = DataFrame([{"_id": "a"}, {"_id": "b"}])
+        html = '<html><div class="content-markdown">Desc</div></html>'
+        with patch("transform.fetch", return_value=html) as mock_fetch,\
+            patch("transform.parse_name", return_value="Name"):
+            result = run(get_name_and_description(df))
+        assert mock_fetch.call_count == 1
+        assert result["name"].tolist() == ["Name", "Name"]
+        assert result["description"].tolist() == ["Desc", "Desc"]
+        assert len(path.read_text().splitlines()) == 2
+
+    def test_no_journal_unless_set(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("SCRAPE_JOURNAL")
+        monkeypatch.chdir(tmp_path)
+        df = DataFrame([{"_id": "a"}])
+        with patch("transform.fetch", return_value="<html></html>"),\
+            patch("transform.parse_name", return_value="Name"):
+            result = run(get_name_and_description(df))
+        assert result["name"].tolist() == ["Name"]
+        assert not list(tmp_path.iterdir())
+
+    def test_pages_without_name_not_journaled(self):
+        journal = MagicMock()
+        with patch("transform.fetch", return_value="<html></html>"),\
+            patch("transform.parse_name", return_value=None):
+            result = run(fetch_name_and_description(MagicMock(), "a", AdaptiveLimiter(), journal))
+        assert result["name"] is None
+        journal.append.assert_not_called()
+
+    def test_failed_fetches_not_journaled(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("SCRAPE_JOURNAL", str(tmp_path / "journal.jsonl"))
+        df = DataFrame([{"_id": "a"}])
+        with patch("transform.fetch", side_effect=ClientError("down")) as mock_fetch:
+            result = run(get_name_and_description(df))
+            run(get_name_and_description(df))
+        assert mock_fetch.call_count == 2
+        assert result["name"].isna().all()
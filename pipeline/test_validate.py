@@ -0,0 +1,74 @@
+# pylint: skip-file
+"""Tests for validate module."""
+
+from asyncio import run
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from pandas import DataFrame, isna
+
+from validate import needs_check, load_cache, save_cache, merge_caches, validate_image_urls
+
+URL_A = "https://static.encyclopedia.warthunder.com/images/tank_a.png"
+URL_B = "https://static.encyclopedia.warthunder.com/images/tank_b.png"
+
+
+def get_df():
+    return DataFrame([
+        {"_id": "tank_a", "image_url": URL_A},
+        {"_id": "tank_b", "image_url": URL_B},
+    ])
+
+
+class TestNeedsCheck:
+    def test_unknown_url(self):
+        assert needs_check(None, datetime.now(timezone.utc))
+
+    def test_ok_url_is_never_rechecked(self):
+        entry = {"ok": True, "checked": "2020-01-01T00:00:00+00:00"}
+        assert not needs_check(entry, datetime.now(timezone.utc))
+
+    def test_broken_url_rechecked_after_ttl(self):
+        now = datetime.now(timezone.utc)
+        recent = {"ok": False, "checked": now.isoformat()}
+        old = {"ok": False, "checked": (now - timedelta(days=8)).isoformat()}
+        assert not needs_check(recent, now)
+        assert needs_check(old, now)
+
+
+class TestValidateImageUrls:
+    def test_broken_urls_replaced(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("IMAGE_CHECK_CACHE", str(tmp_path / "cache.json"))
+        with patch("validate.check_urls", return_value={URL_A: True, URL_B: False}):
+            df = run(validate_image_urls(get_df()))
+        assert df.loc[0, "image_url"] == URL_A
+        assert isna(df.loc[1, "image_url"])
+
+    def test_inconclusive_urls_kept_and_not_cached(self, tmp_path, monkeypatch):
+        path = tmp_path / "cache.json"
+        monkeypatch.setenv("IMAGE_CHECK_CACHE", str(path))
+        with patch("validate.check_urls", return_value={URL_A: True, URL_B: None}):
+            df = run(validate_image_urls(get_df()))
+        assert df["image_url"].tolist() == [URL_A, URL_B]
+        assert set(load_cache(str(path))) == {URL_A}
+
+    def test_cached_urls_not_rechecked(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("IMAGE_CHECK_CACHE", str(tmp_path / "cache.json"))
+        with patch("validate.check_urls", return_value={URL_A: True, URL_B: False}):
+            run(validate_image_urls(get_df()))
+        with patch("validate.check_urls", return_value={}) as mock_check:
+            df = run(validate_image_urls(get_df()))
+        mock_check.assert_not_called()
+        assert isna(df.loc[1, "image_url"])
+
+
+class TestMergeCaches:
+    def test_latest_check_wins_and_shard_caches_removed(self, tmp_path):
+        path = str(tmp_path / "checks.json")
+        old = {"ok": False, "checked": "2025-01-01T00:00:00+00:00"}
+        new = {"ok": True, "checked": "2025-01-02T00:00:00+00:00"}
+        save_cache(path, {"a": new, "b": old})
+        save_cache(f"{path}.shard-0-1", {"a": old, "b": new})
+        merge_caches(path, [f"{path}.shard-0-1"])
+        assert load_cache(path) == {"a": new, "b": new}
+        assert [p.name for p in tmp_path.iterdir()] == ["checks.json"]
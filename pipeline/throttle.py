@@ -0,0 +1,77 @@
+"""Module for adaptively limiting concurrent requests to the wiki."""
+
+from asyncio import Event, sleep
+from time import monotonic
+from random import uniform
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from logging import getLogger
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit that grows while responses are fast and halves on overload."""
+
+    def __init__(self, initial: int = 5, minimum: int = 1, maximum: int = 40,
+                 target_latency: float = 2.0, decrease: float = 0.5, cooldown: float = 1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self._released = None
+
+    async def acquire(self):
+        """Wait until a request slot is free and any backoff pause has passed."""
+        if self._released is None:
+            self._released = Event()
+        while True:
+            wait = self.paused_until - monotonic()
+            if wait > 0:
+                await sleep(wait)
+                continue
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            self._released.clear()
+            await self._released.wait()
+
+    def release(self, latency: float = None, overloaded: bool = False,
+                retry_after: float = None):
+        """Free a slot and adjust the limit from the outcome of the request."""
+        self.in_flight -= 1
+        now = monotonic()
+        if overloaded:
+            if now - self.last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self.last_decrease = now
+                getLogger().info("Backing off wiki concurrency to %s", int(self.limit))
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+        elif latency is not None and latency <= self.target_latency:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._released.set()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return seconds to wait from a Retry-After header value."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_backoff(attempt: int, retry_after: float = None, base: float = 0.5,
+                cap: float = 30.0) -> float:
+    """Return seconds to wait before retrying, honouring Retry-After if given."""
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return uniform(0, min(cap, base * 2 ** attempt))
@@ -1,24 +1,54 @@
 """Module for transforming api response into refined DataFrame."""
 
 from json import loads
-from asyncio import run, gather, Semaphore
+from asyncio import run, gather, sleep, TimeoutError as AsyncTimeoutError
 from datetime import datetime
 from logging import getLogger
 from re import sub
+from time import monotonic
 
 from bs4 import BeautifulSoup
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientError
 from pandas import DataFrame, to_datetime, NA
 
-semaphore = Semaphore(5)
+from validate import validate_image_urls
+from throttle import AdaptiveLimiter, parse_retry_after, get_backoff
+from profiler import record_task
+from journal import ScrapeJournal, get_journal_path
+from clues import add_clues
 
-async def fetch(session: ClientSession, url: str) -> str:
-    """Get async client connection."""
+MAX_RETRIES = 4
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+async def fetch(session: ClientSession, url: str, limiter: AdaptiveLimiter) -> str:
+    """Get page text, adapting concurrency and retrying transient failures."""
     logger = getLogger()
-    logger.info("Fetching information from wiki: %s", url)
-    async with semaphore:
-        async with session.get(url, timeout=30) as resp:
-            return await resp.text()
+    logger.debug("Fetching information from wiki: %s", url)
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        await limiter.acquire()
+        start = monotonic()
+        try:
+            async with session.get(url, timeout=30) as resp:
+                if resp.status in RETRY_STATUSES:
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    limiter.release(overloaded=True, retry_after=retry_after)
+                    error = f"status {resp.status}"
+                else:
+                    text = await resp.text()
+                    limiter.release(latency=monotonic() - start)
+                    return text
+        except (ClientError, AsyncTimeoutError) as e:
+            limiter.release(overloaded=True)
+            error = repr(e)
+        except Exception:
+            limiter.release()
+            raise
+        if attempt < MAX_RETRIES:
+            logger.info("Retrying %s after %s (attempt %s)", url, error, attempt + 1)
+            await sleep(get_backoff(attempt, retry_after))
+    raise ClientError(f"Giving up on {url} after {MAX_RETRIES + 1} attempts: {error}")
 
 
 def parse_name(soup: BeautifulSoup) -> str:
@@ -35,20 +65,26 @@ def parse_desc(soup: BeautifulSoup) -> str:
     return desc.replace("␗", "") if desc else None
 
 
-async def fetch_name_and_description(session, identifier):
-    """Return name and description from wiki."""
+async def fetch_name_and_description(session, identifier, limiter, journal=None):
+    """Return name and description from wiki, journaling it if a name was found."""
+    logger = getLogger()
     url = f"https://wiki.warthunder.com/unit/{identifier}"
-    print(f"Fetching {url}")
+    start = monotonic()
     try:
-        html = await fetch(session, url)
+        html = await fetch(session, url, limiter)
+        record_task("wiki_fetch", monotonic() - start)
         soup = BeautifulSoup(html, "html.parser")
-        return {
+        result = {
             "_id": identifier,
             "name": parse_name(soup),
             "description": parse_desc(soup)
         }
+        if journal and result["name"]:
+            journal.append(result)
+        return result
     except Exception as e:
-        print(f"Error fetching {url}: {e.with_traceback()}")
+        logger.warning("Error fetching %s: %s", url, e)
+        record_task("wiki_fetch_failed", monotonic() - start)
         return {
             "_id": identifier,
             "name": None,
@@ -57,13 +93,25 @@ async def fetch_name_and_description(session, identifier):
 
 
 async def get_name_and_description(df: DataFrame) -> DataFrame:
-    """Return name and description added to dataframe."""
+    """Return name and description added to dataframe, resuming from a scrape journal if set."""
     identifiers = df["_id"].tolist()
-    async with ClientSession() as session:
-        tasks = [fetch_name_and_description(session, ident) for ident in identifiers]
-        results = await gather(*tasks)
-
-    result_df = DataFrame(results)
+    limiter = AdaptiveLimiter()
+    path = get_journal_path()
+    journal = ScrapeJournal(path) if path else None
+    pending = journal.get_pending(identifiers) if journal else identifiers
+    try:
+        async with ClientSession() as session:
+            tasks = [fetch_name_and_description(session, ident, limiter, journal)
+                     for ident in pending]
+            results = await gather(*tasks)
+    finally:
+        if journal:
+            journal.close()
+
+    if journal:
+        results = journal.get_results(identifiers) + results
+    result_df = DataFrame(results,
+                          columns=["_id", "name", "description"]).drop_duplicates("_id")
     df = df.merge(result_df, on="_id", how="left")
     return df
 
@@ -133,8 +181,10 @@ def transform(raw: list[dict]) -> DataFrame:
     """Return cleaned and refined dataframe from raw data."""
     df = get_df_from_data(raw)
     df = get_refined_frame(df)
+    df = run(validate_image_urls(df))
     df = run(get_name_and_description(df))
     df = clean_dataframe(df)
+    df = add_clues(df)
     return df
 
 
@@ -142,8 +192,10 @@ async def transform_async(raw: list[dict]) -> DataFrame:
     """Return cleaned and refined dataframe from raw data as async for use in notebook."""
     df = get_df_from_data(raw)
     df = get_refined_frame(df)
+    df = await validate_image_urls(df)
     df = await get_name_and_description(df)
     df = clean_dataframe(df)
+    df = add_clues(df)
     return df
 
 
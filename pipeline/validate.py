@@ -0,0 +1,111 @@
+"""Module for validating vehicle image urls before load."""
+
+from os import environ as ENV, remove, replace
+from os.path import exists
+from json import loads, dumps
+from asyncio import gather, Semaphore
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from pandas import DataFrame, NA
+
+FAILURE_TTL = timedelta(days=7)
+BROKEN_STATUSES = {403, 404, 410}
+
+
+def get_cache_path() -> str:
+    """Return path of the persisted image check cache."""
+    return ENV.get("IMAGE_CHECK_CACHE", "image_check_cache.json")
+
+
+def load_cache(path: str) -> dict:
+    """Return map of url to previous check result."""
+    if not exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return loads(f.read())
+
+
+def save_cache(path: str, cache: dict):
+    """Atomically write the check cache."""
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(dumps(cache, indent=4, sort_keys=True))
+    replace(f"{path}.tmp", path)
+
+
+def merge_caches(path: str, paths: list[str]):
+    """Merge shard check caches into the cache at path, keeping each url's latest check."""
+    cache = load_cache(path)
+    for shard_path in paths:
+        for url, entry in load_cache(shard_path).items():
+            if url not in cache or entry["checked"] > cache[url]["checked"]:
+                cache[url] = entry
+    save_cache(path, cache)
+    for shard_path in paths:
+        if exists(shard_path):
+            remove(shard_path)
+
+
+def needs_check(entry: dict | None, now: datetime) -> bool:
+    """Return true if a url has no usable cached result."""
+    if not entry:
+        return True
+    if entry["ok"]:
+        return False
+    return now - datetime.fromisoformat(entry["checked"]) > FAILURE_TTL
+
+
+async def check_url(session: ClientSession, semaphore: Semaphore, url: str) -> bool | None:
+    """Return true if url serves an image, false if missing, None if unknown."""
+    logger = getLogger()
+    async with semaphore:
+        try:
+            async with session.head(url, allow_redirects=True) as resp:
+                status = resp.status
+            if status == 405:
+                async with session.get(url) as resp:
+                    status = resp.status
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning("Error checking %s: %s", url, e)
+            return None
+    if status == 200:
+        return True
+    if status in BROKEN_STATUSES:
+        return False
+    logger.warning("Inconclusive status %s checking %s", status, url)
+    return None
+
+
+async def check_urls(urls: list[str], concurrency: int = 20) -> dict[str, bool | None]:
+    """Return check result for every url over one pooled session."""
+    semaphore = Semaphore(concurrency)
+    connector = TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    async with ClientSession(connector=connector,
+                             timeout=ClientTimeout(total=15)) as session:
+        results = await gather(*[check_url(session, semaphore, url) for url in urls])
+    return dict(zip(urls, results))
+
+
+async def validate_image_urls(df: DataFrame) -> DataFrame:
+    """Return dataframe with broken image urls replaced by NA."""
+    logger = getLogger()
+    path = get_cache_path()
+    cache = load_cache(path)
+    now = datetime.now(timezone.utc)
+
+    urls = df["image_url"].dropna().unique().tolist()
+    to_check = [url for url in urls if needs_check(cache.get(url), now)]
+    logger.info("Checking %s of %s image urls...", len(to_check), len(urls))
+    results = await check_urls(to_check) if to_check else {}
+    for url, ok in results.items():
+        if ok is not None:
+            cache[url] = {"ok": ok, "checked": now.isoformat()}
+    save_cache(path, cache)
+
+    broken = {url for url in urls if not cache.get(url, {"ok": True})["ok"]}
+    if broken:
+        logger.info("Dropping %s vehicles with missing images.", len(broken))
+    df = df.copy()
+    df.loc[df["image_url"].isin(broken), "image_url"] = NA
+    return df